@@ -0,0 +1,136 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : bench_parser.py
+@Time    : 2026/10/18 11:05
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import glob
+import os
+import re
+import sys
+import timeit
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.torrent_info import Promotion, TorrentInfo, parse_size  # noqa: E402
+from utils.torrent_page_parser import TorrentPageParser  # noqa: E402
+
+from make_pages import page_markup  # noqa: E402
+
+TAG_MAP = {
+    'free': '免费',
+    'twoup': '2x上传',
+    'twoupfree': '免费&2x上传',
+    'halfdown': '50%下载',
+    'twouphalfdown': '50%下载&2x上传',
+    'thirtypercentdown': '30%下载',
+    '2up': '2x上传',
+    'free2up': '免费&2x上传',
+    '50pctdown': '50%下载',
+    '50pctdown2up': '50%下载&2x上传',
+    '30pctdown': '30%下载',
+}
+FILTER_TAGS = ['免费', '免费&2x上传']
+
+
+def _legacy_record(info):
+    return TorrentInfo(info['seed_id'], info['title'], info['cat'], Promotion(info['tag']),
+                       parse_size(''.join(info['file_size'])), info['seeding'], info['downloading'],
+                       info['finished'], is_hot=info['is_hot'], is_new=info['is_new'],
+                       is_recommended=info['is_recommended'], is_seeding=info['is_seeding'],
+                       is_finished=info['is_finished'])
+
+
+def _legacy_tag(tag):
+    if tag == '':
+        return ''
+    return TAG_MAP.get(tag.split('_')[0], '')
+
+
+def legacy_parse(content):
+    # 原先 TorrentBot.start 与 get_torrent_info_filter_by_tag 的实现，作为对照
+    soup = BeautifulSoup(content, features="html.parser")
+    soup.select_one('#info_block').select_one('.navbar-user-data')
+    table = soup.find_all('tr', class_='free_bg')
+    start_idx = 1
+    torrent_infos = list()
+    for item in table:
+        tds = item.find_all('td', recursive=False)
+        cat = tds[start_idx].find('a').text.strip()
+        main_td = tds[start_idx + 1].select('table > tr > td')[0]
+        if main_td.find('div'):
+            main_td = tds[start_idx + 1].select('table > tr > td')[1]
+        href = main_td.select('a')[0].attrs['href']
+        seed_id = re.findall(r'id=(\d+)', href)[0]
+        title = main_td.find('a').attrs['title']
+        tags = set(
+            [font.attrs['class'][0] for font in main_td.select('span > span') if 'class' in font.attrs.keys()])
+        tags.discard('')
+        is_seeding = len(main_td.select('img[src="/pic/seeding.png"]')) > 0
+        is_finished = len(main_td.select('img[src="/pic/finished.png"]')) > 0
+        is_hot = 'hot' in tags
+        is_new = 'new' in tags
+        is_recommended = 'recommended' in tags
+        tags.difference_update(('hot', 'new', 'recommended'))
+        if 'class' in item.attrs:
+            tag = _legacy_tag(item.attrs['class'][0])
+        elif len(tags) == 1:
+            tag = _legacy_tag(list(tags)[0])
+        elif len(main_td.select('img[src="/pic/trans.gif"][class^="pro_"]')) > 0:
+            tag = _legacy_tag(
+                main_td.select('img[src="/pic/trans.gif"][class^="pro_"]')[-1].attrs['class'][0].split('_')[-1])
+        else:
+            tag = ''
+        torrent_infos.append({
+            'cat': cat, 'is_hot': is_hot, 'tag': tag, 'is_seeding': is_seeding, 'is_finished': is_finished,
+            'seed_id': seed_id, 'title': title,
+            'seeding': int(tds[start_idx + 5].text) if tds[start_idx + 5].text.isdigit() else -1,
+            'downloading': int(tds[start_idx + 6].text) if tds[start_idx + 6].text.isdigit() else -1,
+            'finished': int(tds[start_idx + 7].text) if tds[start_idx + 7].text.isdigit() else -1,
+            'file_size': tds[start_idx + 4].text.split('\n'),
+            'is_new': is_new, 'is_recommended': is_recommended,
+        })
+    return [info for info in torrent_infos if info['tag'] in FILTER_TAGS]
+
+
+def main():
+    page_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+    parsers = [('html.parser', TorrentPageParser(TAG_MAP, features='html.parser'))]
+    try:
+        import lxml  # noqa: F401
+        parsers.append(('lxml', TorrentPageParser(TAG_MAP, features='lxml')))
+    except ImportError:
+        pass
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for path in sorted(glob.glob(os.path.join(page_dir, 'torrents_*.html'))):
+        name = os.path.basename(path)
+        if page_markup(name) != 'highlight':
+            # 原实现只识别 tr.free_bg 行，文字和图标标记的页面由 run.py --check 检查
+            continue
+        with open(path, 'rb') as f:
+            content = f.read()
+        legacy = legacy_parse(content)
+        legacy_time = timeit.timeit(lambda: legacy_parse(content), number=number) / number
+        print('{}: {} records, legacy {:.2f} ms'.format(name, len(legacy), legacy_time * 1000))
+        for features, parser in parsers:
+            _, current = parser.parse(content, FILTER_TAGS)
+            legacy_records = [_legacy_record(info) for info in legacy]
+            # 原实现不解析发布时间
+            for record, info in zip(legacy_records, current):
+                record.added_time = info.added_time
+            if legacy_records != current:
+                print('{}: records of {} differ from the legacy parser!'.format(name, features))
+                sys.exit(1)
+            current_time = timeit.timeit(lambda: parser.parse(content, FILTER_TAGS), number=number) / number
+            print('    {}: {:.2f} ms, speedup {:.2f}x'.format(
+                features, current_time * 1000, legacy_time / current_time))
+
+
+if __name__ == '__main__':
+    main()
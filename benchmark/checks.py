@@ -0,0 +1,485 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : checks.py
+@Time    : 2026/10/19 10:20
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+
+run.py --check 调用的回归检查，预期结果都是按固定数据手工算出的，不依赖被检查的代码生成。
+每个 check_* 返回失败信息的列表，空列表表示通过。
+"""
+
+import logging
+import os
+import pickle
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from utils.admission import AdmissionController
+from utils.bit_torrent_utils import BitTorrent, Torrent
+from utils.download_limiter import QUEUED_TAG, DownloadLimiter
+from utils.eviction import EvictionPlanner
+from utils.history_store import HistoryStore
+from utils.rate_history import RateHistory
+from utils.scoring import UploadModel, feature_matrix, train
+from utils.seen_store import SeenStore
+from utils.torrent_feed import TorrentFeed
+from utils.torrent_info import Promotion, TorrentInfo
+from utils.torrent_scanner import ScanResult
+
+GiB = 1024 * 1024 * 1024
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _NoConfig:
+    def get_qbittorrent_config(self, param):
+        return None
+
+
+def _expect(failed, name, actual, expected):
+    if actual != expected:
+        failed.append('{}: expected {!r}, got {!r}'.format(name, expected, actual))
+
+
+def _torrent(hash, added_on, upspeed, size_gib, state='uploading'):
+    return Torrent(hash, {'name': hash, 'added_on': added_on, 'upspeed': upspeed, 'size': size_gib * GiB,
+                          'state': state, 'tags': 'byrbt_bot'})
+
+
+def fixed_mirror():
+    # a、b、d 可以删除（按添加时间排序），c 上传速度超过 500KB/s 受保护，e 正在校验，共 105 GiB
+    return [
+        _torrent('a', 100, 0, 10),
+        _torrent('b', 200, 0, 20, 'stalledUP'),
+        _torrent('c', 300, 600000, 30),
+        _torrent('d', 400, 1000, 40),
+        _torrent('e', 500, 0, 5, 'checkingUP'),
+    ]
+
+
+def _plan_summary(plan):
+    return ([torrent.id for torrent in plan.evict], plan.admit_count, plan.torrent_count,
+            plan.total_size // GiB, plan.free_space // GiB)
+
+
+def check_eviction():
+    failed = list()
+    torrents = fixed_mirror()
+    planner = EvictionPlanner(5, 200 * GiB, 5 * GiB)
+    # 数量超出 1 个：删除最早添加的 a
+    _expect(failed, 'evict/count', _plan_summary(planner.plan(torrents, 30 * GiB, [10 * GiB])),
+            (['a'], 1, 5, 105, 30))
+    # 数量超出 2 个、空间缺 25 GiB：删除 a、b
+    _expect(failed, 'evict/count+space', _plan_summary(planner.plan(torrents, 30 * GiB, [30 * GiB, 20 * GiB])),
+            (['a', 'b'], 2, 5, 125, 10))
+    # 只缺 20 GiB 空间：前缀为 a、b，只删除 b 已经足够，a 保留
+    planner = EvictionPlanner(10, 200 * GiB, 5 * GiB)
+    _expect(failed, 'evict/prune', _plan_summary(planner.plan(torrents, 30 * GiB, [45 * GiB])),
+            (['b'], 1, 5, 130, 5))
+    # 超过总大小上限，删除所有可删除的种子也放不下：不添加，也不删除
+    _expect(failed, 'evict/impossible', _plan_summary(planner.plan(torrents, 30 * GiB, [500 * GiB])),
+            ([], 0, 5, 105, 30))
+    # 不添加种子，剩余空间低于下限：删除 a 后剩余 11 GiB
+    _expect(failed, 'evict/low-space', _plan_summary(planner.plan(torrents, 1 * GiB, [])),
+            (['a'], 0, 4, 95, 11))
+    return failed
+
+
+def _info(seed_id, tag, size_gib, seeding, downloading):
+    return TorrentInfo(seed_id, 'Torrent.' + seed_id, '电影', tag, size_gib * GiB, seeding, downloading, 0)
+
+
+def check_admission():
+    failed = list()
+    # 只有受保护的 c 和正在校验的 e，无法删除；剩余 30 GiB，需要保留 5 GiB
+    torrents = [torrent for torrent in fixed_mirror() if torrent.id in ('c', 'e')]
+    planner = EvictionPlanner(10, 200 * GiB, 5 * GiB)
+    controller = AdmissionController(planner)
+    x = _info('x', Promotion.FREE, 10, 1, 5)
+    y = _info('y', Promotion.TWO_UP_FREE, 10, 1, 1)
+    z = _info('z', Promotion.FREE, 8, 10, 1)
+    w = _info('w', Promotion.FREE, 1, 1, 9)
+
+    # 排序为 y（免费&2x上传）、x、z；三个共 28 GiB 放不下，只预留前两个
+    accepted = controller.reserve([x, y, z], torrents, 30 * GiB)
+    _expect(failed, 'admission/first-batch', [info.seed_id for info in accepted], ['y', 'x'])
+    # 已有的 20 GiB 预留占用空间，w、z 中只有排在前面的 w 放得下；已预留的 x 直接返回
+    accepted = controller.reserve([x, z, w], torrents, 30 * GiB)
+    _expect(failed, 'admission/second-batch', [info.seed_id for info in accepted], ['x', 'w'])
+    controller.update('y', 2 * GiB)
+    _expect(failed, 'admission/update', sorted(controller.reserved_sizes(exclude={'x'})), [1 * GiB, 2 * GiB])
+    controller.release('x')
+    _expect(failed, 'admission/release', len(controller), 2)
+    # 超过 ttl 的预留自动失效
+    controller._reservations['y'].time -= controller.ttl + 1
+    controller.reserve([], torrents, 30 * GiB)
+    _expect(failed, 'admission/expire', sorted(controller.reserved_sizes()), [1 * GiB])
+
+    # key 为 None 时保持传入的顺序
+    controller = AdmissionController(planner)
+    accepted = controller.reserve([z, y, x], torrents, 30 * GiB, key=None)
+    _expect(failed, 'admission/keep-order', [info.seed_id for info in accepted], ['z', 'y'])
+    return failed
+
+
+def check_seen_store():
+    failed = list()
+    now = int(time.time())
+    with tempfile.TemporaryDirectory() as work_dir:
+        snapshot_path = os.path.join(work_dir, 'data', 'torrent.pkl')
+        journal_path = os.path.join(work_dir, 'data', 'torrent.journal')
+        os.makedirs(os.path.dirname(snapshot_path))
+        # 旧版本的快照是 id 字符串列表；日志最后一行不完整（进程被强制结束），9 已经过期
+        with open(snapshot_path, 'wb') as f:
+            pickle.dump(['7', '8'], f, protocol=2)
+        with open(journal_path, 'w') as f:
+            f.write('1 {now}\n2 {now}\nbad line\n9 1000\n3 {now}\n4 {now}'.format(now=now))
+
+        store = SeenStore(snapshot_path, journal_path, max_age=86400)
+        store.load()
+        _expect(failed, 'seen/replay', sorted(seed_id for seed_id in (1, 2, 3, 4, 7, 8, 9) if seed_id in store),
+                [1, 2, 3, 7, 8])
+        _expect(failed, 'seen/str-id', '3' in store and 'abc' not in store, True)
+        # 回放后合并进快照并清空日志
+        _expect(failed, 'seen/journal-truncated', os.path.getsize(journal_path), 0)
+        store.add('5')
+        store._journal.close()
+        store._journal = None
+
+        # 不调用 close，模拟进程退出：新的实例从快照和日志恢复
+        restored = SeenStore(snapshot_path, journal_path, max_age=86400)
+        restored.load()
+        _expect(failed, 'seen/restore', sorted(seed_id for seed_id in range(10) if seed_id in restored),
+                [1, 2, 3, 5, 7, 8])
+        restored.close()
+    return failed
+
+
+def check_apply_delta():
+    failed = list()
+    bit_torrent = BitTorrent(_NoConfig())
+    # 视为刚刚同步过，读取时不访问网络
+    bit_torrent._sync_time = time.time()
+    bit_torrent._apply_delta({
+        'rid': 1, 'full_update': True,
+        'torrents': {
+            'h1': {'name': 'one', 'state': 'downloading', 'size': 10, 'upspeed': 0, 'tags': 'byrbt_bot'},
+            'h2': {'name': 'two', 'state': 'uploading', 'size': 20, 'upspeed': 0, 'tags': 'byrbt_bot'},
+        },
+        'server_state': {'free_space_on_disk': 100, 'dl_info_speed': 5},
+    })
+    view = Torrent('h1', bit_torrent._torrents['h1'])
+    _expect(failed, 'delta/full', (sorted(bit_torrent._torrents), bit_torrent._rid, bit_torrent.get_free_space()),
+            (['h1', 'h2'], 1, 100))
+    _expect(failed, 'delta/space-changed-initial', bit_torrent.pop_space_changed(), True)
+
+    # 只更新变化的字段；下载完成和删除种子都需要检查磁盘
+    bit_torrent._apply_delta({'rid': 2, 'torrents': {'h1': {'state': 'uploading'}}, 'torrents_removed': ['h2'],
+                              'server_state': {'free_space_on_disk': 90}})
+    _expect(failed, 'delta/incremental', (sorted(bit_torrent._torrents), bit_torrent._torrents['h1']['name'],
+                                          bit_torrent.get_free_space(), bit_torrent._server_state['dl_info_speed']),
+            (['h1'], 'one', 90, 5))
+    _expect(failed, 'delta/view-updated', view.status.seeding, True)
+    _expect(failed, 'delta/space-changed', (bit_torrent.pop_space_changed(), bit_torrent.pop_space_changed()),
+            (True, False))
+
+    # 只有速度变化时不需要检查磁盘
+    bit_torrent._apply_delta({'rid': 3, 'torrents': {'h1': {'upspeed': 1000}}})
+    _expect(failed, 'delta/speed-only', (view.rateUpload, bit_torrent.pop_space_changed()), (1000, False))
+
+    # 全量更新保留原有 dict 对象，删除不再存在的种子，server_state 整体替换
+    data = bit_torrent._torrents['h1']
+    bit_torrent._apply_delta({'rid': 4, 'full_update': True,
+                              'torrents': {'h1': {'name': 'one', 'state': 'pausedUP', 'size': 10, 'upspeed': 0},
+                                           'h3': {'name': 'three', 'state': 'metaDL', 'size': 30, 'upspeed': 0}},
+                              'server_state': {'free_space_on_disk': 80}})
+    _expect(failed, 'delta/full-again', (sorted(bit_torrent._torrents), bit_torrent._torrents['h1'] is data,
+                                         view.status.paused, dict(bit_torrent._server_state), bit_torrent._rid),
+            (['h1', 'h3'], True, True, {'free_space_on_disk': 80}, 4))
+    return failed
+
+
+def _sample(hash, upspeed, ratio=0.0):
+    return Torrent(hash, {'upspeed': upspeed, 'ratio': ratio})
+
+
+def check_rate_history():
+    failed = list()
+    # 半衰期 100 秒：间隔 100 秒 alpha 为 0.5，间隔 200 秒为 0.75
+    history = RateHistory(None, window=4, min_interval=60, halflife=100, initial_rows=2)
+    history.record([_sample('a', 100, 0.1)], now=0)
+    history.record([_sample('a', 1000, 0.2)], now=30)
+    _expect(failed, 'rate/min-interval', history.ewma('a'), 100.0)
+    history.record([_sample('a', 300, 0.2)], now=100)
+    history.record([_sample('a', 0, 0.3)], now=300)
+    _expect(failed, 'rate/ewma', (history.ewma('a'), round(history.window_mean('a'), 2)), (50.0, 133.33))
+
+    # 5 个种子超过初始的 2 行，扩容两次；a 的 EWMA 不受影响
+    history.record([_sample('a', 50, 0.4)] + [_sample(hash, rate) for hash, rate in
+                                              (('b', 10), ('c', 20), ('d', 30), ('e', 40))], now=400)
+    _expect(failed, 'rate/grow', (len(history), len(history._pos),
+                                  [history.ewma(hash) for hash in ('a', 'b', 'c', 'd', 'e')]),
+            (5, 8, [50.0, 10.0, 20.0, 30.0, 40.0]))
+
+    # b 被删除，行由新的 f 复用，f 的 EWMA 从自己的第一个采样开始；a 的分享率环形缓冲区已经绕回
+    history.record([_sample('a', 50, 0.5)] + [_sample(hash, rate) for hash, rate in
+                                              (('c', 20), ('d', 30), ('e', 40), ('f', 70))], now=500)
+    _expect(failed, 'rate/reuse', ('b' in history, history.ewma('f'), history.ewma('c'),
+                                   [round(float(ratio), 3) for ratio in history.ratios('a')]),
+            (False, 70.0, 20.0, [0.2, 0.3, 0.4, 0.5]))
+    _expect(failed, 'rate/fallback', (history.rate_of(_sample('x', 7)), history.rate_of(_sample('a', 7))), (7, 50.0))
+    return failed
+
+
+def _downloading(hash, amount_left, leechers, state='downloading', queued=False):
+    return Torrent(hash, {'name': hash, 'state': state, 'amount_left': amount_left, 'num_complete': 1,
+                          'num_incomplete': leechers, 'tags': 'byrbt_bot' + (',' + QUEUED_TAG if queued else '')})
+
+
+def _limiter_plan(limiter, torrents):
+    pause, resume = limiter.plan(torrents)
+    return [torrent.id for torrent in pause], [torrent.id for torrent in resume]
+
+
+def check_download_limiter():
+    failed = list()
+    # 下载速度 10/s，目标 100 秒：预算 1000，正在下载的种子可以用到 1250
+    limiter = DownloadLimiter(target_seconds=100, initial_speed=10)
+    # 按下载数/做种数排序为 d、a、b、c、e；d 是手动暂停的（没有排队标签），不参与调度
+    torrents = [
+        _downloading('a', 600, 5),
+        _downloading('b', 600, 4),
+        _downloading('c', 100, 3, 'pausedDL', queued=True),
+        _downloading('d', 10, 10, 'pausedDL'),
+        _downloading('e', 100, 2),
+    ]
+    # a、b 共 1200，没有超过 1250，b 继续下载；c 已暂停，加上后超过 1000，不恢复，其后的 e 暂停
+    _expect(failed, 'limiter/hysteresis', _limiter_plan(limiter, torrents), (['e'], []))
+    _expect(failed, 'limiter/no-hysteresis',
+            _limiter_plan(DownloadLimiter(target_seconds=100, initial_speed=10, hysteresis=1.0), torrents),
+            (['b', 'e'], []))
+    # a 剩余 100 后共 800，恢复 c，e 也在 1250 以内
+    torrents[0]._data['amount_left'] = 100
+    _expect(failed, 'limiter/resume', _limiter_plan(limiter, torrents), ([], ['c']))
+    _expect(failed, 'limiter/max-active',
+            _limiter_plan(DownloadLimiter(target_seconds=100, initial_speed=10, max_active=1), torrents),
+            (['b', 'e'], []))
+
+    # 峰值每分钟衰减 2%，没有种子下载时的速度不计入
+    limiter.update_speed(5, 1, now=0)
+    limiter.update_speed(5, 1, now=60)
+    limiter.update_speed(50, 0, now=120)
+    _expect(failed, 'limiter/decay', round(limiter.capacity, 6), 9.8)
+    return failed
+
+
+class _FeedResponse:
+    def __init__(self, status_code, body=b''):
+        self.status_code = status_code
+        self.content = body
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        return [self.content[i:i + chunk_size] for i in range(0, len(self.content), chunk_size)]
+
+    def close(self):
+        self.closed = True
+
+
+class _FeedTracker:
+    # RSS 返回 feed_status 和 items，搜索返回以 URL 为内容的页面，由 _FeedParser 按标题给出结果
+    def __init__(self):
+        self.feed_status = 200
+        self.items = list()
+        self.searches = list()
+        self.responses = list()
+
+    def get_url(self, path):
+        return 'https://bt.byr.cn/' + path
+
+    def fetch(self, url, conditional=False, stream=False):
+        if stream:
+            body = '<rss><channel>{}</channel></rss>'.format(''.join(
+                '<item><title>{}</title><link>https://bt.byr.cn/details.php?id={}</link>'
+                '<enclosure url="https://bt.byr.cn/download.php?id={}" length="{}"/></item>'.format(
+                    title, seed_id, seed_id, size) for seed_id, title, size in self.items))
+            response = _FeedResponse(self.feed_status, body.encode() if self.feed_status == 200 else b'')
+            self.responses.append(response)
+            return response
+        self.searches.append(parse_qs(urlparse(url).query)['search'][0])
+        return _FeedResponse(200, url)
+
+
+class _FeedParser:
+    def __init__(self, results):
+        self.results = results
+
+    def parse(self, content, filter_tags):
+        return None, list(self.results.get(parse_qs(urlparse(content).query)['search'][0], []))
+
+
+def check_torrent_feed():
+    failed = list()
+    tracker = _FeedTracker()
+    # A 为 Free，B 不是促销种子，C 已经处理过，D 超过大小上限
+    tracker.items = [('1', 'A', 2 * GiB), ('2', 'B', 2 * GiB), ('3', 'C', 2 * GiB), ('4', 'D', 200 * GiB)]
+    free_info = _info('1', Promotion.FREE, 2, 1, 5)
+    feed = TorrentFeed(tracker, _FeedParser({'A': [free_info]}), None, 'https://bt.byr.cn/torrentrss.php', {'3'},
+                       max_size=100 * GiB, rate=0, recheck_interval=100)
+
+    def scan():
+        result = feed.scan()
+        return [info.seed_id for info in result.torrent_infos], result.changed, list(tracker.searches)
+
+    _expect(failed, 'feed/first', scan(), (['1'], True, ['A', 'B']))
+    # 304 时沿用上次的条目，结果都在缓存中，不再搜索；仍有候选种子，视为有变化
+    tracker.feed_status = 304
+    _expect(failed, 'feed/not-modified', scan(), (['1'], True, ['A', 'B']))
+    _expect(failed, 'feed/closed', [response.closed for response in tracker.responses], [True, True])
+    # 缓存过期后只重新查询促销种子，B 的结果一直有效
+    for seed_id, (checked_time, torrent_info) in list(feed._checked.items()):
+        feed._checked[seed_id] = (checked_time - 101, torrent_info)
+    _expect(failed, 'feed/recheck', scan(), (['1'], True, ['A', 'B', 'A']))
+    # A 处理完、B 离开 RSS 后没有候选种子，B 的缓存被清除
+    feed.seen = {'1', '3'}
+    tracker.feed_status = 200
+    tracker.items = [('1', 'A', 2 * GiB), ('3', 'C', 2 * GiB)]
+    _expect(failed, 'feed/finished', scan() + (sorted(feed._checked),), ([], False, ['A', 'B', 'A'], ['1']))
+    return failed
+
+
+def check_history_store():
+    failed = list()
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, 'history.db')
+        store = HistoryStore(db_path, decision_cache_size=2)
+        store.open()
+        # 1 在第一次扫描时为 Free，2 在第二次扫描时变为 Free，之后列表不变
+        store.record_scan(ScanResult(None, [_info('1', Promotion.FREE, 1, 1, 1),
+                                            _info('2', Promotion.NONE, 1, 1, 1)], True, 1, 0), now=1000)
+        store.record_scan(ScanResult(None, [_info('1', Promotion.NONE, 1, 1, 1),
+                                            _info('2', Promotion.FREE, 1, 1, 1)], True, 1, 0), now=1100)
+        store.record_unchanged(now=1200)
+        # 连续相同的决策只记录一次；1 被 5、6 挤出缓存后，相同的决策会再记录一次
+        store.record_decision('1', 'skipped', 'space', now=1000)
+        store.record_decision('1', 'skipped', 'space', now=1100)
+        store.record_decision('1', 'admitted', 'ok', 'h1', GiB, now=1200)
+        store.record_decision('1', 'skipped', 'space', now=1300)
+        store.record_decisions([('5', 'skipped', 'size', None, GiB), ('6', 'skipped', 'size', None, GiB)], now=1300)
+        store.record_decision('1', 'skipped', 'space', now=1400)
+        store.close()
+
+        connection = sqlite3.connect(db_path)
+        try:
+            _expect(failed, 'history/torrents', connection.execute(
+                'SELECT seed_id, first_seen, last_seen, free_since, free_until FROM torrents '
+                'ORDER BY seed_id').fetchall(),
+                [(1, 1000.0, 1200.0, 1000.0, 1000.0), (2, 1000.0, 1200.0, 1100.0, 1200.0)])
+            _expect(failed, 'history/scan-rows', connection.execute('SELECT COUNT(*) FROM scan_rows').fetchone()[0], 4)
+            _expect(failed, 'history/decisions', connection.execute(
+                'SELECT time, decision FROM decisions WHERE seed_id = 1 ORDER BY time').fetchall(),
+                [(1000.0, 'skipped'), (1200.0, 'admitted'), (1300.0, 'skipped'), (1400.0, 'skipped')])
+        finally:
+            connection.close()
+    return failed
+
+
+class _Evicted:
+    # record_eviction 只读取这些属性
+    def __init__(self, seed_id, size, added_time, uploaded):
+        self.id = 'h' + seed_id
+        self.name = 'Torrent.' + seed_id
+        self.total_size = size
+        self.date_added = added_time
+        self.uploaded = uploaded
+        self.ratio = uploaded / size
+        self.rateUpload = 0
+
+
+def _training_history(path, count=80, start=1767196800):
+    # 每个种子扫描一次、添加后做种 2 天删除，上传量只取决于下载数/做种数
+    store = HistoryStore(path)
+    store.open()
+    evictions = list()
+    for i in range(count):
+        now = start + i * 3600
+        seeding, downloading = 1 + i % 7, i % 11
+        info = TorrentInfo(str(1000 + i), 'Torrent.{}'.format(i), '电影' if i % 2 else '剧集', Promotion.FREE,
+                           (1 + i % 5) * GiB, seeding, downloading, 0, added_time=now - 600)
+        store.record_scan(ScanResult(None, [info], True, 1, 0), now)
+        store.record_decision(info.seed_id, 'admitted', 'ok', 'h' + info.seed_id, info.size_bytes, now=now + 1)
+        evictions.append((_Evicted(info.seed_id, info.size_bytes, now + 1,
+                                   int(info.size_bytes * 0.2 * downloading / seeding)), now + 1 + 2 * 86400))
+    # 先写入扫描和添加记录，删除记录需要在其后
+    store.close()
+    store.open()
+    for torrent, now in evictions:
+        store.record_eviction(torrent, 0, now=now)
+    store.close()
+
+
+def check_scoring():
+    # 用文档中的命令训练、保存，再用 bot 的方式读取，预测与同一进程中训练的模型一致
+    failed = list()
+    try:
+        import sklearn  # noqa: F401
+    except ImportError:
+        return failed
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, 'history.db')
+        model_path = os.path.join(work_dir, 'upload_model.npz')
+        _training_history(db_path)
+        result = subprocess.run([sys.executable, '-m', 'utils.scoring', 'train', '--db', db_path, '--out', model_path],
+                                cwd=ROOT_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        if result.returncode != 0:
+            failed.append('scoring/train: {}'.format(result.stdout.decode(errors='replace').strip()))
+            return failed
+        loaded = UploadModel.load(model_path)
+        if loaded is None:
+            failed.append('scoring/load: model saved by the train command cannot be loaded')
+            return failed
+        connection = sqlite3.connect(db_path)
+        try:
+            trained, _ = train(connection)
+        finally:
+            connection.close()
+        _expect(failed, 'scoring/metadata', (loaded.sample_count, loaded.category_codes),
+                (80, {'剧集': 0, '电影': 1}))
+        infos = [TorrentInfo(str(i), 'x', '电影', Promotion.FREE, 2 * GiB, 1 + i % 7, i % 11, 0) for i in range(20)]
+        matrix = feature_matrix(infos, 1767196800, loaded.category_codes)
+        _expect(failed, 'scoring/round-trip', bool(np.allclose(loaded.score(matrix), trained.score(matrix))), True)
+
+        # 损坏的文件和 pickle 文件都不能读取，回退到规则
+        with open(model_path, 'r+b') as f:
+            f.truncate(100)
+        with open(os.path.join(work_dir, 'model.pkl'), 'wb') as f:
+            pickle.dump(trained, f)
+        scoring_logger = logging.getLogger('utils.scoring')
+        scoring_logger.disabled = True
+        try:
+            _expect(failed, 'scoring/corrupt', (UploadModel.load(model_path),
+                                                UploadModel.load(os.path.join(work_dir, 'model.pkl'))), (None, None))
+        finally:
+            scoring_logger.disabled = False
+    return failed
+
+
+CHECKS = [check_eviction, check_admission, check_seen_store, check_apply_delta, check_rate_history,
+          check_download_limiter, check_torrent_feed, check_history_store, check_scoring]
+
+
+def run_checks():
+    failed = list()
+    for check in CHECKS:
+        try:
+            failed.extend(check())
+        except Exception as e:
+            failed.append('{}: {!r}'.format(check.__name__, e))
+    return failed
@@ -0,0 +1,296 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : fake_server.py
+@Time    : 2026/10/18 18:10
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from bencoding import bencode, bdecode
+
+GiB = 1024 * 1024 * 1024
+STATES = ['uploading', 'stalledUP', 'downloading', 'stalledDL', 'pausedUP', 'queuedUP', 'checkingUP']
+
+
+def make_torrent_file(seed_id):
+    # 根据种子 id 生成固定的 .torrent 文件，大小 2GiB-500GiB
+    size = (seed_id % 499 + 2) * GiB
+    files = [{b'length': size // 4, b'path': [b'part%d.mkv' % i]} for i in range(3)]
+    files.append({b'length': size - size // 4 * 3, b'path': [b'sample.mkv']})
+    info = {
+        b'name': b'Torrent.%d' % seed_id,
+        b'piece length': 4 * 1024 * 1024,
+        b'pieces': hashlib.sha1(b'%d' % seed_id).digest(),
+        b'files': files,
+        b'private': 1,
+    }
+    return bencode({b'announce': b'https://tracker.byr.pt/announce.php', b'info': info})
+
+
+def make_torrent_data(rnd, info_hash, name, size, added_on, state=None):
+    state = state or rnd.choice(STATES)
+    progress = 1.0 if 'UP' in state or state == 'uploading' else rnd.random()
+    return {
+        'hash': info_hash, 'name': name, 'size': size, 'total_size': size, 'added_on': added_on,
+        'completion_on': added_on + 3600 if progress >= 1 else -1, 'state': state, 'progress': progress,
+        'upspeed': rnd.choice([0, 0, 0, rnd.randint(1, 2000000)]), 'dlspeed': rnd.randint(0, 5000000),
+        'uploaded': rnd.randint(0, 50 * size), 'downloaded': int(size * progress),
+        'ratio': rnd.random() * 10, 'num_seeds': rnd.randint(0, 100), 'num_leechs': rnd.randint(0, 300),
+        'num_complete': rnd.randint(0, 500), 'num_incomplete': rnd.randint(0, 500),
+        'tags': 'byrbt_bot', 'category': '', 'save_path': '/downloads', 'tracker': 'https://tracker.byr.pt/',
+        'eta': 8640000, 'priority': 0, 'seq_dl': False, 'f_l_piece_prio': False, 'force_start': False,
+        'super_seeding': False, 'auto_tmm': False, 'availability': -1, 'amount_left': int(size * (1 - progress)),
+        'last_activity': added_on, 'seeding_time': 0, 'time_active': 0, 'max_ratio': -1, 'max_seeding_time': -1,
+        'ratio_limit': -2, 'seeding_time_limit': -2, 'dl_limit': -1, 'up_limit': -1,
+        'magnet_uri': 'magnet:?xt=urn:btih:' + info_hash, 'content_path': '/downloads/' + name,
+    }
+
+
+class FakeState:
+    """qBittorrent WebUI API 与 byrbt 页面的内存模拟，记录每个接口的调用次数"""
+
+    def __init__(self, torrent_count=5000, free_space=2000 * GiB, pages=(), seed=20261018, history_size=1000):
+        self.rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.rid = 0
+        self.history_size = history_size
+        # [(rid, 变化的 hash 集合, 删除的 hash 集合)]
+        self.history = list()
+        self.pages = list(pages)
+        self.torrents = dict()
+        now = int(time.time())
+        for i in range(torrent_count):
+            info_hash = hashlib.sha1(b'synthetic-%d' % i).hexdigest()
+            self.torrents[info_hash] = make_torrent_data(
+                self.rnd, info_hash, 'Synthetic.%d' % i, self.rnd.randint(1, 200) * GiB, now - i * 600)
+        self.server_state = {
+            'free_space_on_disk': free_space, 'dl_info_speed': 20 * 1024 * 1024, 'up_info_speed': 10 * 1024 * 1024,
+            'connection_status': 'connected', 'dht_nodes': 0, 'alltime_dl': 0, 'alltime_ul': 0,
+        }
+
+    def _record(self, changed=(), removed=()):
+        self.rid += 1
+        self.history.append((self.rid, set(changed), set(removed)))
+        if len(self.history) > self.history_size:
+            self.history.pop(0)
+
+    def sync(self, rid):
+        with self.lock:
+            if rid <= 0 or len(self.history) == 0 or rid < self.history[0][0] - 1 or rid > self.rid:
+                return {'rid': self.rid, 'full_update': True, 'torrents': self.torrents,
+                        'server_state': self.server_state, 'categories': {}, 'tags': ['byrbt_bot']}
+            changed = set()
+            removed = set()
+            for change_rid, change_set, remove_set in self.history:
+                if change_rid > rid:
+                    changed |= change_set
+                    changed -= remove_set
+                    removed |= remove_set
+            return {
+                'rid': self.rid,
+                'torrents': {info_hash: self.torrents[info_hash] for info_hash in changed if info_hash in self.torrents},
+                'torrents_removed': sorted(removed),
+                'server_state': {'free_space_on_disk': self.server_state['free_space_on_disk']},
+            }
+
+    def tick(self, count=50):
+        # 模拟一段时间内部分种子上传速度和状态的变化
+        with self.lock:
+            changed = self.rnd.sample(list(self.torrents), min(count, len(self.torrents)))
+            for info_hash in changed:
+                data = self.torrents[info_hash]
+                data['upspeed'] = self.rnd.choice([0, self.rnd.randint(1, 2000000)])
+                data['uploaded'] += data['upspeed'] * 60
+            self._record(changed)
+
+    def add(self, contents, paused, tags='byrbt_bot'):
+        with self.lock:
+            now = int(time.time())
+            changed = list()
+            for content in contents:
+                info = bdecode(content)[b'info']
+                info_hash = hashlib.sha1(bencode(info)).hexdigest()
+                if info_hash in self.torrents:
+                    continue
+                size = sum(item[b'length'] for item in info[b'files']) if b'files' in info else info[b'length']
+                state = 'pausedDL' if paused else 'downloading'
+                self.torrents[info_hash] = make_torrent_data(
+                    self.rnd, info_hash, info[b'name'].decode('utf-8', 'replace'), size, now, state)
+                self.torrents[info_hash]['tags'] = ', '.join(sorted(tag for tag in tags.split(',') if tag))
+                changed.append(info_hash)
+            self._record(changed)
+
+    def delete(self, hashes):
+        with self.lock:
+            removed = [info_hash for info_hash in hashes if self.torrents.pop(info_hash, None) is not None]
+            self._record(removed=removed)
+
+    def set_state(self, hashes, state):
+        with self.lock:
+            changed = [info_hash for info_hash in hashes if info_hash in self.torrents]
+            for info_hash in changed:
+                self.torrents[info_hash]['state'] = state
+            self._record(changed)
+
+    def edit_tags(self, hashes, tags, add):
+        # 与 qBittorrent 一样，标签按字母顺序以 ", " 分隔
+        with self.lock:
+            changed = [info_hash for info_hash in hashes if info_hash in self.torrents]
+            for info_hash in changed:
+                current = set(tag.strip() for tag in self.torrents[info_hash]['tags'].split(',') if tag.strip())
+                current = current | set(tags) if add else current - set(tags)
+                self.torrents[info_hash]['tags'] = ', '.join(sorted(current))
+            self._record(changed)
+
+    def info(self, hashes):
+        with self.lock:
+            if hashes is None:
+                return list(self.torrents.values())
+            return [self.torrents[info_hash] for info_hash in hashes if info_hash in self.torrents]
+
+    def page(self, index):
+        if len(self.pages) == 0:
+            return b'<html><body><table class="torrents"></table></body></html>'
+        return self.pages[index % len(self.pages)]
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _params(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        body = b''
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > 0:
+            body = self.rfile.read(length)
+        files = list()
+        content_type = self.headers.get('Content-Type', '')
+        if content_type.startswith('multipart/form-data'):
+            message = BytesParser(policy=HTTP).parsebytes(
+                b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + body)
+            for part in message.iter_parts():
+                name = part.get_param('name', header='content-disposition')
+                payload = part.get_payload(decode=True)
+                if part.get_filename() is not None:
+                    files.append(payload)
+                else:
+                    params[name] = payload.decode()
+        elif body:
+            params.update({k: v[-1] for k, v in parse_qs(body.decode()).items()})
+        return url.path, params, files
+
+    def _send(self, body, content_type='text/plain; charset=UTF-8', status=200):
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, data):
+        self._send(json.dumps(data), 'application/json')
+
+    def _handle(self):
+        path, params, files = self._params()
+        state = self.state
+        state.calls[path] += 1
+        hashes = params.get('hashes')
+        hashes = None if hashes in (None, 'all') else hashes.split('|')
+        if path == '/api/v2/auth/login':
+            self._send('Ok.')
+        elif path == '/api/v2/app/version':
+            self._send('v4.6.0')
+        elif path == '/api/v2/sync/maindata':
+            self._json(state.sync(int(params.get('rid', 0))))
+        elif path == '/api/v2/torrents/add':
+            state.add(files, params.get('paused') == 'true', params.get('tags', 'byrbt_bot'))
+            self._send('Ok.')
+        elif path == '/api/v2/torrents/delete':
+            state.delete(hashes or list())
+            self._send('')
+        elif path == '/api/v2/torrents/resume':
+            state.set_state(hashes or list(), 'downloading')
+            self._send('')
+        elif path == '/api/v2/torrents/pause':
+            state.set_state(hashes or list(), 'pausedDL')
+            self._send('')
+        elif path in ('/api/v2/torrents/addTags', '/api/v2/torrents/removeTags'):
+            tags = [tag.strip() for tag in params.get('tags', '').split(',') if tag.strip()]
+            state.edit_tags(hashes or list(), tags, path.endswith('addTags'))
+            self._send('')
+        elif path == '/api/v2/torrents/info':
+            self._json(state.info(hashes))
+        elif path == '/torrents.php':
+            self._send(state.page(int(params.get('page', 0))), 'text/html; charset=utf-8')
+        elif path == '/download.php':
+            self._send(make_torrent_file(int(params['id'])), 'application/x-bittorrent')
+        elif path == '/takelogin.php':
+            self._send('<html>最近消息</html>', 'text/html; charset=utf-8')
+        elif path == '/fake/stats':
+            self._json(dict(state.calls))
+        else:
+            self._send('Not Found', status=404)
+
+    do_GET = _handle
+    do_POST = _handle
+
+
+def load_pages(pages_dir, pattern='torrents_*.html'):
+    pages = list()
+    for path in sorted(glob.glob(os.path.join(pages_dir, pattern))):
+        with open(path, 'rb') as f:
+            pages.append(f.read())
+    return pages
+
+
+def start_server(state, host='127.0.0.1', port=0):
+    handler = type('BoundFakeHandler', (FakeHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='fake-server', daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='fake qBittorrent WebUI API and byrbt pages for offline testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--torrents', type=int, default=5000)
+    parser.add_argument('--pages', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages'))
+    args = parser.parse_args()
+    state = FakeState(args.torrents, pages=load_pages(args.pages, 'torrents_normal.html'))
+    server = start_server(state, args.host, args.port)
+    print('fake server listening on http://{}:{}/'.format(*server.server_address))
+    try:
+        while True:
+            time.sleep(60)
+            state.tick()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
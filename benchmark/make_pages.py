@@ -0,0 +1,186 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : make_pages.py
+@Time    : 2026/10/18 10:40
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+
+生成 benchmark/pages 中的合成 torrents.php 页面（不是从网站保存的页面），结构按 NexusPHP
+的模板编写，覆盖高亮、文字、图标三种促销标记方式。同时把生成每一行时使用的数据写入
+benchmark/expected，作为解析结果的预期值，预期值不经过被检查的解析代码：
+
+    python benchmark/make_pages.py
+"""
+
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+CATS = ['电影', '剧集', '动漫', '音乐', '综艺', '游戏', '软件', '资料', '体育', '记录']
+PROMOTIONS = ['free', 'twoupfree', 'twoup', 'halfdown', 'twouphalfdown', 'thirtypercentdown']
+# 图标标记方式使用的 class 名称
+ICON_NAMES = {
+    'free': 'free',
+    'twoupfree': 'free2up',
+    'twoup': '2up',
+    'halfdown': '50pctdown',
+    'twouphalfdown': '50pctdown2up',
+    'thirtypercentdown': '30pctdown',
+}
+UNITS = [('MiB', 0.05), ('GiB', 0.85), ('TiB', 0.1)]
+UNIT_BYTES = {'MiB': 1024 ** 2, 'GiB': 1024 ** 3, 'TiB': 1024 ** 4}
+# 促销 class 对应的促销名称（Promotion 的值）
+PROMOTION_NAMES = {
+    '': '',
+    'free': '免费',
+    'twoupfree': '免费&2x上传',
+    'twoup': '2x上传',
+    'halfdown': '50%下载',
+    'twouphalfdown': '50%下载&2x上传',
+    'thirtypercentdown': '30%下载',
+}
+# 网站显示的是北京时间
+SITE_TIMEZONE = timezone(timedelta(hours=8))
+
+PAGE_HEAD = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>BYRBT :: 种子 - Powered by NexusPHP</title></head>
+<body>
+<table id="info_block" width="100%"><tr><td class="bottom">
+<span class="navbar-user-data"><span class="nowrap"><a href="userdetails.php?id=1" class="User_Name"><b>byrbt_bot</b></a></span>
+ [<a href="logout.php">退出</a>] 等级：<b>Veteran User</b> 魔力值：12345.6 [<a href="mybonus.php">使用</a>]
+ 分享率：3.210 上传量：4.321 TB 下载量：1.234 TB 当前活动：<img alt="Torrents seeding" src="/pic/arrowup.gif">20</span>
+</td></tr></table>
+<table class="torrents" cellspacing="0" cellpadding="5" width="100%">
+<tr><td class="colhead">引用</td><td class="colhead">类型</td><td class="colhead">标题</td><td class="colhead">评论</td>
+<td class="colhead">存活时间</td><td class="colhead">大小</td><td class="colhead">种子数</td><td class="colhead">下载数</td>
+<td class="colhead">完成数</td><td class="colhead">发布者</td></tr>
+'''
+
+PAGE_TAIL = '''</table>
+<p class="footer">Page created in 0.123 seconds.</p>
+</body></html>
+'''
+
+
+def _flags(rnd):
+    spans = ''
+    flags = set()
+    for flag, rate in (('hot', 0.2), ('new', 0.3), ('recommended', 0.05)):
+        if rnd.random() < rate:
+            spans += '<span><span class="{}">{}</span></span>'.format(flag, flag)
+            flags.add(flag)
+    return spans, flags
+
+
+def make_row(rnd, seed_id, promotion, markup='highlight'):
+    # 返回 (行的 HTML, 该行应当解析出的字段)
+    title = 'Torrent.{}.2026.1080p.BluRay.x264-BYRHD'.format(seed_id)
+    size_unit, _ = rnd.choices(UNITS, weights=[w for _, w in UNITS])[0]
+    size = '{:.2f}'.format(rnd.uniform(1, 999) if size_unit != 'TiB' else rnd.uniform(1, 3))
+    seeding = rnd.randint(0, 300)
+    downloading = rnd.randint(0, 500)
+    finished = rnd.randint(0, 5000)
+    thumbnail = '<td class="embedded"><div class="thumb"><img src="/pic/cover.jpg"></div></td>' \
+        if rnd.random() < 0.3 else ''
+    status = ''
+    if rnd.random() < 0.05:
+        status = '<img src="/pic/seeding.png" alt="seeding">'
+    elif rnd.random() < 0.05:
+        status = '<img src="/pic/finished.png" alt="finished">'
+    row_class = ''
+    flags, flag_names = _flags(rnd)
+    if promotion and markup == 'highlight':
+        row_class = ' class="{}_bg free_bg"'.format(promotion)
+    elif promotion and markup == 'text':
+        flags += '<span><span class="{}">[{}]</span></span>'.format(promotion, promotion)
+    elif promotion and markup == 'icon':
+        flags += '<img class="pro_{}" src="/pic/trans.gif" alt="{}">'.format(ICON_NAMES[promotion], promotion)
+    day = 1 + seed_id % 28
+    record = {
+        'seed_id': str(seed_id),
+        'title': title,
+        'cat': CATS[seed_id % 10],
+        'tag': PROMOTION_NAMES[promotion],
+        'size_bytes': int(float(size) * UNIT_BYTES[size_unit]),
+        'seeding': seeding,
+        'downloading': downloading,
+        'finished': finished,
+        'is_hot': 'hot' in flag_names,
+        'is_new': 'new' in flag_names,
+        'is_recommended': 'recommended' in flag_names,
+        'is_seeding': 'seeding.png' in status,
+        'is_finished': 'finished.png' in status,
+        'added_time': int(datetime(2026, 10, day, 12, tzinfo=SITE_TIMEZONE).timestamp()),
+    }
+    html = (
+        '<tr{row_class}>\n'
+        '<td class="rowfollow nowrap"><a href="#">引用</a></td>\n'
+        '<td class="rowfollow nowrap"><a href="?cat={cat_id}"><img class="c_{cat_id}" src="/pic/cattrans.gif">\n'
+        '{cat}\n</a></td>\n'
+        '<td class="rowfollow"><table class="torrentname" width="100%"><tr>{thumbnail}'
+        '<td class="embedded"><a title="{title}" href="details.php?id={seed_id}&amp;hit=1"><b>{title}</b></a>'
+        '{flags}{status}<br>副标题 {seed_id}</td>'
+        '<td class="embedded" width="20"><a href="download.php?id={seed_id}">'
+        '<img class="download" src="/pic/trans.gif" alt="download"></a></td></tr></table></td>\n'
+        '<td class="rowfollow"><a href="comment.php?id={seed_id}">0</a></td>\n'
+        '<td class="rowfollow nowrap"><span title="2026-10-{day:02d} 12:00:00">{day}天</span></td>\n'
+        '<td class="rowfollow">{size}<br>{unit}</td>\n'
+        '<td class="rowfollow" align="center">{seeding}</td>\n'
+        '<td class="rowfollow">{downloading}</td>\n'
+        '<td class="rowfollow">{finished}</td>\n'
+        '<td class="rowfollow"><a href="userdetails.php?id=2">uploader</a></td>\n'
+        '</tr>\n'
+    ).format(row_class=row_class, cat_id=401 + seed_id % 10, cat=CATS[seed_id % 10], thumbnail=thumbnail,
+             title=title, seed_id=seed_id, flags=flags, status=status, day=day, size=size,
+             unit=size_unit, seeding=seeding, downloading=downloading, finished=finished)
+    return html, record
+
+
+def make_page(rnd, first_id, rows, promotion_rate, markup='highlight'):
+    # 返回 (页面 HTML, 每一行应当解析出的字段)
+    body = []
+    records = []
+    for i in range(rows):
+        promotion = rnd.choice(PROMOTIONS) if rnd.random() < promotion_rate else ''
+        html, record = make_row(rnd, first_id - i, promotion, markup)
+        body.append(html)
+        records.append(record)
+    return PAGE_HEAD + ''.join(body) + PAGE_TAIL, records
+
+
+# (文件名, 标记方式, 行数, 促销比例)：普通情况少量促销种子，Free 活动时大部分种子都有促销
+PAGES = [
+    ('torrents_normal.html', 'highlight', 100, 0.2),
+    ('torrents_free_event.html', 'highlight', 100, 0.9),
+    ('torrents_text.html', 'text', 100, 0.4),
+    ('torrents_icon.html', 'icon', 100, 0.4),
+]
+
+
+def page_markup(name):
+    for page_name, markup, _, _ in PAGES:
+        if page_name == name:
+            return markup
+    return 'highlight'
+
+
+def main():
+    benchmark_dir = os.path.dirname(os.path.abspath(__file__))
+    out_dir = os.path.join(benchmark_dir, 'pages')
+    expected_dir = os.path.join(benchmark_dir, 'expected')
+    os.makedirs(out_dir, exist_ok=True)
+    os.makedirs(expected_dir, exist_ok=True)
+    rnd = random.Random(20261018)
+    for name, markup, rows, promotion_rate in PAGES:
+        page, records = make_page(rnd, 340000, rows, promotion_rate, markup)
+        with open(os.path.join(out_dir, name), 'w', encoding='utf-8') as f:
+            f.write(page)
+        with open(os.path.join(expected_dir, os.path.splitext(name)[0] + '.json'), 'w', encoding='utf-8') as f:
+            json.dump({'synthetic': True, 'markup': markup, 'rows': records}, f, ensure_ascii=False, indent=1)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
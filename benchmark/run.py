@@ -0,0 +1,342 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : run.py
+@Time    : 2026/10/18 18:40
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+
+离线基准测试与回归检查，不需要访问 byrbt 和 qBittorrent：
+
+    python benchmark/run.py --check                      # 解析和筛选结果与生成页面时的数据对比，并运行 checks.py
+    python benchmark/run.py --output result.json         # 记录各阶段耗时
+    python benchmark/run.py --compare baseline.json      # 与基线对比，变慢超过阈值时返回 1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+from config import ReadConfig  # noqa: E402
+from login import LoginTool  # noqa: E402
+from bot import TorrentBot  # noqa: E402
+from utils.bit_torrent_utils import BitTorrent  # noqa: E402
+from utils.eviction import EvictionPlanner  # noqa: E402
+from utils.seen_store import SeenStore  # noqa: E402
+from utils.torrent_info import TorrentInfo  # noqa: E402
+from utils.torrent_page_parser import TorrentPageParser  # noqa: E402
+from utils.tracker_client import TrackerClient  # noqa: E402
+
+from checks import run_checks  # noqa: E402
+from fake_server import FakeState, load_pages, start_server  # noqa: E402
+from make_pages import PAGES  # noqa: E402
+
+PAGES_DIR = os.path.join(BENCHMARK_DIR, 'pages')
+EXPECTED_DIR = os.path.join(BENCHMARK_DIR, 'expected')
+GiB = 1024 * 1024 * 1024
+
+CONFIG_TEMPLATE = """
+[ByrBTBot]
+byrbt-url = http://127.0.0.1:{port}/
+username = benchmark
+passwd = benchmark
+max-torrent = 100000
+max-torrent-total-size = 10000000
+torrent-max-size = 1024
+torrent-min-size = 1
+scan-rate = 0
+
+[qBittorrent]
+qbittorrent-host = 127.0.0.1
+qbittorrent-port = {port}
+qbittorrent-username = admin
+qbittorrent-password = adminadmin
+qbittorrent-download-path = /downloads
+"""
+
+
+def quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def measure(func, rounds, setup=None):
+    # 第一轮用于预热，不计入结果
+    times = list()
+    for i in range(rounds + 1):
+        if setup is not None:
+            setup()
+        with quiet():
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+        if i > 0:
+            times.append(elapsed * 1000)
+    return {
+        'rounds': rounds,
+        'min_ms': round(min(times), 3),
+        'median_ms': round(statistics.median(times), 3),
+        'mean_ms': round(statistics.mean(times), 3),
+    }
+
+
+def available_features():
+    features = ['html.parser']
+    try:
+        import lxml  # noqa: F401
+        features.append('lxml')
+    except ImportError:
+        pass
+    return features
+
+
+def record_to_dict(torrent_info):
+    record = {slot: getattr(torrent_info, slot) for slot in TorrentInfo.__slots__}
+    record['tag'] = torrent_info.tag.value
+    return record
+
+
+class Environment:
+    """启动模拟服务器，在临时目录中创建与正式运行相同的 TorrentBot"""
+
+    def __init__(self, torrent_count):
+        self.state = FakeState(torrent_count, pages=load_pages(PAGES_DIR, 'torrents_normal.html'))
+        self.server = start_server(self.state)
+        self.work_dir = tempfile.TemporaryDirectory()
+        self._old_cwd = os.getcwd()
+        # 登录 cookies 与已处理种子记录都写在 ./data 下
+        os.chdir(self.work_dir.name)
+        config_path = os.path.join(self.work_dir.name, 'config.ini')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            f.write(CONFIG_TEMPLATE.format(port=self.server.server_address[1]))
+        with quiet():
+            self.config = ReadConfig(filepath=config_path)
+            self.tracker = TrackerClient(self.config)
+            self.login = LoginTool(self.config, self.tracker)
+            self.bit_torrent = BitTorrent(self.config)
+            self.bot = TorrentBot(self.config, self.login, self.bit_torrent)
+            self.bot.initialize()
+        self._seen_count = 0
+        self.reset_seen()
+
+    def reset_seen(self):
+        self.bot.old_torrent.close()
+        self._seen_count += 1
+        self.bot.old_torrent = SeenStore(os.path.join(self.work_dir.name, 'seen{}.pkl'.format(self._seen_count)),
+                                         os.path.join(self.work_dir.name, 'seen{}.journal'.format(self._seen_count)))
+
+    def reset_added(self):
+        # 删除上一轮添加的种子，使每一轮完整流程都执行相同的操作
+        self.state.delete([info_hash for info_hash, data in list(self.state.torrents.items())
+                           if data['name'].startswith('Torrent.')])
+
+    def close(self):
+        self.bot.old_torrent.close()
+        if self.bot.history is not None:
+            self.bot.history.close()
+        self.bot.scanner.close()
+        self.server.shutdown()
+        self.server.server_close()
+        os.chdir(self._old_cwd)
+        self.work_dir.cleanup()
+
+
+def read_page(name):
+    with open(os.path.join(PAGES_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def page_results(env, name, markup, features='html.parser'):
+    parser = TorrentPageParser(env.bot._tag_map, features=features, markup=markup)
+    _, torrent_infos = parser.parse(read_page(name), env.bot._filter_tags)
+    with quiet():
+        selected = env.bot.get_ok_torrent(torrent_infos)
+    return {
+        'records': [record_to_dict(torrent_info) for torrent_info in torrent_infos],
+        'selected': [torrent_info.seed_id for torrent_info in selected],
+    }
+
+
+def expected_selection(env, records):
+    # 按 SelectionPolicy 的规则逐个判断，与向量化的实现互相独立
+    policy = env.bot.selection_policy
+    free_event = len(records) >= policy.event_threshold
+    min_ratio = policy.event_min_ratio if free_event else policy.min_ratio
+    min_size = max(policy.min_size, policy.event_min_size) if free_event else policy.min_size
+    selected = list()
+    for record in records:
+        if not min_size <= record['size_bytes'] <= policy.max_size or record['seeding'] <= 0:
+            continue
+        if record['downloading'] / record['seeding'] >= min_ratio:
+            selected.append(record['seed_id'])
+    return selected
+
+
+def check_expected(env):
+    # 每个页面的解析与筛选结果必须与生成页面时的数据（make_pages.py 写入 benchmark/expected）一致，
+    # 所有解析器的结果也必须相同
+    failed = list()
+    filter_tags = {tag.value for tag in env.bot._filter_tags}
+    for name, markup, _, _ in PAGES:
+        expected_path = os.path.join(EXPECTED_DIR, os.path.splitext(name)[0] + '.json')
+        results = [page_results(env, name, markup, features) for features in available_features()]
+        if any(result != results[0] for result in results[1:]):
+            failed.append('{}: parsers disagree'.format(name))
+            continue
+        if not os.path.exists(expected_path):
+            failed.append('{}: {} not found, run benchmark/make_pages.py'.format(name, expected_path))
+            continue
+        with open(expected_path, 'r', encoding='utf-8') as f:
+            records = [record for record in json.load(f)['rows'] if record['tag'] in filter_tags]
+        for actual, expected in zip(results[0]['records'], records):
+            if actual != expected:
+                failed.append('{}: seed {} parsed as {}, expected {}'.format(name, expected['seed_id'], actual,
+                                                                            expected))
+                break
+        if len(results[0]['records']) != len(records):
+            failed.append('{}: {} rows parsed, expected {}'.format(name, len(results[0]['records']), len(records)))
+        if results[0]['selected'] != expected_selection(env, records):
+            failed.append('{}: selected {}, expected {}'.format(name, results[0]['selected'],
+                                                                 expected_selection(env, records)))
+    return failed
+
+
+def synthetic_infos(env, count):
+    # 将记录的页面复制为 count 个 id 不同的种子，用于测试筛选
+    _, base = TorrentPageParser(env.bot._tag_map).parse(read_page('torrents_free_event.html'),
+                                                       env.bot._filter_tags)
+    torrent_infos = list()
+    for i in range(count):
+        info = base[i % len(base)]
+        torrent_infos.append(TorrentInfo(str(1000000 + i), info.title, info.cat, info.tag, info.size_bytes,
+                                         info.seeding, info.downloading, info.finished))
+    return torrent_infos
+
+
+def run_benchmarks(env, rounds):
+    timings = dict()
+    for name, markup, _, _ in PAGES:
+        content = read_page(name)
+        for features in available_features():
+            parser = TorrentPageParser(env.bot._tag_map, features=features, markup=markup)
+            timings['parse/{}/{}'.format(os.path.splitext(name)[0], features)] = measure(
+                lambda: parser.parse(content, env.bot._filter_tags), rounds)
+
+    torrent_infos = synthetic_infos(env, 5000)
+    timings['select/5000'] = measure(lambda: env.bot.get_ok_torrent(torrent_infos), rounds)
+
+    def full_sync():
+        env.bit_torrent._rid = 0
+        env.bit_torrent.get_main_data(True)
+
+    timings['sync/full'] = measure(full_sync, rounds)
+    timings['sync/delta'] = measure(lambda: env.bit_torrent.get_main_data(True), rounds, setup=env.state.tick)
+
+    torrent_list = env.bit_torrent.get_list()
+    # 数量上限比现有种子少 50 个，每次都需要规划删除
+    planner = EvictionPlanner(len(torrent_list) - 50, 0, 5000000000)
+    incoming_sizes = [50 * GiB] * 10
+    timings['evict/{}'.format(len(torrent_list))] = measure(
+        lambda: planner.plan(torrent_list, 100 * GiB, incoming_sizes), rounds)
+
+    def setup_cycle():
+        env.reset_added()
+        env.bit_torrent.get_main_data(True)
+        env.reset_seen()
+        env.bot.scanner._pages.clear()
+
+    def cycle():
+        ok_torrent, _ = env.bot.scan_once()
+        env.bot.download(ok_torrent)
+
+    timings['cycle'] = measure(cycle, rounds, setup=setup_cycle)
+
+    # 单轮完整流程对每个接口的调用次数
+    setup_cycle()
+    env.state.calls.clear()
+    with quiet():
+        cycle()
+    api_calls = dict(env.state.calls)
+    return timings, api_calls
+
+
+def compare(timings, baseline_path, threshold):
+    # 返回最短耗时变慢超过 threshold 的项目，最短耗时受机器负载的影响最小
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['timings']
+    regressions = list()
+    for name, result in sorted(timings.items()):
+        if name not in baseline:
+            continue
+        ratio = result['min_ms'] / max(baseline[name]['min_ms'], 1e-6)
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print('{:<45} {:>10.3f} ms {:>10.3f} ms {:>7.2f}x{}'.format(
+            name, baseline[name]['min_ms'], result['min_ms'], ratio, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='offline benchmark and regression check')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--torrents', type=int, default=5000, help='torrents in the fake qBittorrent')
+    parser.add_argument('--check', action='store_true',
+                        help='compare parse results with benchmark/expected and run the checks in checks.py')
+    parser.add_argument('--output', help='write timings to this json file')
+    parser.add_argument('--compare', help='baseline json written by --output')
+    parser.add_argument('--threshold', type=float, default=0.5, help='allowed slowdown of the minimum time')
+    args = parser.parse_args()
+
+    env = Environment(args.torrents)
+    exit_code = 0
+    try:
+        if args.check:
+            failed = check_expected(env) + run_checks()
+            for message in failed:
+                print('[FAIL] ' + message)
+            if len(failed) > 0:
+                exit_code = 1
+            else:
+                print('expected results ok')
+            if args.output is None and args.compare is None:
+                return exit_code
+
+        timings, api_calls = run_benchmarks(env, args.rounds)
+        for name, result in sorted(timings.items()):
+            print('{:<45} median {:>10.3f} ms  min {:>10.3f} ms'.format(name, result['median_ms'], result['min_ms']))
+        print('api calls per cycle: ' + json.dumps(api_calls, sort_keys=True))
+        if args.output is not None:
+            with open(os.path.join(env._old_cwd, args.output), 'w', encoding='utf-8') as f:
+                json.dump({
+                    'python': platform.python_version(),
+                    'features': available_features(),
+                    'torrents': args.torrents,
+                    'timings': timings,
+                    'api_calls': api_calls,
+                }, f, indent=1, sort_keys=True)
+                f.write('\n')
+        if args.compare is not None:
+            regressions = compare(timings, os.path.join(env._old_cwd, args.compare), args.threshold)
+            if len(regressions) > 0:
+                print('{} benchmark(s) slower than the baseline by more than {:.0%}'.format(
+                    len(regressions), args.threshold))
+                exit_code = 1
+    finally:
+        env.close()
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,441 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : simulate.py
+@Time    : 2026/10/18 23:10
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+
+离线比较种子选择和删除策略，不访问网络、不等待：
+
+    python benchmark/simulate.py                                   # 合成 90 天、10000 个 Free 种子，比较所有策略
+    python benchmark/simulate.py --days 180 --policy default --policy loose
+    python benchmark/simulate.py --history data/history.db         # 回放 history.db 中记录的扫描结果
+    python benchmark/simulate.py --model data/upload_model.npz     # 加入上传收益模型（utils/scoring.py）对比
+
+选择规则（SelectionPolicy）、预留（AdmissionController）和删除规划（EvictionPlanner）与 bot.py
+使用同一份代码，qBittorrent 由 SimClient 代替：上传速度按 下载人数/(做种人数+1) 分配，总量受上传带宽限制；
+下载人数按 --swarm-days 指数衰减。统计上传量、下载量（按促销折算）、添加和删除的数据量以及 API 调用次数。
+"""
+
+import argparse
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+from utils.admission import AdmissionController, rank_key  # noqa: E402
+from utils.eviction import EvictionPlanner  # noqa: E402
+from utils.history_store import FLAG_HOT, FLAG_NEW, FLAG_RECOMMENDED  # noqa: E402
+from utils.scoring import UploadModel  # noqa: E402
+from utils.selection import SelectionPolicy  # noqa: E402
+from utils.torrent_info import Promotion, TorrentInfo  # noqa: E402
+
+GiB = 1024 * 1024 * 1024
+MiB = 1024 * 1024
+CATEGORIES = ['电影', '剧集', '动漫', '音乐', '综艺', '游戏', '软件', '资料', '体育', '纪录']
+# 促销对下载量和上传量的折算
+DOWNLOAD_FACTOR = {
+    Promotion.FREE: 0.0, Promotion.TWO_UP_FREE: 0.0, Promotion.HALF_DOWN: 0.5, Promotion.TWO_UP_HALF_DOWN: 0.5,
+    Promotion.THIRTY_PERCENT_DOWN: 0.3,
+}
+UPLOAD_FACTOR = {Promotion.TWO_UP: 2.0, Promotion.TWO_UP_FREE: 2.0, Promotion.TWO_UP_HALF_DOWN: 2.0}
+
+
+class SyntheticHistory:
+    """合成的扫描历史：torrent_count 个种子在 days 天内依次变为 Free，Free 时长服从指数分布，
+
+    每 event_days 天有一次持续一天的 Free 活动，期间额外出现 event_torrents 个种子。
+    种子刚出现时下载人数多、做种人数少，之后下载人数按 swarm_days 衰减并逐渐转为做种。
+    """
+
+    def __init__(self, torrent_count=10000, days=90, seed=0, free_hours=3.0, event_days=30, event_torrents=300,
+                 swarm_days=2.0, epoch=1767196800):
+        rnd = np.random.default_rng(seed)
+        self.days = days
+        self.epoch = epoch
+        self.swarm_seconds = swarm_days * 86400
+        duration = days * 86400
+        event_starts = np.arange(event_days, days, event_days) * 86400.0 if event_days > 0 else np.zeros(0)
+        event_count = min(len(event_starts) * event_torrents, torrent_count)
+        normal_count = torrent_count - event_count
+
+        start = rnd.uniform(0, duration, normal_count)
+        until = start + np.minimum(rnd.exponential(free_hours * 3600, normal_count), 7 * 86400)
+        if event_count > 0:
+            event_index = np.arange(event_count) // event_torrents
+            event_start = event_starts[event_index] + rnd.uniform(0, 3600, event_count)
+            start = np.concatenate([start, event_start])
+            until = np.concatenate([until, event_starts[event_index] + 86400])
+        order = np.argsort(start, kind='stable')
+        self.start = start[order] + epoch
+        self.until = until[order] + epoch
+        count = len(self.start)
+        self.size = np.clip(rnd.lognormal(math.log(10 * GiB), 1.2, count), 100 * MiB, 500 * GiB).astype(np.int64)
+        # 70% 是新发布的种子，其余是被设为 Free 的旧种子
+        fresh = rnd.random(count) < 0.7
+        self.leechers = np.where(fresh, rnd.lognormal(math.log(30), 1.0, count),
+                                 rnd.lognormal(math.log(10), 1.0, count))
+        self.seeders = np.where(fresh, rnd.integers(1, 4, count), rnd.lognormal(math.log(50), 1.0, count))
+        self.finished = np.where(fresh, 0, rnd.lognormal(math.log(200), 1.0, count)).astype(np.int64)
+        two_up = rnd.random(count) < 0.2
+        categories = rnd.integers(0, len(CATEGORIES), count)
+        # 新种子的发布时间即为出现时间，旧种子发布于 1-365 天前
+        added_time = np.where(fresh, self.start, self.start - rnd.uniform(86400, 365 * 86400, count))
+        self.infos = [TorrentInfo(str(100000 + i), 'Synthetic.{}'.format(i), CATEGORIES[categories[i]],
+                                  Promotion.TWO_UP_FREE if two_up[i] else Promotion.FREE, int(self.size[i]),
+                                  0, 0, 0, added_time=float(added_time[i])) for i in range(count)]
+
+    def cycles(self, interval):
+        # 依次返回 (时间, 当前 Free 列表中的种子)
+        listed = dict()
+        next_index = 0
+        count = len(self.start)
+        now = float(self.epoch)
+        end = self.epoch + self.days * 86400
+        while now < end:
+            while next_index < count and self.start[next_index] <= now:
+                listed[next_index] = self.until[next_index]
+                next_index += 1
+            for index in [index for index, until in listed.items() if until <= now]:
+                del listed[index]
+            indexes = np.fromiter(listed.keys(), dtype=np.int64, count=len(listed))
+            decay = np.exp(-(now - self.start[indexes]) / self.swarm_seconds)
+            leechers = self.leechers[indexes] * decay
+            seeders = self.seeders[indexes] + self.leechers[indexes] * (1 - decay) * 0.8
+            finished = self.finished[indexes] + self.leechers[indexes] * (1 - decay)
+            infos = list()
+            for i, index in enumerate(indexes.tolist()):
+                info = self.infos[index]
+                info.seeding = int(seeders[i])
+                info.downloading = int(leechers[i])
+                info.finished = int(finished[i])
+                infos.append(info)
+            yield now, infos
+            now += interval
+
+
+class RecordedHistory:
+    """history.db 中记录的扫描结果，每次记录的扫描作为一个周期"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def cycles(self, interval=None):
+        connection = sqlite3.connect(self.path)
+        try:
+            cursor = connection.execute('''
+                SELECT r.scan_id, r.time, r.seed_id, r.tag, r.size_bytes, r.seeding, r.downloading, r.finished,
+                       t.title, t.cat, r.flags, t.added_time
+                FROM scan_rows r JOIN torrents t ON t.seed_id = r.seed_id
+                ORDER BY r.scan_id''')
+            scan_id = None
+            scan_time = None
+            infos = list()
+            for row in cursor:
+                if row[0] != scan_id:
+                    if scan_id is not None:
+                        yield scan_time, infos
+                    scan_id, scan_time, infos = row[0], row[1], list()
+                flags = row[10]
+                infos.append(TorrentInfo(str(row[2]), row[8], row[9], Promotion(row[3]), row[4], row[5], row[6],
+                                         row[7], is_hot=bool(flags & FLAG_HOT), is_new=bool(flags & FLAG_NEW),
+                                         is_recommended=bool(flags & FLAG_RECOMMENDED),
+                                         added_time=row[11] if row[11] is not None else -1))
+            if scan_id is not None:
+                yield scan_time, infos
+        finally:
+            connection.close()
+
+
+class SimStatus:
+    __slots__ = ('downloading', 'seeding')
+    checking = False
+    paused = False
+
+    def __init__(self, downloading):
+        self.downloading = downloading
+        self.seeding = not downloading
+
+
+class SimTorrent:
+    """EvictionPlanner 使用的 Torrent 属性"""
+
+    __slots__ = ('id', 'name', 'date_added', 'total_size', 'rateUpload', 'ewma', 'status')
+
+    def __init__(self, info_hash, name, date_added, total_size, rate, ewma, downloading):
+        self.id = info_hash
+        self.name = name
+        self.date_added = date_added
+        self.total_size = total_size
+        self.rateUpload = rate
+        self.ewma = ewma
+        self.status = SimStatus(downloading)
+
+
+class SimClient:
+    """模拟的 qBittorrent，所有种子的状态保存在 numpy 数组中，每个周期一次性更新"""
+
+    def __init__(self, disk_size, upload_speed, download_speed, peer_speed, swarm_seconds, halflife=1800,
+                 rows=64):
+        self.disk_size = disk_size
+        self.upload_speed = upload_speed
+        self.download_speed = download_speed
+        self.peer_speed = peer_speed
+        self.swarm_seconds = swarm_seconds
+        self.halflife = halflife
+        self.now = None
+        self.calls = Counter()
+        self.used = 0
+        self.uploaded = 0.0
+        self.credited = 0.0
+        self.downloaded = 0.0
+        self.charged = 0.0
+        self._rows = dict()
+        self._hashes = [None] * rows
+        self._names = [None] * rows
+        self._columns = ('alive', 'size', 'left', 'added', 'rate', 'ewma', 'leechers', 'seeders', 'observed',
+                         'up_factor', 'down_factor')
+        self.alive = np.zeros(rows, dtype=bool)
+        for name in self._columns[1:]:
+            setattr(self, name, np.zeros(rows, dtype=np.float64))
+        self._free_rows = list(range(rows - 1, -1, -1))
+
+    def _grow(self):
+        rows = len(self.alive)
+        for name in self._columns:
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column, np.zeros(rows, dtype=column.dtype)]))
+        self._hashes.extend([None] * rows)
+        self._names.extend([None] * rows)
+        self._free_rows = list(range(rows * 2 - 1, rows - 1, -1)) + self._free_rows
+
+    def free_space(self):
+        return self.disk_size - self.used
+
+    def step(self, now):
+        if self.now is None or now <= self.now:
+            self.now = now
+            return
+        dt = now - self.now
+        self.now = now
+        alive = self.alive
+        downloading = alive & (self.left > 0)
+        count = int(np.count_nonzero(downloading))
+        if count > 0:
+            got = np.where(downloading, np.minimum(self.left, self.download_speed / count * dt), 0)
+            self.left -= got
+            self.downloaded += float(got.sum())
+            self.charged += float((got * self.down_factor).sum())
+        # 下载人数自上次观察后衰减，下载完成的人转为做种
+        decay = np.exp(-(now - self.observed) / self.swarm_seconds)
+        leechers = self.leechers * decay
+        seeders = self.seeders + self.leechers * (1 - decay) * 0.8
+        done = 1 - self.left / np.maximum(self.size, 1)
+        demand = np.where(alive, self.peer_speed * leechers / (seeders + 1) * done, 0)
+        total = float(demand.sum())
+        rate = demand * min(1.0, self.upload_speed / total) if total > 0 else demand
+        self.rate = rate
+        self.uploaded += float(rate.sum()) * dt
+        self.credited += float((rate * self.up_factor).sum()) * dt
+        self.ewma += (1 - 0.5 ** (dt / self.halflife)) * (rate - self.ewma)
+
+    def observe(self, torrent_infos):
+        # 扫描到的种子更新做种和下载人数
+        for torrent_info in torrent_infos:
+            row = self._rows.get(torrent_info.seed_id)
+            if row is not None:
+                self.leechers[row] = torrent_info.downloading
+                self.seeders[row] = torrent_info.seeding
+                self.observed[row] = self.now
+
+    def torrents(self):
+        return [SimTorrent(self._hashes[row], self._names[row], self.added[row], int(self.size[row]),
+                           self.rate[row], self.ewma[row], self.left[row] > 0) for row in self._rows.values()]
+
+    def sync(self):
+        self.calls['sync/maindata'] += 1
+
+    def add(self, torrent_infos):
+        self.calls['torrents/add'] += 1
+        for torrent_info in torrent_infos:
+            if len(self._free_rows) == 0:
+                self._grow()
+            row = self._free_rows.pop()
+            self._rows[torrent_info.seed_id] = row
+            self._hashes[row] = torrent_info.seed_id
+            self._names[row] = torrent_info.title
+            self.alive[row] = True
+            self.size[row] = self.left[row] = torrent_info.size_bytes
+            self.added[row] = self.observed[row] = self.now
+            self.rate[row] = self.ewma[row] = 0
+            self.leechers[row] = torrent_info.downloading
+            self.seeders[row] = torrent_info.seeding
+            self.up_factor[row] = UPLOAD_FACTOR.get(torrent_info.tag, 1.0)
+            self.down_factor[row] = DOWNLOAD_FACTOR.get(torrent_info.tag, 1.0)
+            self.used += torrent_info.size_bytes
+
+    def remove(self, torrents):
+        self.calls['torrents/delete'] += 1
+        for torrent in torrents:
+            row = self._rows.pop(torrent.id)
+            self.alive[row] = False
+            self.used -= torrent.total_size
+            self._free_rows.append(row)
+
+
+class SlowestFirstPlanner(EvictionPlanner):
+    # 先删除上传最慢的种子，速度相同时先删除最早添加的
+    def sort_key(self, torrent):
+        return self.rate_of(torrent), torrent.date_added
+
+
+class Policy:
+    def __init__(self, name, description, selection=None, planner_class=EvictionPlanner, rate='ewma'):
+        self.name = name
+        self.description = description
+        self.selection = selection or dict()
+        self.planner_class = planner_class
+        self.rate = rate
+
+
+POLICIES = [
+    Policy('default', 'bot.py 当前的规则，删除时使用上传速度的 EWMA'),
+    Policy('current-rate', '删除时使用瞬时上传速度', rate='current'),
+    Policy('slowest-first', '先删除上传最慢的种子', planner_class=SlowestFirstPlanner),
+    Policy('strict', '正常时 下载数/做种数 >= 1.5', selection={'min_ratio': 1.5}),
+    Policy('loose', '正常时 >= 0.3，Free 活动时 >= 5 且不小于 5GiB',
+           selection={'min_ratio': 0.3, 'event_min_ratio': 5.0, 'event_min_size': 5 * GiB}),
+]
+
+
+def simulate(policy, history, args):
+    client = SimClient(args.disk_gib * GiB, args.upload_mbps * 1000000 / 8, args.download_mbps * 1000000 / 8,
+                       args.peer_kib * 1024, args.swarm_days * 86400)
+    selection = SelectionPolicy(args.min_size_gib * GiB, args.max_size_gib * GiB, **policy.selection)
+    rate_of = (lambda torrent: torrent.ewma) if policy.rate == 'ewma' else None
+    planner = policy.planner_class(args.max_torrent, args.max_total_gib * GiB, args.min_free_gib * GiB,
+                                   rate_of=rate_of)
+    admission = AdmissionController(planner, ttl=float('inf'))
+    seen = set()
+    stats = Counter()
+
+    def evict(torrents):
+        if len(torrents) > 0:
+            client.remove(torrents)
+            stats['evicted'] += len(torrents)
+            stats['evicted_bytes'] += sum(torrent.total_size for torrent in torrents)
+
+    start = time.perf_counter()
+    for now, torrent_infos in history.cycles(args.interval):
+        stats['cycles'] += 1
+        client.step(now)
+        client.observe(torrent_infos)
+        client.calls['torrents.php'] += 1
+        # housekeeping 中的增量同步
+        client.sync()
+        result = selection.select(torrent_infos, seen, now)
+        if len(result.accepted) > 0:
+            accepted = admission.reserve(result.accepted, client.torrents(), client.free_space(),
+                                         key=rank_key if result.scores is None else None)
+            client.calls['download.php'] += len(accepted)
+            if len(accepted) > 0:
+                # make_room 同步一次后统一规划删除，一次添加放得下的种子
+                client.sync()
+                plan = planner.plan(client.torrents(), client.free_space(),
+                                    [torrent_info.size_bytes for torrent_info in accepted])
+                evict(plan.evict)
+                admitted = accepted[:plan.admit_count]
+                if len(admitted) > 0:
+                    client.add(admitted)
+                    seen.update(torrent_info.seed_id for torrent_info in admitted)
+                    stats['added'] += len(admitted)
+                    stats['added_bytes'] += sum(torrent_info.size_bytes for torrent_info in admitted)
+                for torrent_info in accepted:
+                    admission.release(torrent_info.seed_id)
+        if client.free_space() <= planner.min_free_space:
+            client.sync()
+            evict(planner.plan(client.torrents(), client.free_space()).evict)
+
+    return {
+        'policy': policy.name,
+        'cycles': stats['cycles'],
+        'uploaded_gib': client.uploaded / GiB,
+        'credited_gib': client.credited / GiB,
+        'downloaded_gib': client.downloaded / GiB,
+        'charged_gib': client.charged / GiB,
+        'added': stats['added'],
+        'evicted': stats['evicted'],
+        'churn_gib': (stats['added_bytes'] + stats['evicted_bytes']) / GiB,
+        'api_calls': sum(client.calls.values()),
+        'calls': dict(client.calls),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='compare selection and eviction policies offline')
+    parser.add_argument('--policy', action='append', choices=[policy.name for policy in POLICIES],
+                        help='policies to compare, default all')
+    parser.add_argument('--history', help='replay scans recorded in this history.db instead of synthetic ones')
+    parser.add_argument('--days', type=float, default=90, help='synthetic history length')
+    parser.add_argument('--torrents', type=int, default=10000, help='synthetic free torrents')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--interval', type=float, default=300, help='seconds between synthetic scans')
+    parser.add_argument('--free-hours', type=float, default=3.0, help='mean free duration of synthetic torrents')
+    parser.add_argument('--swarm-days', type=float, default=2.0, help='leechers decay time constant')
+    parser.add_argument('--max-torrent', type=int, default=20)
+    parser.add_argument('--max-total-gib', type=float, default=1024)
+    parser.add_argument('--disk-gib', type=float, default=2048)
+    parser.add_argument('--min-free-gib', type=float, default=5)
+    parser.add_argument('--min-size-gib', type=float, default=1)
+    parser.add_argument('--max-size-gib', type=float, default=512)
+    parser.add_argument('--upload-mbps', type=float, default=100)
+    parser.add_argument('--download-mbps', type=float, default=100)
+    parser.add_argument('--peer-kib', type=float, default=100, help='upload speed per leecher/seeder ratio unit')
+    parser.add_argument('--model', help='also compare the upload model trained by utils/scoring.py')
+    parser.add_argument('--min-yield', type=float, default=0.1, help='score-min-yield of the model policy')
+    parser.add_argument('--json', help='also write results to this json file')
+    args = parser.parse_args(argv)
+
+    if args.history is not None:
+        history = RecordedHistory(args.history)
+    else:
+        history = SyntheticHistory(args.torrents, args.days, args.seed, args.free_hours,
+                                   swarm_days=args.swarm_days)
+    policies = list(POLICIES)
+    if args.model is not None:
+        model = UploadModel.load(args.model)
+        if model is None:
+            print('cannot load {}'.format(args.model))
+            return 1
+        policies.append(Policy('model', '按上传收益模型选择和排序',
+                               selection={'model': model, 'min_score': args.min_yield}))
+    names = (args.policy or [policy.name for policy in POLICIES]) + (['model'] if args.model is not None else [])
+    results = [simulate(policy, history, args) for policy in policies if policy.name in names]
+
+    columns = ['policy', 'cycles', 'uploaded_gib', 'credited_gib', 'charged_gib', 'added', 'evicted', 'churn_gib',
+               'api_calls', 'seconds']
+    print('  '.join('{:>14}'.format(column) for column in columns))
+    for result in results:
+        print('  '.join('{:>14.2f}'.format(result[column]) if isinstance(result[column], float)
+                        else '{:>14}'.format(result[column]) for column in columns))
+    for result in results:
+        print('{}: {}'.format(result['policy'], json.dumps(result['calls'], sort_keys=True)))
+    if args.json is not None:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1, ensure_ascii=False)
+            f.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,24 +10,55 @@
 from config import ReadConfig
 from login import LoginTool
 
+import argparse
+import logging
 import signal
 import sys
-import os
-import pickle
 import re
 import time
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import ContextDecorator
-from requests.cookies import RequestsCookieJar
-from bs4 import BeautifulSoup
 
+from utils.admission import AdmissionController, rank_key
 from utils.bit_torrent_utils import BitTorrent
+from utils.download_limiter import QUEUED_TAG, DownloadLimiter
+from utils.eviction import EvictionPlanner
+from utils.history_store import HistoryStore
+from utils.log import setup_logging
+from utils.metrics import ACTIVE_DOWNLOADS, FREE_SPACE, LAST_SCAN, MANAGED_TORRENTS, QUEUED_DOWNLOADS, \
+    SCAN_INTERVAL, TORRENTS, TRANSFER_SPEED, MetricsServer, timed_phase
+from utils.pipeline import Pipeline
+from utils.profiling import CycleProfiler
+from utils.rate_history import RateHistory
+from utils.scan_scheduler import ScanScheduler
+from utils.scoring import UploadModel
+from utils.seen_store import SeenStore
+from utils.selection import SelectionPolicy
+from utils.torrent_info import Promotion
+from utils.torrent_meta import inspect_torrent
+from utils.torrent_feed import TorrentFeed
+from utils.torrent_page_parser import MARKUP_HIGHLIGHT, TorrentPageParser
+from utils.torrent_scanner import TorrentScanner
+from utils.tracker_client import TrackerClient
+
+
+logger = logging.getLogger('byrbt_bot')
 
 
 def _handle_interrupt(signum, frame):
     sys.exit()  # will trigger a exception, causing __exit__ to be called
 
 
+class Candidate:
+    __slots__ = ('torrent_info', 'download_url', 'content', 'meta')
+
+    def __init__(self, torrent_info, download_url, content, meta):
+        self.torrent_info = torrent_info
+        self.download_url = download_url
+        self.content = content
+        self.meta = meta
+
+
 class TorrentBot(ContextDecorator):
     def __init__(self, config, login, torrent_util):
         super(TorrentBot, self).__init__()
@@ -35,15 +66,14 @@ class TorrentBot(ContextDecorator):
         self.login = login
         self.torrent_util = torrent_util
         self.base_url = str(config.get_bot_config("byrbt-url"))
-        self.torrent_url = self._get_url('torrents.php')
-        self.cookie_jar = RequestsCookieJar()
-        self.byrbt_cookies = login.load_cookie()
-        if self.byrbt_cookies is not None:
-            for k, v in self.byrbt_cookies.items():
-                self.cookie_jar[k] = v
-
-        self.old_torrent = list()
+        self.tracker = login.tracker
+        self.client_ready_timeout = float(config.get_qbittorrent_config("qbittorrent-ready-timeout") or 60)
+
         self.torrent_download_record_save_path = './data/torrent.pkl'
+        self.torrent_download_journal_path = './data/torrent.journal'
+        seen_expire_days = int(config.get_bot_config("seen-expire-days") or 365)
+        self.old_torrent = SeenStore(self.torrent_download_record_save_path, self.torrent_download_journal_path,
+                                     max_age=max(seen_expire_days, 0) * 86400)
         self.max_torrent_count = int(config.get_bot_config("max-torrent"))
         # all size in Byte
         self.max_torrent_total_size = int(config.get_bot_config("max-torrent-total-size"))
@@ -52,89 +82,169 @@ class TorrentBot(ContextDecorator):
         self.max_torrent_total_size = self.max_torrent_total_size * 1024 * 1024 * 1024
         self.torrent_max_size = int(config.get_bot_config("torrent-max-size"))
         if self.torrent_max_size is None or self.torrent_max_size > 1024:
-            print("torrent-max-size wrong setting, Use default setting: torrent-max-size: 1024G")
+            logger.warning("torrent-max-size wrong setting, Use default setting: torrent-max-size: 1024G")
             self.torrent_max_size = 1024
         self.torrent_max_size = self.torrent_max_size * 1024 * 1024 * 1024
         self.torrent_min_size = int(config.get_bot_config("torrent-min-size"))
         if self.torrent_min_size is None or self.torrent_min_size < 1:
-            print("torrent-min-size wrong setting, Use default setting: torrent-min-size: 1G")
+            logger.warning("torrent-min-size wrong setting, Use default setting: torrent-min-size: 1G")
             self.torrent_min_size = 1
         self.torrent_min_size = self.torrent_min_size * 1024 * 1024 * 1024
         if self.torrent_min_size > self.torrent_max_size:
-            print("torrent-min-size is greater than torrent-max-size, please check config.ini! Use default setting: "
-                  "torrent-max-size: 1024G, torrent-min-size: 1G")
+            logger.warning("torrent-min-size is greater than torrent-max-size, please check config.ini! "
+                           "Use default setting: torrent-max-size: 1024G, torrent-min-size: 1G")
             self.torrent_max_size = 1024 * 1024 * 1024 * 1024
             self.torrent_min_size = 1 * 1024 * 1024 * 1024
-
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.113 Safari/537.36'}
-        self._filter_tags = ['免费', '免费&2x上传']
+        # 获取可用的种子的策略，可自行修改（benchmark/simulate.py 可以离线比较不同的参数）
+        self.selection_policy = SelectionPolicy(
+            self.torrent_min_size, self.torrent_max_size,
+            min_score=float(config.get_bot_config("score-min-yield") or 0.1))
+        # 离线训练的上传收益模型，文件不存在或无法读取时使用上面的规则
+        self.score_model_path = config.get_bot_config("score-model")
+        self.score_model_path = './data/upload_model.npz' if self.score_model_path is None \
+            else self.score_model_path.strip()
+        self.min_free_space = 5000000000  # 5GB
+        self.scan_scheduler = ScanScheduler(
+            min_interval=int(config.get_bot_config("scan-interval-min") or 15),
+            max_interval=int(config.get_bot_config("scan-interval-max") or 600))
+        self.free_event = False
+        # 上一次扫描的可用种子，一直没有空间或获取失败的种子不再算作新种子
+        self._last_candidate_ids = set()
+        # 添加种子、下载完成或剩余空间不足时检查磁盘，否则最多每 30 分钟检查一次
+        self.check_disk_space_interval_in_sec = 1800
+        self.min_check_disk_space_interval_in_sec = 10
+        self.sync_interval_in_sec = 30
+        self._last_check_disk_space_time = -1
+        self._last_sync_time = -1
+        self._disk_dirty = True
+        self.pipeline = None
+        # 本地指标接口的端口，0 表示不开启
+        self.metrics_host = str(config.get_bot_config("metrics-host") or '127.0.0.1').strip()
+        self.metrics_port = int(config.get_bot_config("metrics-port") or 0)
+        self.metrics_server = None
+        # 上传速度历史，删除种子时按 EWMA 而不是瞬时速度判断
+        self.rate_history = RateHistory('./data/rate_history.npz',
+                                        halflife=float(config.get_bot_config("rate-halflife-minutes") or 30) * 60)
+        self.rate_history_save_interval_in_sec = 600
+        self._last_rate_history_save_time = int(time.time())
+        # 扫描、添加决策和删除记录，配置为空时不记录
+        history_db = config.get_bot_config("history-db")
+        history_db = './data/history.db' if history_db is None else history_db.strip()
+        history_retention_days = float(config.get_bot_config("history-retention-days") or 0)
+        self.history = HistoryStore(history_db, retention=history_retention_days * 86400) if history_db else None
+        self.eviction_planner = EvictionPlanner(self.max_torrent_count, self.max_torrent_total_size,
+                                                self.min_free_space, rate_of=self.rate_history.rate_of)
+        self.admission = AdmissionController(self.eviction_planner)
+        # 新种子暂停添加，按实测带宽和优先级依次开始下载；为 0 时添加后立即开始
+        download_target_minutes = float(config.get_bot_config("download-target-minutes") or 0)
+        self.download_limiter = None
+        if download_target_minutes > 0:
+            self.download_limiter = DownloadLimiter(
+                target_seconds=download_target_minutes * 60,
+                max_active=int(config.get_bot_config("max-active-downloads") or 0))
+
+        self._filter_tags = [Promotion.FREE, Promotion.TWO_UP_FREE]
         self._tag_map = {
             # highlight & tag
-            'free': '免费',
-            'twoup': '2x上传',
-            'twoupfree': '免费&2x上传',
-            'halfdown': '50%下载',
-            'twouphalfdown': '50%下载&2x上传',
-            'thirtypercentdown': '30%下载',
+            'free': Promotion.FREE,
+            'twoup': Promotion.TWO_UP,
+            'twoupfree': Promotion.TWO_UP_FREE,
+            'halfdown': Promotion.HALF_DOWN,
+            'twouphalfdown': Promotion.TWO_UP_HALF_DOWN,
+            'thirtypercentdown': Promotion.THIRTY_PERCENT_DOWN,
             # icon
-            '2up': '2x上传',
-            'free2up': '免费&2x上传',
-            '50pctdown': '50%下载',
-            '50pctdown2up': '50%下载&2x上传',
-            '30pctdown': '30%下载',
-        }
-        self._cat_map = {
-            '电影': 'movie',
-            '剧集': 'episode',
-            '动漫': 'anime',
-            '音乐': 'music',
-            '综艺': 'show',
-            '游戏': 'game',
-            '软件': 'software',
-            '资料': 'material',
-            '体育': 'sport',
-            '记录': 'documentary',
+            '2up': Promotion.TWO_UP,
+            'free2up': Promotion.TWO_UP_FREE,
+            '50pctdown': Promotion.HALF_DOWN,
+            '50pctdown2up': Promotion.TWO_UP_HALF_DOWN,
+            '30pctdown': Promotion.THIRTY_PERCENT_DOWN,
         }
+        self.page_parser = TorrentPageParser(
+            self._tag_map, markup=str(config.get_bot_config("promotion-markup") or MARKUP_HIGHLIGHT).strip())
+        scan_rate = float(config.get_bot_config("scan-rate") or 2)
+        if str(config.get_bot_config("discovery-mode") or 'html').strip() == 'rss':
+            # 通过 RSS 发现新种子，只对新条目查询促销信息
+            self.scanner = TorrentFeed(
+                self.tracker, self.page_parser, self._filter_tags, str(config.get_bot_config("rss-url")),
+                self.old_torrent, min_size=self.torrent_min_size, max_size=self.torrent_max_size, rate=scan_rate,
+                recheck_interval=float(config.get_bot_config("rss-recheck-minutes") or 30) * 60)
+        else:
+            scan_categories = str(config.get_bot_config("scan-categories") or '')
+            self.scanner = TorrentScanner(
+                self.tracker, self.page_parser, self._filter_tags,
+                pages=int(config.get_bot_config("scan-pages") or 1),
+                categories=[cat.strip() for cat in scan_categories.split(',') if cat.strip() != ''],
+                workers=int(config.get_bot_config("scan-workers") or 4),
+                rate=scan_rate)
 
     def __enter__(self):
-        print('启动byrbt_bot!')
-        time.sleep(5)  # wait transmission process
+        logger.info('启动byrbt_bot!')
         signal.signal(signal.SIGINT, _handle_interrupt)
         signal.signal(signal.SIGTERM, _handle_interrupt)
-        os.makedirs(os.path.dirname(self.torrent_download_record_save_path), mode=0o755, exist_ok=True)
-        if os.path.exists(self.torrent_download_record_save_path):
-            self.old_torrent = pickle.load(open(self.torrent_download_record_save_path, 'rb'))
+        try:
+            self.initialize()
+        except BaseException:
+            # __exit__ 不会执行，这里关闭已经打开的文件和线程，读取可能不完整，不保存数据
+            self._close(save=False)
+            raise
+        if self.metrics_port > 0:
+            self.metrics_server = MetricsServer(self.metrics_port, self.metrics_host).start()
+            logger.info('metrics: http://%s:%d/metrics', *self.metrics_server.address)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        print('退出')
-        print('保存数据')
-        pickle.dump(self.old_torrent, open(self.torrent_download_record_save_path, 'wb'), protocol=2)
+        logger.info('退出')
+        if self.pipeline is not None:
+            self.pipeline.stop()
+        self._close(save=True)
+
+    def _close(self, save):
+        if save:
+            logger.info('保存数据')
+            self.rate_history.save()
+        self.old_torrent.close(compact=save)
+        if self.history is not None:
+            self.history.close()
+        self.scanner.close()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+
+    def initialize(self):
+        # 等待 qBittorrent 启动并登录、检查 byrbt cookies、读取已处理种子记录，三者互不依赖，同时进行
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=5, thread_name_prefix='init') as executor:
+            client_ready = executor.submit(self.torrent_util.connect, self.client_ready_timeout)
+            cookies = executor.submit(self.login.load_cookie)
+            seen_loaded = executor.submit(self.old_torrent.load)
+            history_loaded = executor.submit(self.rate_history.load)
+            history_opened = executor.submit(self.history.open) if self.history is not None else None
+            model_loaded = executor.submit(UploadModel.load, self.score_model_path)
+            seen_loaded.result()
+            history_loaded.result()
+            if history_opened is not None:
+                history_opened.result()
+            self.selection_policy.model = model_loaded.result()
+            # cookies 已经设置到 tracker 中，这里只等待读取完成
+            cookies.result()
+            if not client_ready.result():
+                raise RuntimeError('qBittorrent is not available')
+        model = self.selection_policy.model
+        if model is not None:
+            logger.info('upload model loaded: %d samples, trained at %s', model.sample_count,
+                        time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(model.trained_time)))
+        logger.info('initialized in %.3f s', time.monotonic() - start)
 
     def _get_url(self, url):
         return self.base_url + url
 
-    def _get_tag(self, tag):
-        try:
-            if tag == '':
-                return ''
-            else:
-                tag = tag.split('_')[0]
-
-            return self._tag_map[tag]
-        except KeyError:
-            return ''
-
     def get_user_info(self, user_info_block):
-        print("user info:")
         try:
             user_name = user_info_block.select_one('.nowrap').text
             user_info_text = user_info_block.text
             index_s = user_info_text.find('等级')
             index_e = user_info_text.find('当前活动')
             if index_s == -1 or index_e == -1:
-                print("[]")
+                logger.info('user info: []')
                 return
             user_info_text = user_info_text[index_s:index_e]
             user_info_text = re.sub("[\xa0\n]", ' ', user_info_text)
@@ -142,364 +252,387 @@ class TorrentBot(ContextDecorator):
             user_info_text = re.sub(" *: *", ':', user_info_text).strip()
             user_info_text = re.sub("\s+", ' ', user_info_text)
             user_info_text = "用户名:" + user_name + " " + user_info_text
-            print(user_info_text)
+            logger.info('user info: %s', user_info_text)
 
         except Exception as e:
-            print("user info not found!")
-            print('[ERROR] ' + repr(e))
+            logger.warning('user info not found: %r', e)
 
     def get_torrent_info_filter_by_tag(self, table, filter_tags):
         assert isinstance(table, list)
-        start_idx = 1  # static offset
-        torrent_infos = list()
-        for item in table:
-            torrent_info = dict()
-            tds = item.find_all('td', recursive=False)
-            # tds[0] 是 引用
-
-            # tds[1] 是分类
-            cat = tds[start_idx].find('a').text.strip()
-
-            # 主要信息的td
-            main_td = tds[start_idx + 1].select('table > tr > td')[0]
-            if main_td.find('div'):
-                main_td = tds[start_idx + 1].select('table > tr > td')[1]
-
-            # 链接
-            href = main_td.select('a')[0].attrs['href']
-
-            # 种子id
-            seed_id = re.findall(r'id=(\d+)', href)[0]
-
-            # 标题
-            title = main_td.find('a').attrs['title']
-
-            tags = set(
-                [font.attrs['class'][0] for font in main_td.select('span > span') if 'class' in font.attrs.keys()])
-            if '' in tags:
-                tags.remove('')
-
-            is_seeding = len(main_td.select('img[src="/pic/seeding.png"]')) > 0
-            is_finished = len(main_td.select('img[src="/pic/finished.png"]')) > 0
-
-            is_hot = False
-            if 'hot' in tags:
-                is_hot = True
-                tags.remove('hot')
-            is_new = False
-            if 'new' in tags:
-                is_new = True
-                tags.remove('new')
-            is_recommended = False
-            if 'recommended' in tags:
-                is_recommended = True
-                tags.remove('recommended')
-
-            # 根据控制面板中促销种子的标记方式不同来匹配
-            if 'class' in item.attrs:
-                # 默认高亮方式
-                tag = self._get_tag(item.attrs['class'][0])
-            elif len(tags) == 1:
-                # 文字标记方式
-                # 不属于 hot、new、recommended 的标记即为促销标记
-                tag = self._get_tag(list(tags)[0])
-            elif len(main_td.select('img[src="/pic/trans.gif"][class^="pro_"]')) > 0:
-                # 添加图标方式
-                tag = self._get_tag(
-                    main_td.select('img[src="/pic/trans.gif"][class^="pro_"]')[-1].attrs['class'][0].split('_')[-1])
-            else:
-                tag = ''
-
-            file_size = tds[start_idx + 4].text.split('\n')
-
-            seeding = int(tds[start_idx + 5].text) if tds[start_idx + 5].text.isdigit() else -1
-
-            downloading = int(tds[start_idx + 6].text) if tds[start_idx + 6].text.isdigit() else -1
+        return self.page_parser.parse_rows(table, filter_tags)
 
-            finished = int(tds[start_idx + 7].text) if tds[start_idx + 7].text.isdigit() else -1
+    def record_decision(self, torrent_info, decision, reason, info_hash=None, size_bytes=None):
+        if self.history is not None:
+            self.history.record_decision(torrent_info.seed_id, decision, reason, info_hash,
+                                         torrent_info.size_bytes if size_bytes is None else size_bytes)
 
-            torrent_info['cat'] = cat
-            torrent_info['is_hot'] = is_hot
-            torrent_info['tag'] = tag
-            torrent_info['is_seeding'] = is_seeding
-            torrent_info['is_finished'] = is_finished
-            torrent_info['seed_id'] = seed_id
-            torrent_info['title'] = title
-            torrent_info['seeding'] = seeding
-            torrent_info['downloading'] = downloading
-            torrent_info['finished'] = finished
-            torrent_info['file_size'] = file_size
-            torrent_info['is_new'] = is_new
-            torrent_info['is_recommended'] = is_recommended
-            torrent_infos.append(torrent_info)
-
-        torrent_infos_filter_by_tag = list()
-        for torrent_info in torrent_infos:
-            if torrent_info['tag'] in filter_tags:
-                torrent_infos_filter_by_tag.append(torrent_info)
-
-        return torrent_infos_filter_by_tag
-
-    # 获取可用的种子的策略，可自行修改
     def get_ok_torrent(self, torrent_infos):
-        ok_infos = list()
-        if len(torrent_infos) >= 20:
-            # 遇到free或者免费种子太过了，择优选取，标准是(下载数/上传数)>20，并且文件大小大于20GB
-            print('符合要求的种子过多，可能开启Free活动了，提高种子获取标准')
-            for torrent_info in torrent_infos:
-                if torrent_info['seed_id'] in self.old_torrent:
-                    continue
-                # 下载1GB-1TB之间的种子（下载以GB大小结尾的种子，脚本需要不可修改）
-                if 'GiB' not in torrent_info['file_size'][0]:
-                    continue
-                if torrent_info['seeding'] <= 0 or torrent_info['downloading'] < 0:
-                    continue
-                if torrent_info['seeding'] != 0 and float(torrent_info['downloading']) / float(
-                        torrent_info['seeding']) < 20:
-                    continue
-                file_size = torrent_info['file_size'][0]
-                file_size = file_size.replace('GiB', '')
-                file_size = float(file_size.strip())
-                if file_size < 20.0:
-                    continue
-                ok_infos.append(torrent_info)
-        else:
-            # 正常种子选择标准是免费种子并且(下载数/上传数)>0.6
-            for torrent_info in torrent_infos:
-                if torrent_info['seed_id'] in self.old_torrent:
-                    continue
-                # 下载1GB-1TB之间的种子（下载以GB大小结尾的种子，脚本需要不可修改）
-                if 'GiB' not in torrent_info['file_size'][0]:
-                    continue
-                if torrent_info['seeding'] <= 0 or torrent_info['downloading'] < 0:
-                    continue
-                if torrent_info['seeding'] != 0 and float(torrent_info['downloading']) / float(
-                        torrent_info['seeding']) < 0.6:
-                    continue
-                ok_infos.append(torrent_info)
-        return ok_infos
-
-    def check_remove(self, add_num=0):
-        torrent_list = self.torrent_util.get_list()
-        if torrent_list is None:
-            print('get torrent list fail!')
-            return
-
-        torrent_len = len(torrent_list) + add_num
-        if torrent_len <= self.max_torrent_count:
-            return
-        torrent_list.sort(key=lambda x: (x.date_added, x.rateUpload))
-        while torrent_len > self.max_torrent_count and len(torrent_list) > 0:
-            remove_torrent_info = torrent_list.pop(0)
-            if remove_torrent_info.status.checking:
-                continue
-            # rateUpload > 500KB/s
-            if (remove_torrent_info.status.downloading or remove_torrent_info.status.seeding) and \
-                    remove_torrent_info.rateUpload > 500000:
-                continue
-            res = self.torrent_util.remove(remove_torrent_info.id, delete_data=True)
+        result = self.selection_policy.select(torrent_infos, self.old_torrent)
+        self.free_event = result.free_event
+        if self.free_event:
+            logger.info('符合要求的种子过多，可能开启Free活动了，提高种子获取标准')
+        if self.history is not None and len(result.skipped) > 0:
+            self.history.record_decisions([(torrent_info.seed_id, 'skipped', reason, None, torrent_info.size_bytes)
+                                           for torrent_info, reason in result.skipped])
+        if result.scores is not None and logger.isEnabledFor(logging.DEBUG):
+            for torrent_info, score in zip(result.accepted, result.scores.tolist()):
+                logger.debug('score %.3f: %s', score, torrent_info, extra={'seed_id': torrent_info.seed_id})
+        return result.accepted
+
+    def _remove_torrents(self, torrents):
+        # 合并为一次删除请求
+        if len(torrents) == 0:
+            return True
+        res = self.torrent_util.remove([torrent.id for torrent in torrents], delete_data=True)
+        if res:
+            TORRENTS.inc(len(torrents), outcome='evicted')
+            if self.download_limiter is not None:
+                self.download_limiter.forget([torrent.id for torrent in torrents])
+            if self.history is not None:
+                for torrent in torrents:
+                    self.history.record_eviction(torrent, self.rate_history.rate_of(torrent))
+        for torrent in torrents:
             if res:
-                print('remove torrent success: ' + str(remove_torrent_info))
+                logger.info('remove torrent success: %s', torrent, extra={'hash': torrent.id})
             else:
-                print('remove torrent fail: ' + str(remove_torrent_info))
-            torrent_len = torrent_len - 1
+                logger.error('remove torrent fail: %s', torrent, extra={'hash': torrent.id})
+        return res
 
-    def download(self, torrent_id):
-        download_url = 'download.php?id={}'.format(torrent_id)
-        download_url = self._get_url(download_url)
-        flag = False
-        r = None
-        for i in range(5):
-            try:
-                r = requests.get(download_url, cookies=self.cookie_jar, headers=self.headers)
-                flag = True
-                break
-            except Exception as e:
-                print('[ERROR] ' + repr(e))
-                print('try login...')
-                self.byrbt_cookies = self.login.load_cookie()
-                if self.byrbt_cookies is not None:
-                    self.cookie_jar = RequestsCookieJar()
-                    for k, v in self.byrbt_cookies.items():
-                        self.cookie_jar[k] = v
-                time.sleep(1)
-
-        if flag is False or r is None:
-            print('login failed!')
-
-        new_torrent = self.torrent_util.download_from_content(r.content, paused=True)
-        if new_torrent is not None:
-            new_torrent_size = new_torrent.total_size
-            if new_torrent_size < self.torrent_min_size or new_torrent_size > self.torrent_max_size:
-                print('add new torrent fail, name : {}, improper seed size: {} GB, download url: {}'.format(
-                    new_torrent.name, new_torrent_size / 1000000000, download_url))
-                self.old_torrent.append(torrent_id)
-                self.torrent_util.remove(new_torrent.id, delete_data=True)
-                return False
-            res = self.check_free_space_to_download(new_torrent_size)
-            if res is None:
-                self.torrent_util.remove(new_torrent.id, delete_data=True)
-                return False
-            if res is False:
-                self.torrent_util.remove(new_torrent.id, delete_data=True)
-                print('add new torrent fail, not device space to download, name : {}, size: {} GB, '
-                      'download url: {}'.format(new_torrent.name, new_torrent_size / 1000000000, download_url))
-                return False
-            else:
-                if self.torrent_util.start_torrent(new_torrent.id):
-                    print('add torrent: ' + str(res))
-                    self.old_torrent.append(torrent_id)
-                else:
-                    print('add new torrent fail, start torrent fail, name : {}, seed size: {} GB, '
-                          'download url: {}'.format(new_torrent.name, new_torrent_size / 1000000000, download_url))
-                return True
-        else:
-            print('add new torrent fail, download url: ' + download_url)
-            return False
-
-    def start(self):
-        scan_interval_in_sec = 60
-        check_disk_space_interval_in_sec = 500
-        last_check_disk_space_time = -1
-        while True:
-            now_time = int(time.time())
-            if now_time - last_check_disk_space_time > check_disk_space_interval_in_sec:
-                print('check disk space...')
-                if self.check_disk_space():
-                    last_check_disk_space_time = now_time
-                else:
-                    print('check disk space fail!')
-                    time.sleep(scan_interval_in_sec)
-                    continue
-
-            print('scan torrent list...')
-            flag = False
-            torrents_soup = None
-            torrent_infos = None
-            try:
-                torrents_soup = BeautifulSoup(
-                    requests.get(self.torrent_url, cookies=self.cookie_jar, headers=self.headers).content,
-                    features="html.parser")
-                flag = True
-            except Exception as e:
-                print('[ERROR] ' + repr(e))
-                self.byrbt_cookies = self.login.load_cookie()
-                if self.byrbt_cookies is not None:
-                    self.cookie_jar = RequestsCookieJar()
-                    for k, v in self.byrbt_cookies.items():
-                        self.cookie_jar[k] = v
-
-            if flag is False:
-                print('login failed!')
-                break
-
-            try:
-                user_info_block = torrents_soup.select_one('#info_block').select_one('.navbar-user-data')
-                self.get_user_info(user_info_block)
-            except Exception as e:
-                print('[ERROR] ' + repr(e))
-
-            try:
-                torrent_table = torrents_soup.find_all('tr', class_='free_bg')
-                torrent_infos = self.get_torrent_info_filter_by_tag(torrent_table, self._filter_tags)
-                flag = True
-            except Exception as e:
-                print('[ERROR] ' + repr(e))
-                flag = False
-
-            if flag is False:
-                print('failed to parse torrent table!')
-                break
-            print('free torrent list：')
-            for i, info in enumerate(torrent_infos):
-                print('{} : {} {} {}'.format(i, info['seed_id'], info['file_size'], info['title']))
-
-            ok_torrent = self.get_ok_torrent(torrent_infos)
-            print('available torrent list：')
-            for i, info in enumerate(ok_torrent):
-                print('{} : {} {} {}'.format(i, info['seed_id'], info['file_size'], info['title']))
-            self.check_remove(add_num=len(ok_torrent))
-            for torrent in ok_torrent:
-                if self.download(torrent['seed_id']) is False:
-                    print('{} download fail'.format(torrent['title']))
-                    continue
-            time.sleep(scan_interval_in_sec)
-            print()
-
-    def check_free_space_to_download(self, new_torrent_size):
+    @timed_phase('evict')
+    def make_room(self, incoming_sizes=(), exclude=()):
+        # 为待添加的种子一次性规划并执行删除，返回执行后的计划，plan.admit_count 为可以添加的种子数量
+        # （按 incoming_sizes 的顺序），失败返回 None。其余尚未添加的预留（exclude 以外）排在最后，一起留出空间
         torrent_list = self.torrent_util.get_list()
         if torrent_list is None:
-            print('get torrent list fail!')
+            logger.error('get torrent list fail!')
             return None
         free_space = self.torrent_util.get_free_space()
         if free_space is None:
-            print('get download path free space fail!')
+            logger.error('get download path free space fail!')
             return None
-        sum_size = 0
-        for torrent in torrent_list:
-            sum_size += torrent.total_size
+        MANAGED_TORRENTS.set(len(torrent_list))
+        FREE_SPACE.set(free_space)
+
+        incoming_sizes = list(incoming_sizes) + self.admission.reserved_sizes(exclude)
+        plan = self.eviction_planner.plan(torrent_list, free_space, incoming_sizes)
+        if len(plan.evict) > 0:
+            logger.info('insufficient torrent slots or disk space, try to remove %d torrent(s)...', len(plan.evict))
+            if not self._remove_torrents(plan.evict):
+                return None
+        return plan
+
+    def reserve(self, torrent_infos):
+        # 按同一次快照为整批候选种子预留数量和空间，返回获得预留的种子（按优先级排序）
+        if len(torrent_infos) == 0:
+            return list()
+        # 使用本地镜像即可，添加前 make_room 会再同步一次
+        torrent_list = self.torrent_util.get_list(force=False)
+        free_space = self.torrent_util.get_free_space()
+        if torrent_list is None or free_space is None:
+            logger.error('get torrent list or free space fail, skip this scan')
+            return list()
+        # 使用模型时 get_ok_torrent 已经按预测收益排序
+        key = rank_key if self.selection_policy.model is None else None
+        accepted = self.admission.reserve(torrent_infos, torrent_list, free_space, key=key)
+        if self.history is not None:
+            accepted_ids = {torrent_info.seed_id for torrent_info in accepted}
+            for torrent_info in torrent_infos:
+                if torrent_info.seed_id in accepted_ids:
+                    self.record_decision(torrent_info, 'reserved', 'ok')
+                else:
+                    self.record_decision(torrent_info, 'deferred', 'no_room')
+        if len(accepted) < len(torrent_infos):
+            logger.info('no room for %d of %d available torrent(s), wait for next scan',
+                        len(torrent_infos) - len(accepted), len(torrent_infos))
+        return accepted
 
-        if new_torrent_size < free_space and sum_size + new_torrent_size <= self.max_torrent_total_size:
-            return True
+    def _fetch_torrent(self, torrent_id):
+        download_url = 'download.php?id={}'.format(torrent_id)
+        download_url = self._get_url(download_url)
+        r = self.tracker.fetch(download_url)
+        if r is None:
+            logger.error('login failed!')
+            return download_url, None
+        return download_url, r.content
+
+    @timed_phase('fetch')
+    def fetch_candidate(self, torrent_info):
+        # 获取 .torrent 并在本地读取信息，不合适的种子不再交给客户端
+        candidate = self._fetch_candidate(torrent_info)
+        if candidate is None:
+            self.admission.release(torrent_info.seed_id)
+        else:
+            # 用 .torrent 中的实际大小替换列表页上的大小
+            self.admission.update(torrent_info.seed_id, candidate.meta.total_size)
+        return candidate
+
+    def _fetch_candidate(self, torrent_info):
+        download_url, content = self._fetch_torrent(torrent_info.seed_id)
+        if content is None:
+            logger.error('%s download fail', torrent_info.title, extra={'seed_id': torrent_info.seed_id})
+            self.record_decision(torrent_info, 'rejected', 'download_fail')
+            TORRENTS.inc(outcome='rejected')
+            return None
+        meta = inspect_torrent(content)
+        if meta is None:
+            logger.error('add new torrent fail, invalid torrent file, download url: %s', download_url)
+            self.record_decision(torrent_info, 'rejected', 'invalid_torrent')
+            TORRENTS.inc(outcome='rejected')
+            return None
+        if meta.total_size < self.torrent_min_size or meta.total_size > self.torrent_max_size:
+            logger.warning('add new torrent fail, name : %s, improper seed size: %s GB, download url: %s',
+                           meta.name, meta.total_size / 1000000000, download_url)
+            self.old_torrent.add(torrent_info.seed_id)
+            self.record_decision(torrent_info, 'rejected', 'size', size_bytes=meta.total_size)
+            TORRENTS.inc(outcome='rejected')
+            return None
+        TORRENTS.inc(outcome='fetched')
+        return Candidate(torrent_info, download_url, content, meta)
 
-        print('insufficient disk space, try to remove some torrent...')
-        torrent_list.sort(key=lambda x: (x.date_added, x.rateUpload))
-        while (free_space <= new_torrent_size or sum_size + new_torrent_size > self.max_torrent_total_size) \
-                and len(torrent_list) > 0:
-            remove_torrent_info = torrent_list.pop(0)
-            if remove_torrent_info.status.checking:
+    @timed_phase('admit')
+    def admit(self, candidates):
+        # 统一规划空间后合并为一次添加请求，返回成功添加的数量
+        try:
+            count = self._admit(candidates)
+        finally:
+            for candidate in candidates:
+                self.admission.release(candidate.torrent_info.seed_id)
+        TORRENTS.inc(count, outcome='admitted')
+        TORRENTS.inc(len(candidates) - count, outcome='rejected')
+        return count
+
+    def _admit(self, candidates):
+        admitted = list()
+        admitted_hashes = set()
+        for candidate in candidates:
+            meta = candidate.meta
+            if meta.info_hash in admitted_hashes or self.torrent_util.get_torrent(meta.info_hash) is not None:
+                logger.info('torrent already exists, name : %s, download url: %s', meta.name, candidate.download_url)
+                self.old_torrent.add(candidate.torrent_info.seed_id)
+                self.record_decision(candidate.torrent_info, 'rejected', 'duplicate', meta.info_hash, meta.total_size)
                 continue
-            # rateUpload > 500KB/s
-            if (remove_torrent_info.status.downloading or remove_torrent_info.status.seeding) and \
-                    remove_torrent_info.rateUpload > 500000:
+            admitted_hashes.add(meta.info_hash)
+            admitted.append(candidate)
+
+        if len(admitted) == 0:
+            return 0
+        # 数量、总大小、剩余空间统一规划，一次删除后只添加放得下的种子
+        plan = self.make_room([candidate.meta.total_size for candidate in admitted],
+                              exclude={candidate.torrent_info.seed_id for candidate in candidates})
+        if plan is None:
+            return 0
+        for candidate in admitted[plan.admit_count:]:
+            logger.warning('add new torrent fail, not device space to download, name : %s, size: %s GB, '
+                           'download url: %s', candidate.meta.name, candidate.meta.total_size / 1000000000,
+                           candidate.download_url)
+            self.record_decision(candidate.torrent_info, 'rejected', 'no_space', candidate.meta.info_hash,
+                                 candidate.meta.total_size)
+        admitted = admitted[:plan.admit_count]
+        if len(admitted) == 0:
+            return 0
+        queued = self.download_limiter is not None
+        new_torrents = self.torrent_util.download_from_contents([candidate.content for candidate in admitted],
+                                                                paused=queued, tags=[QUEUED_TAG] if queued else [])
+        if new_torrents is None:
+            new_torrents = [None] * len(admitted)
+        count = 0
+        for candidate, new_torrent in zip(admitted, new_torrents):
+            if new_torrent is None:
+                logger.error('add new torrent fail, download url: %s', candidate.download_url)
+                self.record_decision(candidate.torrent_info, 'rejected', 'add_fail', candidate.meta.info_hash,
+                                     candidate.meta.total_size)
                 continue
-            res = self.torrent_util.remove(remove_torrent_info.id, delete_data=True)
-            if res:
-                print('remove torrent success: ' + str(remove_torrent_info))
+            logger.info('add torrent: %s', new_torrent,
+                        extra={'seed_id': candidate.torrent_info.seed_id, 'hash': new_torrent.id})
+            self.old_torrent.add(candidate.torrent_info.seed_id)
+            self.record_decision(candidate.torrent_info, 'admitted', 'ok', new_torrent.id, candidate.meta.total_size)
+            if self.download_limiter is not None:
+                self.download_limiter.remember(new_torrent.id, candidate.torrent_info)
+            count += 1
+        if count > 0:
+            self._disk_dirty = True
+            self.limit_downloads()
+        return count
+
+    def download(self, torrent_infos):
+        # 不经过流水线，依次获取后一次添加
+        torrent_infos = self.reserve(torrent_infos)
+        candidates = list()
+        for torrent_info in torrent_infos:
+            candidate = self.fetch_candidate(torrent_info)
+            if candidate is not None:
+                candidates.append(candidate)
+        return self.admit(candidates)
+
+    def scan_once(self, serial=False):
+        ok_torrent, delay = self._scan(serial)
+        SCAN_INTERVAL.set(delay)
+        return ok_torrent, delay
+
+    @timed_phase('scan')
+    def _scan(self, serial=False):
+        logger.debug('scan torrent list...')
+        scan_result = self.scanner.scan(serial)
+        if scan_result is None:
+            logger.error('login failed!')
+            self.scan_scheduler.on_error()
+            return list(), self.scan_scheduler.next_delay()
+        if not scan_result.changed:
+            logger.debug('torrent list unchanged, skip')
+            if self.history is not None:
+                self.history.record_unchanged()
+            self.scan_scheduler.on_unchanged()
+            return list(), self.scan_scheduler.next_delay()
+        torrent_infos = scan_result.torrent_infos
+        if self.history is not None:
+            self.history.record_scan(scan_result)
+
+        if scan_result.user_info_block is not None:
+            try:
+                self.get_user_info(scan_result.user_info_block)
+            except Exception as e:
+                logger.error('get user info fail: %r', e)
+
+        # 逐个种子的列表只在 debug 级别输出，Free 活动时列表很长
+        verbose = logger.isEnabledFor(logging.DEBUG)
+        if verbose:
+            for i, info in enumerate(torrent_infos):
+                logger.debug('free torrent %d: %s %s %s', i, info.seed_id, info.file_size, info.title,
+                             extra={'seed_id': info.seed_id, 'size': info.size_bytes, 'tag': info.tag.value})
+
+        ok_torrent = self.get_ok_torrent(torrent_infos)
+        TORRENTS.inc(len(torrent_infos), outcome='listed')
+        TORRENTS.inc(len(ok_torrent), outcome='candidate')
+        LAST_SCAN.set(len(torrent_infos), kind='listed')
+        LAST_SCAN.set(len(ok_torrent), kind='candidate')
+        if verbose:
+            for i, info in enumerate(ok_torrent):
+                logger.debug('available torrent %d: %s %s %s', i, info.seed_id, info.file_size, info.title,
+                             extra={'seed_id': info.seed_id, 'size': info.size_bytes, 'tag': info.tag.value})
+        logger.info('scan finished: %d free torrent(s), %d available', len(torrent_infos), len(ok_torrent),
+                    extra={'listed': len(torrent_infos), 'available': len(ok_torrent),
+                           'pages': scan_result.page_count, 'failed_pages': scan_result.failed_count})
+        candidate_ids = {info.seed_id for info in ok_torrent}
+        new_count = len(candidate_ids - self._last_candidate_ids)
+        self._last_candidate_ids = candidate_ids
+        if scan_result.failed_count > 0:
+            self.scan_scheduler.on_error()
+        else:
+            self.scan_scheduler.on_scan(new_count, self.free_event)
+        return self.reserve(ok_torrent), self.scan_scheduler.next_delay()
+
+    @timed_phase('housekeeping')
+    def housekeeping(self):
+        now_time = int(time.time())
+        if now_time - self._last_sync_time >= self.sync_interval_in_sec:
+            # 增量同步，用于发现下载完成和剩余空间的变化
+            self.torrent_util.get_main_data(True)
+            self._last_sync_time = now_time
+            torrent_list = self.torrent_util.get_list(force=False)
+            if torrent_list is not None:
+                self.rate_history.record(torrent_list, now_time)
+        if now_time - self._last_rate_history_save_time >= self.rate_history_save_interval_in_sec:
+            self._last_rate_history_save_time = now_time
+            self.rate_history.save()
+        self.limit_downloads()
+        if self.torrent_util.pop_space_changed():
+            self._disk_dirty = True
+        free_space = self.torrent_util.get_free_space()
+        if free_space is not None:
+            FREE_SPACE.set(free_space)
+        low_space = free_space is not None and free_space <= self.min_free_space
+        elapsed = now_time - self._last_check_disk_space_time
+        if elapsed > self.check_disk_space_interval_in_sec or \
+                ((self._disk_dirty or low_space) and elapsed >= self.min_check_disk_space_interval_in_sec):
+            logger.debug('check disk space...')
+            self._last_check_disk_space_time = now_time
+            if self.check_disk_space():
+                self._disk_dirty = False
             else:
-                print('remove torrent fail: ' + str(remove_torrent_info))
-                return None
-            free_space += remove_torrent_info.total_size
-            sum_size -= remove_torrent_info.total_size
+                logger.error('check disk space fail!')
+
+    def limit_downloads(self):
+        # 根据本地镜像中的下载速度，暂停超出带宽的种子，恢复排在前面的种子
+        dl_speed, up_speed = self.torrent_util.get_transfer_speeds()
+        if dl_speed is not None:
+            TRANSFER_SPEED.set(dl_speed, direction='download')
+        if up_speed is not None:
+            TRANSFER_SPEED.set(up_speed, direction='upload')
+        if self.download_limiter is None:
+            return
+        torrent_list = self.torrent_util.get_list(force=False)
+        if torrent_list is None:
+            return
+        downloading = [torrent for torrent in torrent_list if torrent.status.downloading]
+        active_count = sum(1 for torrent in downloading if not torrent.status.paused)
+        queued_count = sum(1 for torrent in downloading if self.download_limiter.is_queued(torrent))
+        self.download_limiter.update_speed(dl_speed, active_count)
+        pause, resume = self.download_limiter.plan(torrent_list)
+        # 暂停和恢复成功后镜像中的状态和标签会立即更新，下一次调用不会重复请求
+        pause_ids = [torrent.id for torrent in pause]
+        if len(pause) > 0 and self.torrent_util.add_tags(pause_ids, [QUEUED_TAG]) and \
+                self.torrent_util.pause_torrent(pause_ids):
+            logger.info('pause %d torrent(s) beyond download capacity %.1f MiB/s', len(pause),
+                        self.download_limiter.capacity / 1024 / 1024)
+            active_count -= len(pause)
+            queued_count += len(pause)
+        resume_ids = [torrent.id for torrent in resume]
+        if len(resume) > 0 and self.torrent_util.start_torrent(resume_ids):
+            logger.info('resume %d queued torrent(s)', len(resume))
+            self.torrent_util.remove_tags(resume_ids, [QUEUED_TAG])
+            active_count += len(resume)
+            queued_count -= len(resume)
+        ACTIVE_DOWNLOADS.set(active_count)
+        QUEUED_DOWNLOADS.set(queued_count)
 
-        return self.torrent_util.get_free_space() > new_torrent_size and sum_size + new_torrent_size <= self.max_torrent_total_size
+    def start(self):
+        # 扫描、获取种子文件、添加到客户端三个阶段并行，新种子不必等待整轮结束
+        self.pipeline = Pipeline(self.scan_once, self.fetch_candidate, self.admit,
+                                 key=lambda torrent_info: torrent_info.seed_id, housekeeping=self.housekeeping)
+        self.housekeeping()
+        self.pipeline.run()
+
+    def profile(self, cycles, out_dir='./data/profiles'):
+        # 不使用流水线，在主线程中依次执行 cycles 轮扫描、获取、添加和磁盘检查，每轮分别记录
+        profiler = CycleProfiler(out_dir)
+        logger.info('profiling %d cycle(s), output: %s', cycles, profiler.out_dir)
+        for i in range(cycles):
+            with profiler.cycle(i):
+                ok_torrent, delay = self.scan_once(serial=True)
+                self.download(ok_torrent)
+                self.housekeeping()
+            if i < cycles - 1:
+                time.sleep(delay)
+        logger.info('profile summary: %s', profiler.summary())
 
     def check_disk_space(self):
         free_space = self.torrent_util.get_free_space()
         if free_space is None:
-            print('get download path free space fail!')
+            logger.error('get download path free space fail!')
             return False
 
-        if free_space <= 5000000000:  # 5GB
-            print('low disk space, clear torrent...')
-            torrent_list = self.torrent_util.get_list()
-            if torrent_list is None:
-                print('get torrent list fail!')
-                return False
-            torrent_list.sort(key=lambda x: (x.date_added, x.rateUpload))
-            while free_space <= 5000000000 and len(torrent_list) > 0:
-                remove_torrent_info = torrent_list.pop(0)
-                if remove_torrent_info.status.checking:
-                    continue
-                # rateUpload > 500KB/s
-                if (remove_torrent_info.status.downloading or remove_torrent_info.status.seeding) and \
-                        remove_torrent_info.rateUpload > 500000:
-                    continue
-                res = self.torrent_util.remove(remove_torrent_info.id, delete_data=True)
-                if res:
-                    print('remove torrent success: ' + str(remove_torrent_info))
-                else:
-                    print('remove torrent fail: ' + str(remove_torrent_info))
-                    return False
-                free_space += remove_torrent_info.total_size
-            return self.torrent_util.get_free_space() > 5000000000
+        if free_space <= self.min_free_space:
+            logger.warning('low disk space, clear torrent...')
+            plan = self.make_room()
+            return plan is not None and plan.free_space > self.min_free_space
 
         return True
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='byrbt bot')
+    parser.add_argument('--profile', type=int, default=0, metavar='N',
+                        help='run N cycles under cProfile and tracemalloc, write results to ./data/profiles/')
+    args = parser.parse_args()
     config = ReadConfig(filepath='config/config.ini')
-    login = LoginTool(config)
+    setup_logging(str(config.get_bot_config("log-level") or 'info').strip(),
+                  str(config.get_bot_config("log-format") or 'json').strip())
+    config.log_config()
+    tracker = TrackerClient(config)
+    login = LoginTool(config, tracker)
     bit_torrent = BitTorrent(config)
     with TorrentBot(config, login, bit_torrent) as byrbt_bot:
-        byrbt_bot.start()
+        if args.profile > 0:
+            byrbt_bot.profile(args.profile)
+        else:
+            byrbt_bot.start()
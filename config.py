@@ -8,15 +8,24 @@
 """
 
 import configparser
+import logging
+import re
 
+logger = logging.getLogger(__name__)
 
-def _print_config(config):
-    sections = config.sections()
-    print("sections:", sections)
-    for section in sections:
-        print("[%s]" % section)
+# 输出配置时隐藏的选项
+_SECRET_OPTIONS = ('passwd', 'password')
+# 链接中需要隐藏的参数，例如 rss-url 中的 passkey
+_SECRET_PARAMS = re.compile(r'((?:passkey|token|key)=)[^&#\s]*', re.IGNORECASE)
+
+
+def _log_config(config):
+    for section in config.sections():
+        options = dict()
         for option in config.options(section):
-            print("\t%s=%s" % (option, config.get(section, option)))
+            secret = any(name in option for name in _SECRET_OPTIONS)
+            options[option] = '******' if secret else _SECRET_PARAMS.sub(r'\1******', config.get(section, option))
+        logger.info('config [%s]', section, extra={'options': options})
 
 
 class ReadConfig:
@@ -29,7 +38,10 @@ class ReadConfig:
 
         self.cf = configparser.ConfigParser()
         self.cf.read(config_path, encoding='utf8')
-        _print_config(self.cf)
+
+    def log_config(self):
+        # 在日志初始化之后调用
+        _log_config(self.cf)
 
     def get_bot_config(self, param):
         value = self.cf.get("ByrBTBot", param, fallback=None)
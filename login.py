@@ -7,59 +7,74 @@
 @Software: PyCharm
 """
 
-import requests
+import logging
 import pickle
 import time
 import os
 
+from utils.tracker_client import TrackerClient
+
+logger = logging.getLogger(__name__)
 
 
 class LoginTool:
 
-    def __init__(self, config):
+    def __init__(self, config, tracker=None):
         self.config = config
         self.try_count = 5
-        self.base_url = str(config.get_bot_config("byrbt-url"))
+        self.tracker = tracker if tracker is not None else TrackerClient(config)
+        # 会话过期时由 tracker 回调重新登录，cookies 直接刷新到共享的 session 中
+        self.tracker.login_handler = self.login
+        self.base_url = self.tracker.base_url
         self.login_url = self.get_url('login.php')
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.113 Safari/537.36'}
         self.cookie_save_path = './data/ByrbtCookies.pickle'
 
     def get_url(self, url):
         return self.base_url + url
 
-    def load_cookie(self):
+    def load_cookie(self, validate=True):
         if os.path.exists(self.cookie_save_path):
-            print('find ByrbtCookies.pickle, loading cookies')
-            read_path = open(self.cookie_save_path, 'rb')
-            byrbt_cookies = pickle.load(read_path)
+            logger.info('find ByrbtCookies.pickle, loading cookies')
+            with open(self.cookie_save_path, 'rb') as read_path:
+                byrbt_cookies = pickle.load(read_path)
+            self.tracker.set_cookies(byrbt_cookies)
+            if not validate or self.check_cookie() is not False:
+                return byrbt_cookies
+            logger.info('saved cookies expired, get cookies...')
         else:
-            print('not find ByrbtCookies.pickle, get cookies...')
-            byrbt_cookies = self.login()
+            logger.info('not find ByrbtCookies.pickle, get cookies...')
+        return self.login()
 
-        return byrbt_cookies
+    def check_cookie(self):
+        # 访问首页检查 cookies 是否有效；网络错误时返回 None，由之后的请求按需重新登录
+        try:
+            response = self.tracker.get(self.get_url('index.php'))
+        except Exception as e:
+            logger.warning('check cookies fail: %r', e)
+            return None
+        return response.status_code == 200 and not self.tracker.is_login_page(response)
 
     def login(self):
-        session = requests.session()
-        for i in range(5):
-            login_res = session.post(self.get_url('takelogin.php'),
-                                     headers=self.headers,
-                                     data=dict(
-                                         logintype="username",
-                                         userinput=str(self.config.get_bot_config("username")),
-                                         password=str(self.config.get_bot_config("passwd")),
-                                         autologin="yes"))
-            if '最近消息' in login_res.text:
-                cookies = {}
-                for k, v in session.cookies.items():
-                    cookies[k] = v
-                os.makedirs(os.path.dirname(self.cookie_save_path), mode=0o755, exist_ok=True)
-                with open(self.cookie_save_path, 'wb') as f:
-                    pickle.dump(cookies, f)
-                return cookies
+        self.tracker.set_cookies(None)
+        for i in range(self.try_count):
+            try:
+                login_res = self.tracker.post(self.get_url('takelogin.php'),
+                                              data=dict(
+                                                  logintype="username",
+                                                  userinput=str(self.config.get_bot_config("username")),
+                                                  password=str(self.config.get_bot_config("passwd")),
+                                                  autologin="yes"))
+                if '最近消息' in login_res.text:
+                    cookies = self.tracker.get_cookies()
+                    os.makedirs(os.path.dirname(self.cookie_save_path), mode=0o755, exist_ok=True)
+                    with open(self.cookie_save_path, 'wb') as f:
+                        pickle.dump(cookies, f)
+                    return cookies
+            except Exception as e:
+                logger.error('login request fail: %r', e)
 
-            print("failed to login, retry")
-            time.sleep(1)
+            logger.warning("failed to login, retry")
+            time.sleep(min(0.5 * 2 ** i, 4))
 
-        print('login fail!')
+        logger.error('login fail!')
         return None
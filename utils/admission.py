@@ -0,0 +1,95 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : admission.py
+@Time    : 2026/10/18 20:50
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import threading
+import time
+
+from utils.torrent_info import Promotion
+
+# 促销越好排序越靠前
+PROMOTION_RANK = {
+    Promotion.TWO_UP_FREE: 0,
+    Promotion.FREE: 1,
+    Promotion.TWO_UP_HALF_DOWN: 2,
+    Promotion.THIRTY_PERCENT_DOWN: 3,
+    Promotion.HALF_DOWN: 4,
+    Promotion.TWO_UP: 5,
+    Promotion.NONE: 6,
+}
+
+
+def rank_key(torrent_info):
+    # 促销类型、下载人数/做种人数（越大越好）、大小（越小越快完成）
+    ratio = torrent_info.downloading / torrent_info.seeding if torrent_info.seeding > 0 else 0.0
+    return PROMOTION_RANK.get(torrent_info.tag, len(PROMOTION_RANK)), -ratio, torrent_info.size_bytes
+
+
+class Reservation:
+    __slots__ = ('key', 'size', 'time')
+
+    def __init__(self, key, size, reserve_time):
+        self.key = key
+        self.size = size
+        self.time = reserve_time
+
+
+class AdmissionController:
+    """在获取种子文件之前，按一次快照为整批候选种子预留数量和空间
+
+    候选种子按 key（默认 rank_key）排序后与所有尚未完成的预留一起交给 EvictionPlanner，
+    只保留放得下的最优前缀；预留在添加完成或放弃时释放，超过 ttl 秒自动失效，
+    并发添加时不会超出数量、总大小和剩余空间的限制。
+    """
+
+    def __init__(self, planner, ttl=600):
+        self.planner = planner
+        self.ttl = ttl
+        self._reservations = dict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._reservations)
+
+    def _expire(self, now):
+        for key in [key for key, reservation in self._reservations.items() if now - reservation.time > self.ttl]:
+            del self._reservations[key]
+
+    def reserve(self, torrent_infos, torrents, free_space, size_of=None, key=rank_key):
+        # 返回获得预留的种子（按排序），已有预留的种子直接保留；key 为 None 时保持 torrent_infos 的顺序
+        size_of = size_of if size_of is not None else (lambda torrent_info: max(torrent_info.size_bytes, 0))
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            held = [torrent_info for torrent_info in torrent_infos if torrent_info.seed_id in self._reservations]
+            ranked = [torrent_info for torrent_info in torrent_infos if torrent_info.seed_id not in self._reservations]
+            if key is not None:
+                ranked.sort(key=key)
+            reserved_sizes = [reservation.size for reservation in self._reservations.values()]
+            plan = self.planner.plan(torrents, free_space, reserved_sizes + [size_of(info) for info in ranked])
+            accepted = ranked[:max(plan.admit_count - len(reserved_sizes), 0)]
+            for torrent_info in accepted:
+                self._reservations[torrent_info.seed_id] = Reservation(torrent_info.seed_id, size_of(torrent_info),
+                                                                      now)
+        return held + accepted
+
+    def update(self, key, size):
+        # 获取种子文件后用实际大小替换估计值
+        with self._lock:
+            reservation = self._reservations.get(key)
+            if reservation is not None:
+                reservation.size = size
+
+    def release(self, key):
+        with self._lock:
+            self._reservations.pop(key, None)
+
+    def reserved_sizes(self, exclude=()):
+        with self._lock:
+            return [reservation.size for key, reservation in self._reservations.items() if key not in exclude]
@@ -7,29 +7,92 @@
 @Software: Visual Studio Code
 """
 
-import hashlib
+import logging
+import threading
 import time
 import requests
 
-from bencoding import bencode, bdecode
-
 from config import ReadConfig
+from utils.metrics import QBITTORRENT_REQUESTS, QBITTORRENT_SECONDS
+from utils.torrent_meta import TorrentMeta
+
+logger = logging.getLogger(__name__)
+
+CHECKING_STATES = {"checkingDL", "checkingUP", "checkingResumeData", "moving"}
+DOWNLOADING_STATES = {"allocating", "downloading", "metaDL", "pausedDL", "queuedDL", "stalledDL", "forcedDL"}
+PAUSED_STATES = {"pausedDL", "pausedUP"}
+# 恢复后到下一次同步前的状态
+RESUMED_STATES = {"pausedDL": "stalledDL", "pausedUP": "stalledUP"}
+
 
 class TorrentStatus:
+    # 状态直接读取镜像中的数据，同步后自动更新
     def __init__(self, hash, data):
-        self.checking = data["state"] in ["checkingDL", "checkingUP", "checkingResumeData", "moving"]
-        self.downloading = data["state"] in ["allocating", "downloading", "metaDL", "pausedDL", "queuedDL", "stalledDL", "forcedDL"]
-        self.seeding = not (self.checking or self.downloading)
+        self._data = data
+
+    @property
+    def checking(self):
+        return self._data["state"] in CHECKING_STATES
+
+    @property
+    def downloading(self):
+        return self._data["state"] in DOWNLOADING_STATES
+
+    @property
+    def seeding(self):
+        return not (self.checking or self.downloading)
+
+    @property
+    def paused(self):
+        return self._data["state"] in PAUSED_STATES
+
 
 class Torrent:
     def __init__(self, hash, data):
         self.id = hash
-        self.date_added = data["added_on"]
-        self.rateUpload = data["upspeed"]
+        self._data = data
         self.status = TorrentStatus(hash, data)
-        self.total_size = data["size"]
-        self.name = data["name"]
-    
+
+    @property
+    def date_added(self):
+        return self._data["added_on"]
+
+    @property
+    def rateUpload(self):
+        return self._data["upspeed"]
+
+    @property
+    def total_size(self):
+        return self._data["size"]
+
+    @property
+    def name(self):
+        return self._data["name"]
+
+    @property
+    def uploaded(self):
+        return self._data.get("uploaded", 0)
+
+    @property
+    def ratio(self):
+        return self._data.get("ratio", 0.0)
+
+    @property
+    def tags(self):
+        return [tag.strip() for tag in self._data.get("tags", "").split(",") if tag.strip() != ""]
+
+    @property
+    def amount_left(self):
+        return self._data.get("amount_left", 0)
+
+    @property
+    def num_complete(self):
+        return self._data.get("num_complete", 0)
+
+    @property
+    def num_incomplete(self):
+        return self._data.get("num_incomplete", 0)
+
     def __str__(self):
         return f'Torrent "{self.name}"'
 
@@ -42,104 +105,346 @@ class BitTorrent:
         self.download_path = config.get_qbittorrent_config('qbittorrent-download-path')
 
         self._session = requests.Session()
-        self._main_data = None
-
-        self.login()
+        # 本地维护的 maindata 镜像，通过 rid 增量同步
+        self._rid = 0
+        self._torrents = dict()
+        self._server_state = dict()
+        self._sync_time = None
+        # 扫描线程也会读取镜像（预留空间），读取和修改镜像都要持有该锁
+        self._lock = threading.RLock()
+        # 同一时间只进行一次同步，避免两个线程用同一个 rid 请求
+        self._sync_lock = threading.Lock()
+        # 种子增删或下载完成后置为 True，用于触发磁盘检查
+        self._space_changed = True
     
+    def _post(self, endpoint, data=None, **kwargs):
+        # 所有 WebUI API 调用都经过这里，记录耗时和状态码
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = self._session.post(f"http://{self.host}:{self.port}/api/v2/{endpoint}", data=data, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            QBITTORRENT_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+            QBITTORRENT_REQUESTS.inc(endpoint=endpoint, status=status)
+
+    def wait_until_ready(self, timeout=60.0):
+        # 按指数退避探测 WebUI，可以连接时返回 True，超过 timeout 返回 False
+        deadline = time.monotonic() + timeout
+        interval = 0.1
+        while True:
+            try:
+                response = self._session.get(f"http://{self.host}:{self.port}/api/v2/app/version", timeout=2)
+                # 未登录时返回 403，同样说明 WebUI 已经启动
+                if response.status_code in (200, 403):
+                    return True
+            except requests.RequestException as e:
+                logger.debug('qBittorrent not ready: %r', e)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, 2.0)
+
     def login(self):
-        self._session.post(f"http://{self.host}:{self.port}/api/v2/auth/login", {
-            "username": self.username,
-            "password": self.password
-        })
+        try:
+            response = self._post("auth/login", {
+                "username": self.username,
+                "password": self.password
+            })
+        except Exception as e:
+            logger.error('login fail: %r', e)
+            return False
+        # 用户名或密码错误时状态码同样为 200，内容为 "Fails."
+        if response.status_code != 200 or response.text.strip() != "Ok.":
+            logger.error('qBittorrent login fail: %s %s', response.status_code, response.text.strip())
+            return False
+        return True
+
+    def connect(self, timeout=60.0):
+        # 等待 WebUI 启动、登录并获取一次全量数据
+        if not self.wait_until_ready(timeout):
+            logger.error('qBittorrent is not ready after %s seconds', timeout)
+            return False
+        if not self.login():
+            return False
+        return self.get_main_data(True) is not None
 
     def download_from_file(self, filepath, paused=False):
         try:
             with open(filepath, "rb") as f:
                 return self.download_from_content(f.read(), paused)
         except Exception as e:
-            print('[ERROR] ' + repr(e))
+            logger.error('download_from_file fail: %r', e)
             return None
     
     def download_from_content(self, content, paused=False):
+        new_torrents = self.download_from_contents([content], paused)
+        return new_torrents[0] if new_torrents is not None else None
+
+    def download_from_contents(self, contents, paused=False, tags=()):
+        # 一次请求添加多个种子，返回与 contents 一一对应的 Torrent，添加失败的位置为 None
+        if len(contents) == 0:
+            return list()
         try:
-            response = self._session.post(f"http://{self.host}:{self.port}/api/v2/torrents/add", data={
+            response = self._post("torrents/add", data={
                 "savepath": self.download_path,
                 "paused": "true" if paused else "false",
-                "tags": "byrbt_bot"
-            }, files={
-                "torrents": ("torrent.torrent", content, "application/x-bittorrent"),
-            })
+                "tags": ",".join(["byrbt_bot"] + list(tags))
+            }, files=[
+                ("torrents", (f"torrent{i}.torrent", content, "application/x-bittorrent"))
+                for i, content in enumerate(contents)
+            ])
             if response.status_code == 200:
-                hash = hashlib.sha1(bencode(bdecode(content)[b"info"])).hexdigest()
-                time.sleep(1)
-                main_data = self.get_main_data(True)
-                if hash in main_data["torrents"]:
-                    return Torrent(hash, main_data["torrents"][hash])
-                else:
-                    return None
+                hashes = [TorrentMeta(content).info_hash for content in contents]
+                found = self.wait_for_torrents(hashes)
+                return [found.get(hash) for hash in hashes]
             else:
                 return None
         except Exception as e:
-            print('[ERROR] ' + repr(e))
+            logger.error('download_from_contents fail: %r', e)
             return None
-    
+
+    def wait_for_torrents(self, hashes, timeout=10.0):
+        # 通过增量同步等待添加的种子出现，多个种子共用一次等待，返回 {hash: Torrent}
+        pending = set(hashes)
+        found = dict()
+        deadline = time.monotonic() + timeout
+        interval = 0.05
+        while True:
+            try:
+                self._sync()
+            except Exception as e:
+                self._rid = 0
+                logger.error('wait_for_torrents fail: %r', e)
+            with self._lock:
+                for hash in list(pending):
+                    if hash in self._torrents:
+                        found[hash] = Torrent(hash, self._torrents[hash])
+                        pending.discard(hash)
+            remaining = deadline - time.monotonic()
+            if len(pending) == 0 or remaining <= 0:
+                break
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, 1.0)
+
+        if len(pending) > 0:
+            # 超时后直接按 hash 查询一次，避免已添加的种子被误判为失败
+            try:
+                response = self._post("torrents/info", data={
+                    "hashes": self._join_hashes(pending)
+                })
+                with self._lock:
+                    for data in response.json():
+                        hash = data["hash"]
+                        self._torrents.setdefault(hash, data)
+                        found[hash] = Torrent(hash, self._torrents[hash])
+            except Exception as e:
+                logger.error('wait_for_torrents fail: %r', e)
+        return found
+
+    @staticmethod
+    def _join_hashes(ids):
+        if isinstance(ids, str):
+            return ids
+        return "|".join(ids)
+
     def remove(self, ids, delete_data=False):
+        # ids 可以是单个 hash，也可以是 hash 列表，列表会合并为一次请求
         try:
-            response = self._session.post(f"http://{self.host}:{self.port}/api/v2/torrents/delete", data={
-                "hashes": ids,
+            if not isinstance(ids, str) and len(ids) == 0:
+                return True
+            response = self._post("torrents/delete", data={
+                "hashes": self._join_hashes(ids),
                 "deleteFiles": "true" if delete_data else "false"
             })
-            return True
+            return response.status_code == 200
         except Exception as e:
-            print('[ERROR] ' + repr(e))
+            logger.error('remove fail: %r', e)
             return None
 
     def start_torrent(self, ids):
         try:
-            response = self._session.post(f"http://{self.host}:{self.port}/api/v2/torrents/resume", data={
-                "hashes": ids
+            if not isinstance(ids, str) and len(ids) == 0:
+                return True
+            response = self._post("torrents/resume", data={
+                "hashes": self._join_hashes(ids)
+            })
+            if response.status_code != 200:
+                return False
+            self._update_local(ids, lambda data: data.update(state=RESUMED_STATES.get(data["state"], data["state"])))
+            return True
+        except Exception as e:
+            logger.error('start_torrent fail: %r', e)
+            return None
+
+    def pause_torrent(self, ids):
+        try:
+            if not isinstance(ids, str) and len(ids) == 0:
+                return True
+            response = self._post("torrents/pause", data={
+                "hashes": self._join_hashes(ids)
+            })
+            if response.status_code != 200:
+                return False
+            self._update_local(ids, lambda data: data.update(
+                state="pausedDL" if data["state"] in DOWNLOADING_STATES else "pausedUP"))
+            return True
+        except Exception as e:
+            logger.error('pause_torrent fail: %r', e)
+            return None
+
+    def add_tags(self, ids, tags):
+        return self._edit_tags("torrents/addTags", ids, tags)
+
+    def remove_tags(self, ids, tags):
+        return self._edit_tags("torrents/removeTags", ids, tags)
+
+    def _edit_tags(self, endpoint, ids, tags):
+        try:
+            if not isinstance(ids, str) and len(ids) == 0:
+                return True
+            response = self._post(endpoint, data={
+                "hashes": self._join_hashes(ids),
+                "tags": ",".join(tags)
             })
+            if response.status_code != 200:
+                return False
+
+            def edit(data):
+                current = [tag.strip() for tag in data.get("tags", "").split(",") if tag.strip() != ""]
+                if endpoint == "torrents/addTags":
+                    current += [tag for tag in tags if tag not in current]
+                else:
+                    current = [tag for tag in current if tag not in tags]
+                data["tags"] = ", ".join(current)
+            self._update_local(ids, edit)
             return True
         except Exception as e:
-            print('[ERROR] ' + repr(e))
+            logger.error('%s fail: %r', endpoint, e)
             return None
 
-    def get_list(self):
+    def _update_local(self, ids, update):
+        # 请求成功后立即修改镜像，不必等下一次同步，避免按旧状态重复请求
+        if isinstance(ids, str):
+            ids = [ids]
+        with self._lock:
+            for hash in ids:
+                data = self._torrents.get(hash)
+                if data is not None:
+                    update(data)
+
+    def get_list(self, force=True):
         try:
-            torrents = self.get_main_data(True)["torrents"]
+            torrents = self.get_main_data(force)["torrents"]
+            with self._lock:
+                items = list(torrents.items())
             torrent_list = []
-            for hash, data in torrents.items():
-                if "byrbt_bot" in data["tags"].split(","):
-                    torrent_list.append(Torrent(hash, data))
+            for hash, data in items:
+                # qBittorrent 返回的标签以 ", " 分隔
+                torrent = Torrent(hash, data)
+                if "byrbt_bot" in torrent.tags:
+                    torrent_list.append(torrent)
             return torrent_list
         except Exception as e:
-            print('[ERROR] ' + repr(e))
+            logger.error('get_list fail: %r', e)
             return None
     
+    def get_torrent(self, hash, force=False):
+        main_data = self.get_main_data(force)
+        if main_data is None:
+            return None
+        data = main_data["torrents"].get(hash)
+        if data is None:
+            return None
+        return Torrent(hash, data)
+
     def get_main_data(self, force=False):
         try:
-            if self._main_data:
-                if (time.time() - self._main_data["time"]) < 300 and not force:
-                    return self._main_data["data"]
-            response = self._session.post(f"http://{self.host}:{self.port}/api/v2/sync/maindata")
-            self._main_data = {
-                "time": time.time(),
-                "data": response.json()
-            }
-            return self._main_data["data"]
+            if self._sync_time is not None and (time.time() - self._sync_time) < 300 and not force:
+                return self._main_data()
+            self._sync()
+            return self._main_data()
         except Exception as e:
-            print('[ERROR] ' + repr(e))
+            # 同步失败后下一次重新获取全量数据
+            self._rid = 0
+            logger.error('get_main_data fail: %r', e)
             return None
 
+    def _main_data(self):
+        return {
+            "torrents": self._torrents,
+            "server_state": self._server_state,
+        }
+
+    def _sync(self):
+        with self._sync_lock:
+            response = self._post("sync/maindata", data={
+                "rid": self._rid
+            })
+            response.raise_for_status()
+            self._apply_delta(response.json())
+            self._sync_time = time.time()
+
+    def _apply_delta(self, delta):
+        with self._lock:
+            self._apply_delta_locked(delta)
+
+    def _apply_delta_locked(self, delta):
+        if delta.get("full_update", False):
+            # 全量更新时保留原有 dict 对象，已创建的 Torrent 视图继续有效
+            torrents = delta.get("torrents", dict())
+            for hash in list(self._torrents.keys()):
+                if hash not in torrents:
+                    del self._torrents[hash]
+            self._server_state.clear()
+        else:
+            torrents = delta.get("torrents", dict())
+            for hash in delta.get("torrents_removed", list()):
+                if self._torrents.pop(hash, None) is not None:
+                    self._space_changed = True
+
+        for hash, data in torrents.items():
+            if hash in self._torrents:
+                old_data = self._torrents[hash]
+                if old_data.get("state") in DOWNLOADING_STATES and \
+                        data.get("state", old_data.get("state")) not in DOWNLOADING_STATES:
+                    self._space_changed = True
+                old_data.update(data)
+            else:
+                self._torrents[hash] = data
+                self._space_changed = True
+        self._server_state.update(delta.get("server_state", dict()))
+        self._rid = delta.get("rid", self._rid)
+
+    def pop_space_changed(self):
+        space_changed = self._space_changed
+        self._space_changed = False
+        return space_changed
+
+    def get_transfer_speeds(self, force=False):
+        # 返回 (下载速度, 上传速度)，单位 B/s
+        try:
+            server_state = self.get_main_data(force)["server_state"]
+            with self._lock:
+                return server_state.get("dl_info_speed"), server_state.get("up_info_speed")
+        except Exception as e:
+            logger.error('get_transfer_speeds fail: %r', e)
+            return None, None
+
     def get_free_space(self, force=False):
         try:
-            return self.get_main_data(force)["server_state"]["free_space_on_disk"]
+            server_state = self.get_main_data(force)["server_state"]
+            with self._lock:
+                return server_state["free_space_on_disk"]
         except Exception as e:
-            print('[ERROR] ' + repr(e))
+            logger.error('get_free_space fail: %r', e)
             return None
 
 
 if __name__ == '__main__':
     config = ReadConfig(filepath='../config/config.ini')
     bit_torrent = BitTorrent(config)
+    bit_torrent.connect()
     torrents = bit_torrent.get_list()
@@ -0,0 +1,88 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : download_limiter.py
+@Time    : 2026/10/18 21:20
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import time
+
+from utils.admission import PROMOTION_RANK
+
+# 由限速暂停（或暂停添加）的种子带有该标签，手动暂停的种子不会被恢复
+QUEUED_TAG = 'byrbt_bot_queued'
+
+
+class DownloadLimiter:
+    """根据实测下载速度限制同时下载的种子数量
+
+    下载能力取 qBittorrent server_state 中 dl_info_speed 的峰值（每分钟乘以 decay 衰减），
+    按优先级依次选择种子，使选中种子的剩余大小之和能在 target_seconds 内下载完成，
+    其余种子暂停排队。已经在下载的种子允许超出 hysteresis 倍，避免反复暂停和恢复。
+    排队的种子带有 QUEUED_TAG 标签，重启后仍然可以区分；没有该标签的暂停种子视为手动暂停，不参与调度。
+    """
+
+    def __init__(self, target_seconds=3600, min_active=1, max_active=0, initial_speed=10 * 1024 * 1024,
+                 decay=0.98, hysteresis=1.25):
+        self.target_seconds = target_seconds
+        self.min_active = max(min_active, 1)
+        self.max_active = max_active
+        self.decay = decay
+        self.hysteresis = hysteresis
+        self.capacity = initial_speed
+        self._update_time = None
+        # hash -> TorrentInfo，添加种子时记录促销和做种信息
+        self._infos = dict()
+
+    def remember(self, info_hash, torrent_info):
+        self._infos[info_hash] = torrent_info
+
+    def forget(self, hashes):
+        for info_hash in hashes:
+            self._infos.pop(info_hash, None)
+
+    def update_speed(self, dl_speed, active_count, now=None):
+        # 没有种子在下载时的速度不能说明带宽，不更新
+        now = time.monotonic() if now is None else now
+        if active_count <= 0 or dl_speed is None:
+            return
+        if self._update_time is not None:
+            self.capacity *= self.decay ** ((now - self._update_time) / 60)
+        self._update_time = now
+        self.capacity = max(dl_speed, self.capacity)
+
+    def priority(self, torrent):
+        torrent_info = self._infos.get(torrent.id)
+        if torrent_info is not None:
+            rank = PROMOTION_RANK.get(torrent_info.tag, len(PROMOTION_RANK))
+        else:
+            rank = len(PROMOTION_RANK)
+        leechers = torrent.num_incomplete
+        seeders = torrent.num_complete
+        ratio = leechers / seeders if seeders > 0 else float(leechers)
+        return rank, -ratio, torrent.amount_left
+
+    @staticmethod
+    def is_queued(torrent):
+        return torrent.status.paused and QUEUED_TAG in torrent.tags
+
+    def plan(self, torrents):
+        # 返回 (需要暂停的种子, 需要恢复的种子)，只考虑未完成且不是手动暂停的种子
+        downloading = [torrent for torrent in torrents if torrent.status.downloading and not torrent.status.checking
+                       and (not torrent.status.paused or self.is_queued(torrent))]
+        budget = self.capacity * self.target_seconds
+        keep = set()
+        used = 0
+        for torrent in sorted(downloading, key=self.priority):
+            if self.max_active > 0 and len(keep) >= self.max_active:
+                break
+            limit = budget if torrent.status.paused else budget * self.hysteresis
+            if len(keep) >= self.min_active and used + torrent.amount_left > limit:
+                break
+            keep.add(torrent.id)
+            used += torrent.amount_left
+        pause = [torrent for torrent in downloading if torrent.id not in keep and not torrent.status.paused]
+        resume = [torrent for torrent in downloading if torrent.id in keep and torrent.status.paused]
+        return pause, resume
@@ -0,0 +1,103 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : eviction.py
+@Time    : 2026/10/18 14:20
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+from bisect import bisect_left
+from itertools import accumulate
+
+
+class EvictionPlan:
+    __slots__ = ('evict', 'admit_count', 'torrent_count', 'total_size', 'free_space')
+
+    def __init__(self, evict, admit_count, torrent_count, total_size, free_space):
+        self.evict = evict
+        self.admit_count = admit_count
+        # 执行计划并添加种子后的预计状态
+        self.torrent_count = torrent_count
+        self.total_size = total_size
+        self.free_space = free_space
+
+
+class EvictionPlanner:
+    """根据当前种子和本周期待添加的种子，一次算出需要删除的种子
+
+    同时满足种子数量上限、种子总大小上限和剩余空间下限。可删除的种子按
+    (添加时间, 上传速度) 排序，先按顺序选出满足条件的前缀，再把不必要的种子
+    从计划中移回，尽量少删除仍在做种的种子。待添加的种子按优先级排列，空间
+    不够时从末尾开始放弃。上传速度由 rate_of 提供，默认为当前速度。
+    """
+
+    def __init__(self, max_torrent_count, max_torrent_total_size, min_free_space, protect_rate=500000,
+                 rate_of=None):
+        self.max_torrent_count = max_torrent_count
+        self.max_torrent_total_size = max_torrent_total_size
+        self.min_free_space = min_free_space
+        self.protect_rate = protect_rate
+        self.rate_of = rate_of if rate_of is not None else (lambda torrent: torrent.rateUpload)
+
+    def is_evictable(self, torrent):
+        if torrent.status.checking:
+            return False
+        # rateUpload > 500KB/s
+        if (torrent.status.downloading or torrent.status.seeding) and self.rate_of(torrent) > self.protect_rate:
+            return False
+        return True
+
+    def sort_key(self, torrent):
+        return torrent.date_added, self.rate_of(torrent)
+
+    def plan(self, torrents, free_space, incoming_sizes=()):
+        total_size = sum(torrent.total_size for torrent in torrents)
+        candidates = sorted((torrent for torrent in torrents if self.is_evictable(torrent)), key=self.sort_key)
+        freed = list(accumulate(torrent.total_size for torrent in candidates))
+        incoming = list(accumulate(incoming_sizes))
+
+        for admit_count in range(len(incoming), -1, -1):
+            incoming_size = incoming[admit_count - 1] if admit_count > 0 else 0
+            evict_count = self._evict_count(len(torrents), total_size, free_space, admit_count, incoming_size, freed)
+            if evict_count is not None:
+                break
+        else:
+            # 不添加种子时也无法满足条件，尽可能多地释放空间
+            admit_count = 0
+            incoming_size = 0
+            evict_count = len(candidates)
+
+        evict = self._prune(candidates[:evict_count], len(torrents), total_size, free_space, admit_count,
+                            incoming_size)
+        evict_size = sum(torrent.total_size for torrent in evict)
+        return EvictionPlan(evict, admit_count, len(torrents) - len(evict) + admit_count,
+                            total_size - evict_size + incoming_size, free_space + evict_size - incoming_size)
+
+    def _required(self, torrent_count, total_size, free_space, admit_count, incoming_size):
+        count = max(torrent_count + admit_count - self.max_torrent_count, 0)
+        size = max(incoming_size + self.min_free_space - free_space,
+                   total_size + incoming_size - self.max_torrent_total_size, 0)
+        return count, size
+
+    def _evict_count(self, torrent_count, total_size, free_space, admit_count, incoming_size, freed):
+        count, size = self._required(torrent_count, total_size, free_space, admit_count, incoming_size)
+        if size > 0:
+            index = bisect_left(freed, size)
+            if index >= len(freed):
+                return None
+            count = max(count, index + 1)
+        if count > len(freed):
+            return None
+        return count
+
+    def _prune(self, evict, torrent_count, total_size, free_space, admit_count, incoming_size):
+        count, size = self._required(torrent_count, total_size, free_space, admit_count, incoming_size)
+        evict_size = sum(torrent.total_size for torrent in evict)
+        kept = set()
+        # 从最后选中的（最新、上传最快的）种子开始，能保留就保留
+        for torrent in reversed(evict):
+            if len(evict) - len(kept) - 1 >= count and evict_size - torrent.total_size >= size:
+                kept.add(torrent.id)
+                evict_size -= torrent.total_size
+        return [torrent for torrent in evict if torrent.id not in kept]
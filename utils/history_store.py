@@ -0,0 +1,418 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : history_store.py
+@Time    : 2026/10/18 22:30
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import argparse
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from utils.torrent_info import Promotion
+
+logger = logging.getLogger(__name__)
+
+_FREE_TAGS = {Promotion.FREE.value, Promotion.TWO_UP_FREE.value}
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    row_count INTEGER NOT NULL,
+    page_count INTEGER NOT NULL,
+    failed_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scans_time ON scans (time);
+CREATE TABLE IF NOT EXISTS scan_rows (
+    scan_id INTEGER NOT NULL,
+    time REAL NOT NULL,
+    seed_id INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    seeding INTEGER NOT NULL,
+    downloading INTEGER NOT NULL,
+    finished INTEGER NOT NULL,
+    flags INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS scan_rows_seed_time ON scan_rows (seed_id, time);
+CREATE INDEX IF NOT EXISTS scan_rows_time ON scan_rows (time);
+CREATE TABLE IF NOT EXISTS torrents (
+    seed_id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    cat TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    free_since REAL,
+    free_until REAL,
+    added_time REAL
+);
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    seed_id INTEGER NOT NULL,
+    decision TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    info_hash TEXT,
+    size_bytes INTEGER
+);
+CREATE INDEX IF NOT EXISTS decisions_seed_time ON decisions (seed_id, time);
+CREATE INDEX IF NOT EXISTS decisions_time ON decisions (time);
+CREATE INDEX IF NOT EXISTS decisions_hash ON decisions (info_hash);
+CREATE TABLE IF NOT EXISTS evictions (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    info_hash TEXT NOT NULL,
+    seed_id INTEGER,
+    name TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    uploaded INTEGER NOT NULL,
+    ratio REAL NOT NULL,
+    added_time REAL NOT NULL,
+    upload_rate REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS evictions_seed_time ON evictions (seed_id, time);
+CREATE INDEX IF NOT EXISTS evictions_time ON evictions (time);
+'''
+
+# 每个种子只保留一行汇总，查询 Free 持续时间时不必扫描 scan_rows
+_UPSERT_TORRENT = '''
+INSERT INTO torrents (seed_id, title, cat, size_bytes, first_seen, last_seen, free_since, free_until, added_time)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (seed_id) DO UPDATE SET
+    title = excluded.title, cat = excluded.cat, size_bytes = excluded.size_bytes, last_seen = excluded.last_seen,
+    added_time = COALESCE(excluded.added_time, torrents.added_time),
+    free_since = COALESCE(torrents.free_since, excluded.free_since),
+    free_until = COALESCE(excluded.free_until, torrents.free_until)
+'''
+
+# 超过保留时间的 scan_rows 只保留每个添加过的种子添加前最后一行，训练上传收益模型时需要
+_PRUNE_SCAN_ROWS = '''
+DELETE FROM scan_rows WHERE time < ? AND rowid NOT IN (
+    SELECT kept FROM (
+        SELECT (SELECT r.rowid FROM scan_rows r WHERE r.seed_id = d.seed_id AND r.time <= d.time
+                ORDER BY r.time DESC LIMIT 1) AS kept
+        FROM decisions d WHERE d.decision = 'admitted')
+    WHERE kept IS NOT NULL)
+'''
+
+# 列表未变化时更新上次列出的种子，每条语句最多带的 id 数
+_TOUCH_CHUNK = 500
+
+_INSERT_EVICTION = '''
+INSERT INTO evictions (time, info_hash, seed_id, name, size_bytes, uploaded, ratio, added_time, upload_rate)
+VALUES (?, ?, (SELECT seed_id FROM decisions WHERE info_hash = ? AND decision = 'admitted'
+               ORDER BY time DESC LIMIT 1), ?, ?, ?, ?, ?, ?)
+'''
+
+
+# 旧版本数据库中缺少的列
+_COLUMNS = [
+    ('scan_rows', 'flags', 'INTEGER NOT NULL DEFAULT 0'),
+    ('torrents', 'added_time', 'REAL'),
+]
+
+# scan_rows.flags
+FLAG_HOT = 1
+FLAG_NEW = 2
+FLAG_RECOMMENDED = 4
+
+
+def _migrate(connection):
+    for table, column, definition in _COLUMNS:
+        columns = [row[1] for row in connection.execute('PRAGMA table_info({})'.format(table))]
+        if column not in columns:
+            connection.execute('ALTER TABLE {} ADD COLUMN {} {}'.format(table, column, definition))
+
+
+def _flags(torrent_info):
+    return (FLAG_HOT if torrent_info.is_hot else 0) | (FLAG_NEW if torrent_info.is_new else 0) | \
+        (FLAG_RECOMMENDED if torrent_info.is_recommended else 0)
+
+
+def _seed_id(seed_id):
+    try:
+        return int(seed_id)
+    except (TypeError, ValueError):
+        return -1
+
+
+class HistoryStore:
+    """扫描结果、添加决策（及原因）和删除记录的 SQLite 数据库
+
+    record_* 只把记录放入队列，由后台线程每 flush_interval 秒或攒够 batch_size 条后
+    在一个事务中写入，数据库使用 WAL 模式，查询时不阻塞写入。同一种子连续相同的决策只记录一次，
+    用于去重的最近决策只保留最近的 decision_cache_size 个种子，被淘汰的种子下次只会多记录一条。
+    列表未变化时不写 scan_rows，只更新上次列出的种子的 last_seen/free_until。
+    retention 大于 0 时每 prune_interval 秒删除早于 retention 秒的 scan_rows，添加过的种子保留添加前的最后一行。
+    """
+
+    def __init__(self, path, batch_size=1000, flush_interval=2.0, queue_size=100000, decision_cache_size=10000,
+                 retention=0, prune_interval=3600):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self.decision_cache_size = decision_cache_size
+        # 种子 id -> (决策, 原因)，按最近使用排序
+        self._last_decision = OrderedDict()
+        self._lock = threading.Lock()
+        self._dropped = 0
+        self.retention = retention
+        self.prune_interval = prune_interval
+        # 上次记录的扫描中列出的种子 id 和其中 Free 的种子 id
+        self._last_listed = (list(), list())
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.path) or '.', mode=0o755, exist_ok=True)
+        connection = connect(self.path)
+        connection.executescript(_SCHEMA)
+        with connection:
+            _migrate(connection)
+        connection.close()
+        self._thread = threading.Thread(target=self._run, name='history', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self._dropped > 0:
+            logger.warning('history queue full, %d record(s) dropped', self._dropped)
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._dropped += 1
+
+    def record_scan(self, scan_result, now=None):
+        now = time.time() if now is None else now
+        rows = [(_seed_id(info.seed_id), info.title, info.cat, info.added_time if info.added_time >= 0 else None,
+                 info.tag.value, info.size_bytes, info.seeding, info.downloading, info.finished, _flags(info))
+                for info in scan_result.torrent_infos]
+        self._last_listed = ([row[0] for row in rows], [row[0] for row in rows if row[4] in _FREE_TAGS])
+        self._put(('scan', now, scan_result.page_count, scan_result.failed_count, rows))
+
+    def record_unchanged(self, now=None):
+        # 列表未变化（指纹相同或 304），上次列出的种子仍在列表中
+        now = time.time() if now is None else now
+        listed, free = self._last_listed
+        if len(listed) > 0:
+            self._put(('touch', now, listed, free))
+
+    def record_decision(self, seed_id, decision, reason, info_hash=None, size_bytes=None, now=None):
+        self.record_decisions([(seed_id, decision, reason, info_hash, size_bytes)], now)
+
+    def record_decisions(self, decisions, now=None):
+        # decisions 为 [(种子id, 决策, 原因, info_hash, 大小)]，一次放入队列
+        now = time.time() if now is None else now
+        rows = list()
+        with self._lock:
+            last_decision = self._last_decision
+            for seed_id, decision, reason, info_hash, size_bytes in decisions:
+                seed_id = _seed_id(seed_id)
+                if last_decision.get(seed_id) != (decision, reason):
+                    last_decision[seed_id] = (decision, reason)
+                    rows.append((now, seed_id, decision, reason, info_hash, size_bytes))
+                last_decision.move_to_end(seed_id)
+            while len(last_decision) > self.decision_cache_size:
+                last_decision.popitem(last=False)
+        if len(rows) > 0:
+            self._put(('decision', rows))
+
+    def record_eviction(self, torrent, upload_rate=None, now=None):
+        now = time.time() if now is None else now
+        upload_rate = torrent.rateUpload if upload_rate is None else upload_rate
+        self._put(('eviction', (now, torrent.id, torrent.id, torrent.name, torrent.total_size, torrent.uploaded,
+                                torrent.ratio, torrent.date_added, upload_rate)))
+
+    def _run(self):
+        connection = connect(self.path)
+        last_prune = float('-inf')
+        stop = False
+        while not stop:
+            batch = list()
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            if len(batch) > 0:
+                try:
+                    with connection:
+                        for item in batch:
+                            self._write(connection, item)
+                except sqlite3.Error as e:
+                    logger.error('write history fail: %r', e)
+            if self.retention > 0 and time.monotonic() - last_prune >= self.prune_interval:
+                last_prune = time.monotonic()
+                self._prune(connection, time.time() - self.retention)
+        connection.close()
+
+    @staticmethod
+    def _prune(connection, before):
+        try:
+            with connection:
+                count = connection.execute(_PRUNE_SCAN_ROWS, (before,)).rowcount
+        except sqlite3.Error as e:
+            logger.error('prune history fail: %r', e)
+            return
+        if count > 0:
+            logger.info('pruned %d scan row(s)', count)
+
+    @staticmethod
+    def _write(connection, item):
+        kind = item[0]
+        if kind == 'scan':
+            _, now, page_count, failed_count, rows = item
+            scan_id = connection.execute('INSERT INTO scans (time, row_count, page_count, failed_count) '
+                                         'VALUES (?, ?, ?, ?)', (now, len(rows), page_count, failed_count)).lastrowid
+            connection.executemany('INSERT INTO scan_rows (scan_id, time, seed_id, tag, size_bytes, seeding, '
+                                   'downloading, finished, flags) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                   [(scan_id, now, row[0]) + row[4:] for row in rows])
+            connection.executemany(_UPSERT_TORRENT, [
+                (row[0], row[1], row[2], row[5], now, now) + ((now, now) if row[4] in _FREE_TAGS else (None, None)) +
+                (row[3],) for row in rows])
+        elif kind == 'touch':
+            _, now, listed, free = item
+            for ids, column in ((listed, 'last_seen'), (free, 'free_until')):
+                for i in range(0, len(ids), _TOUCH_CHUNK):
+                    chunk = ids[i:i + _TOUCH_CHUNK]
+                    connection.execute('UPDATE torrents SET {} = ? WHERE seed_id IN ({})'.format(
+                        column, ', '.join('?' * len(chunk))), [now] + chunk)
+        elif kind == 'decision':
+            connection.executemany('INSERT INTO decisions (time, seed_id, decision, reason, info_hash, size_bytes) '
+                                   'VALUES (?, ?, ?, ?, ?, ?)', item[1])
+        elif kind == 'eviction':
+            connection.execute(_INSERT_EVICTION, item[1])
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=30)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+
+def _since(args):
+    return time.time() - args.days * 86400 if args.days > 0 else 0
+
+
+def _print_table(header, rows):
+    rows = [[str(value) for value in row] for row in rows]
+    widths = [max([len(title)] + [len(row[i]) for row in rows]) for i, title in enumerate(header)]
+    print('  '.join(title.ljust(width) for title, width in zip(header, widths)))
+    for row in rows:
+        print('  '.join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+def _percentile(values, fraction):
+    if len(values) == 0:
+        return 0
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def query_categories(connection, since):
+    # 以删除时的上传量统计：上传量/种子大小，以及每 GiB 每天的上传量
+    return connection.execute('''
+        SELECT COALESCE(t.cat, '?') AS cat, COUNT(*), SUM(e.size_bytes) / 1073741824.0, SUM(e.uploaded) / 1073741824.0,
+               SUM(e.uploaded) * 1.0 / MAX(SUM(e.size_bytes), 1),
+               SUM(e.uploaded) * 86400.0 / MAX(SUM(e.size_bytes / 1073741824.0 * MAX(e.time - e.added_time, 1)), 1)
+               / 1073741824.0
+        FROM evictions e LEFT JOIN torrents t ON t.seed_id = e.seed_id
+        WHERE e.time >= ?
+        GROUP BY cat ORDER BY 5 DESC''', (since,)).fetchall()
+
+
+def query_free(connection, since):
+    # Free 持续时间按扫描间隔计，是下限
+    durations = [row[0] for row in connection.execute('''
+        SELECT free_until - free_since FROM torrents
+        WHERE free_since IS NOT NULL AND free_until >= ? ORDER BY 1''', (since,))]
+    return durations
+
+
+def query_decisions(connection, since):
+    return connection.execute('''
+        SELECT decision, reason, COUNT(*) FROM decisions WHERE time >= ?
+        GROUP BY decision, reason ORDER BY 3 DESC''', (since,)).fetchall()
+
+
+def query_torrent(connection, seed_id):
+    events = connection.execute('''
+        SELECT time, 'decision', decision || ': ' || reason FROM decisions WHERE seed_id = ?
+        UNION ALL
+        SELECT time, 'eviction', printf('uploaded %.2f GiB, ratio %.2f', uploaded / 1073741824.0, ratio)
+        FROM evictions WHERE seed_id = ?
+        ORDER BY 1''', (seed_id, seed_id)).fetchall()
+    return connection.execute('SELECT * FROM torrents WHERE seed_id = ?', (seed_id,)).fetchone(), events
+
+
+def _format_time(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp)) if timestamp is not None else '-'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='query byrbt bot history')
+    parser.add_argument('--db', default='./data/history.db', help='history database path')
+    parser.add_argument('--days', type=float, default=0, help='only records of the last N days, 0 for all')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('categories', help='upload per GiB by category (evicted torrents)')
+    subparsers.add_parser('free', help='how long free torrents stayed free')
+    subparsers.add_parser('decisions', help='admission decisions by reason')
+    torrent_parser = subparsers.add_parser('torrent', help='history of one seed id')
+    torrent_parser.add_argument('seed_id', type=int)
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 1
+    if not os.path.exists(args.db):
+        print('{} not found'.format(args.db))
+        return 1
+
+    connection = connect(args.db)
+    start = time.perf_counter()
+    if args.command == 'categories':
+        _print_table(['category', 'count', 'size_gib', 'uploaded_gib', 'upload_per_gib', 'gib_per_gib_day'],
+                     [(cat, count, '{:.2f}'.format(size), '{:.2f}'.format(uploaded), '{:.3f}'.format(per_gib),
+                       '{:.3f}'.format(per_day)) for cat, count, size, uploaded, per_gib, per_day
+                      in query_categories(connection, _since(args))])
+    elif args.command == 'free':
+        durations = query_free(connection, _since(args))
+        hours = [value / 3600 for value in durations]
+        _print_table(['count', 'mean_h', 'p50_h', 'p90_h', 'max_h'], [(
+            len(hours), '{:.2f}'.format(sum(hours) / len(hours) if len(hours) > 0 else 0),
+            '{:.2f}'.format(_percentile(hours, 0.5)), '{:.2f}'.format(_percentile(hours, 0.9)),
+            '{:.2f}'.format(hours[-1] if len(hours) > 0 else 0))])
+    elif args.command == 'decisions':
+        _print_table(['decision', 'reason', 'count'], query_decisions(connection, _since(args)))
+    elif args.command == 'torrent':
+        torrent, events = query_torrent(connection, args.seed_id)
+        if torrent is not None:
+            print('{} [{}] {}'.format(torrent[0], torrent[2], torrent[1]))
+            print('free: {} - {}'.format(_format_time(torrent[6]), _format_time(torrent[7])))
+        _print_table(['time', 'event', 'detail'], [(_format_time(t), kind, detail) for t, kind, detail in events])
+    connection.close()
+    print('({:.1f} ms)'.format((time.perf_counter() - start) * 1000))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
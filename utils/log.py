@@ -0,0 +1,85 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : log.py
+@Time    : 2026/10/18 20:15
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+# LogRecord 自带的属性，其余通过 extra 传入的字段都写入日志
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def _extra_fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS and not k.startswith('_')}
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON，extra 中的字段原样保留"""
+
+    def format(self, record):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) +
+                    '.{:03d}'.format(int(record.msecs)),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """便于直接阅读的格式，extra 字段以 key=value 附在消息后"""
+
+    def __init__(self):
+        super(TextFormatter, self).__init__('%(asctime)s %(levelname)-7s [%(threadName)s] %(message)s')
+
+    def format(self, record):
+        line = super(TextFormatter, self).format(record)
+        fields = _extra_fields(record)
+        if len(fields) > 0:
+            line += ' ' + ' '.join('{}={}'.format(k, v) for k, v in fields.items())
+        return line
+
+
+def setup_logging(level='info', fmt='json', stream=None):
+    """日志先放入队列，由后台线程写到 stream，输出缓慢时不会阻塞主循环
+
+    返回 QueueListener，退出时自动 stop() 以写完队列中剩余的日志。
+    """
+    handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    handler.setFormatter(TextFormatter() if fmt == 'text' else JsonFormatter())
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for old_handler in list(root.handlers):
+        root.removeHandler(old_handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    # 第三方库的调试日志太多，只保留警告
+    for name in ('urllib3', 'bs4', 'charset_normalizer'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
+
+
+def _stop_listener(listener):
+    # 已经手动 stop() 过的 listener 不再重复停止
+    if listener._thread is not None:
+        listener.stop()
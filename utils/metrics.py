@@ -0,0 +1,264 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : metrics.py
+@Time    : 2026/10/18 19:20
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if len(pairs) == 0:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, _escape(value)) for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = dict()
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError('{} expects labels {}, got {}'.format(self.name, self.labelnames, tuple(labels)))
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            return [(key, value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = ['# HELP {} {}'.format(self.name, self.documentation), '# TYPE {} {}'.format(self.name, self.kind)]
+        for key, value in self._samples():
+            lines.append('{}{} {}'.format(self.name, _format_labels(self.labelnames, key), _format_value(value)))
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # [各区间计数..., +Inf 计数, 总和]
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            values[bisect.bisect_left(self.buckets, value)] += 1
+            values[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            values = self._values.get(self._key(labels))
+            return 0 if values is None else sum(values[:-1])
+
+    def _samples(self):
+        with self._lock:
+            return [(key, list(values)) for key, values in sorted(self._values.items())]
+
+    def render(self):
+        lines = ['# HELP {} {}'.format(self.name, self.documentation), '# TYPE {} histogram'.format(self.name)]
+        for key, values in self._samples():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values[:-1]):
+                cumulative += count
+                lines.append('{}_bucket{} {}'.format(
+                    self.name, _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))]),
+                    cumulative))
+            labels = _format_labels(self.labelnames, key)
+            lines.append('{}_sum{} {}'.format(self.name, labels, _format_value(values[-1])))
+            lines.append('{}_count{} {}'.format(self.name, labels, cumulative))
+        return lines
+
+
+class Registry:
+    """保存所有指标，按 Prometheus 文本格式输出"""
+
+    def __init__(self):
+        self._metrics = dict()
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError('duplicated metric: ' + metric.name)
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = list()
+        for metric in metrics:
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# 主循环各阶段：scan、parse、fetch、admit、evict、housekeeping
+PHASE_SECONDS = REGISTRY.histogram(
+    'byrbt_bot_phase_seconds', 'Time spent in each phase of the main loop.', ['phase'])
+PHASE_ERRORS = REGISTRY.counter(
+    'byrbt_bot_phase_errors_total', 'Exceptions raised in each phase of the main loop.', ['phase'])
+QBITTORRENT_SECONDS = REGISTRY.histogram(
+    'byrbt_bot_qbittorrent_request_seconds', 'Latency of qBittorrent WebUI API calls.', ['endpoint'])
+QBITTORRENT_REQUESTS = REGISTRY.counter(
+    'byrbt_bot_qbittorrent_requests_total', 'qBittorrent WebUI API calls by status code.', ['endpoint', 'status'])
+TRACKER_SECONDS = REGISTRY.histogram(
+    'byrbt_bot_tracker_request_seconds', 'Latency of byrbt requests.', ['page'])
+TRACKER_REQUESTS = REGISTRY.counter(
+    'byrbt_bot_tracker_requests_total', 'byrbt requests by status code.', ['page', 'status'])
+TRACKER_RETRIES = REGISTRY.counter(
+    'byrbt_bot_tracker_retries_total', 'byrbt requests retried after an error or an expired session.', ['page'])
+TORRENTS = REGISTRY.counter(
+    'byrbt_bot_torrents_total', 'Torrents by outcome: listed, candidate, fetched, admitted, rejected, evicted.',
+    ['outcome'])
+LAST_SCAN = REGISTRY.gauge(
+    'byrbt_bot_last_scan_torrents', 'Torrents listed and selected by the last scan that changed.', ['kind'])
+SCAN_INTERVAL = REGISTRY.gauge('byrbt_bot_scan_interval_seconds', 'Delay before the next scan.')
+FREE_SPACE = REGISTRY.gauge('byrbt_bot_free_space_bytes', 'Free space reported by qBittorrent.')
+MANAGED_TORRENTS = REGISTRY.gauge('byrbt_bot_managed_torrents', 'Torrents tagged byrbt_bot in qBittorrent.')
+TRANSFER_SPEED = REGISTRY.gauge(
+    'byrbt_bot_transfer_speed_bytes', 'Global transfer speed reported by qBittorrent.', ['direction'])
+ACTIVE_DOWNLOADS = REGISTRY.gauge('byrbt_bot_active_downloads', 'Unfinished torrents allowed to download.')
+QUEUED_DOWNLOADS = REGISTRY.gauge('byrbt_bot_queued_downloads', 'Unfinished torrents paused by the download limiter.')
+
+
+@contextmanager
+def track_phase(phase):
+    # 记录阶段耗时，出现异常时计数后继续抛出
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        PHASE_ERRORS.inc(phase=phase)
+        raise
+    finally:
+        PHASE_SECONDS.observe(time.perf_counter() - start, phase=phase)
+
+
+def timed_phase(phase):
+    # track_phase 的装饰器形式
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_phase(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer:
+    """在后台线程中提供 /metrics，默认只监听本机"""
+
+    def __init__(self, port, host='127.0.0.1', registry=REGISTRY):
+        handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True)
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
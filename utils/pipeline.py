@@ -0,0 +1,151 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : pipeline.py
+@Time    : 2026/10/18 16:30
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Pipeline:
+    """扫描 -> 获取种子文件 -> 添加到客户端 三个阶段并行执行，阶段之间使用有界队列连接
+
+    scan_once() 返回 (待获取的条目列表, 距下次扫描的秒数)，返回 None 时停止整个流水线；
+    fetch_one(item) 返回交给添加阶段的结果，返回 None 表示放弃该条目；
+    admit_batch(results) 一次处理队列中已到达的所有结果；
+    housekeeping() 在添加阶段空闲时调用，与添加操作在同一线程中执行。
+    同一 key 的条目在处理完成前不会被重复放入队列。
+    """
+
+    def __init__(self, scan_once, fetch_one, admit_batch, key=None, housekeeping=None, queue_size=32,
+                 fetch_workers=2, batch_window=0.5):
+        self.scan_once = scan_once
+        self.fetch_one = fetch_one
+        self.admit_batch = admit_batch
+        self.key = key if key is not None else (lambda item: item)
+        self.housekeeping = housekeeping
+        self.fetch_workers = fetch_workers
+        self.batch_window = batch_window
+        self._fetch_queue = queue.Queue(maxsize=queue_size)
+        self._admit_queue = queue.Queue(maxsize=queue_size)
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = list()
+
+    def _put(self, target, item):
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source, timeout=1):
+        try:
+            return source.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _release(self, key):
+        with self._in_flight_lock:
+            self._in_flight.discard(key)
+
+    def _scan_loop(self):
+        while not self._stop.is_set():
+            try:
+                result = self.scan_once()
+            except Exception as e:
+                logger.exception('scan fail: %r', e)
+                result = (list(), 60)
+            if result is None:
+                self._stop.set()
+                break
+            items, delay = result
+            for item in items:
+                key = self.key(item)
+                with self._in_flight_lock:
+                    if key in self._in_flight:
+                        continue
+                    self._in_flight.add(key)
+                if not self._put(self._fetch_queue, item):
+                    break
+            self._stop.wait(delay)
+
+    def _fetch_loop(self):
+        while not self._stop.is_set():
+            item = self._get(self._fetch_queue)
+            if item is None:
+                continue
+            try:
+                result = self.fetch_one(item)
+            except Exception as e:
+                logger.exception('fetch fail: %r', e)
+                result = None
+            if result is None or not self._put(self._admit_queue, (self.key(item), result)):
+                self._release(self.key(item))
+
+    def _admit_loop(self):
+        while not self._stop.is_set():
+            first = self._get(self._admit_queue)
+            if first is None:
+                if self.housekeeping is not None:
+                    try:
+                        self.housekeeping()
+                    except Exception as e:
+                        logger.exception('housekeeping fail: %r', e)
+                continue
+            # 短暂等待同一轮扫描中的其他种子，合并为一批
+            batch = [first]
+            deadline = time.monotonic() + self.batch_window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                entry = self._get(self._admit_queue, timeout=remaining)
+                if entry is None:
+                    break
+                batch.append(entry)
+            try:
+                self.admit_batch([result for _, result in batch])
+            except Exception as e:
+                logger.exception('admit fail: %r', e)
+            finally:
+                for key, _ in batch:
+                    self._release(key)
+
+    def start(self):
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._scan_loop, name='scanner', daemon=True),
+                         threading.Thread(target=self._admit_loop, name='admitter', daemon=True)]
+        self._threads += [threading.Thread(target=self._fetch_loop, name='fetcher-{}'.format(i), daemon=True)
+                          for i in range(max(self.fetch_workers, 1))]
+        for thread in self._threads:
+            thread.start()
+
+    def run(self):
+        # 在主线程中等待，保证信号处理函数可以打断
+        self.start()
+        while not self._stop.wait(1):
+            pass
+        self.join()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        self.join(timeout)
+
+    def join(self, timeout=10):
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            if thread is threading.current_thread():
+                continue
+            thread.join(max(deadline - time.monotonic(), 0))
@@ -0,0 +1,87 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : profiling.py
+@Time    : 2026/10/18 19:50
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class CycleProfiler:
+    """用 cProfile 和 tracemalloc 记录每一轮主循环
+
+    每轮写出 cycle-N.prof（可用 snakeviz 等工具查看）和 cycle-N-alloc.txt（内存分配最多的位置），
+    summary() 合并所有轮次，写出耗时最多的函数。只统计调用线程中的代码。
+    """
+
+    def __init__(self, out_dir='./data/profiles', top=30, frames=1):
+        self.top = top
+        self.frames = frames
+        self.out_dir = os.path.join(out_dir, time.strftime('%Y%m%d-%H%M%S'))
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._profile_paths = list()
+        self._durations = list()
+
+    def _path(self, name):
+        return os.path.join(self.out_dir, name)
+
+    @contextmanager
+    def cycle(self, index):
+        tracemalloc.start(self.frames)
+        start_snapshot = tracemalloc.take_snapshot()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - start
+            end_snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            profile_path = self._path('cycle-{}.prof'.format(index))
+            profiler.dump_stats(profile_path)
+            self._profile_paths.append(profile_path)
+            self._durations.append(duration)
+            self._write_allocations(index, duration, current, peak, start_snapshot, end_snapshot)
+
+    def _write_allocations(self, index, duration, current, peak, start_snapshot, end_snapshot):
+        snapshot_filters = [tracemalloc.Filter(False, tracemalloc.__file__),
+                            tracemalloc.Filter(False, '<frozen importlib._bootstrap>')]
+        start_snapshot = start_snapshot.filter_traces(snapshot_filters)
+        end_snapshot = end_snapshot.filter_traces(snapshot_filters)
+        with open(self._path('cycle-{}-alloc.txt'.format(index)), 'w', encoding='utf-8') as f:
+            f.write('cycle {}: {:.3f} s, traced memory {:.1f} KiB, peak {:.1f} KiB\n\n'.format(
+                index, duration, current / 1024, peak / 1024))
+            f.write('top {} allocation sites still alive at the end of the cycle:\n'.format(self.top))
+            for stat in end_snapshot.compare_to(start_snapshot, 'lineno')[:self.top]:
+                f.write(str(stat) + '\n')
+
+    def summary(self):
+        # 合并所有轮次，按累计耗时和自身耗时分别列出，返回文件路径
+        path = self._path('summary.txt')
+        if len(self._profile_paths) == 0:
+            return None
+        stream = io.StringIO()
+        stats = pstats.Stats(*self._profile_paths, stream=stream)
+        stats.strip_dirs()
+        stream.write('{} cycle(s): {}\n\n'.format(
+            len(self._durations), ', '.join('{:.3f} s'.format(duration) for duration in self._durations)))
+        stream.write('=== sorted by cumulative time ===\n')
+        stats.sort_stats('cumulative').print_stats(self.top)
+        stream.write('=== sorted by internal time ===\n')
+        stats.sort_stats('tottime').print_stats(self.top)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(stream.getvalue())
+        return path
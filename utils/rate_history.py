@@ -0,0 +1,168 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : rate_history.py
+@Time    : 2026/10/18 21:50
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class RateHistory:
+    """每个种子最近 window 次采样的上传速度和分享率，以及上传速度的 EWMA
+
+    所有种子共用几个二维 numpy 数组作为环形缓冲区，每个种子占一行，
+    删除的种子所在的行会被复用。数千个种子每次采样只需几次数组运算。
+    record 可能扩容并替换数组，读取也要持有锁（rate_of 在扫描线程中调用）。
+    """
+
+    def __init__(self, path, window=120, min_interval=60, halflife=1800, initial_rows=256):
+        self.path = path
+        self.window = window
+        self.min_interval = min_interval
+        self.halflife = halflife
+        self._lock = threading.Lock()
+        self._rows = dict()
+        self._free_rows = list()
+        self._allocate(initial_rows)
+
+    def _allocate(self, rows):
+        self._rate = np.zeros((rows, self.window), dtype=np.float32)
+        self._ratio = np.zeros((rows, self.window), dtype=np.float32)
+        self._pos = np.zeros(rows, dtype=np.int32)
+        self._count = np.zeros(rows, dtype=np.int32)
+        self._ewma = np.zeros(rows, dtype=np.float64)
+        self._last_time = np.zeros(rows, dtype=np.float64)
+        self._free_rows = list(range(rows - 1, -1, -1))
+
+    def _grow(self):
+        old_rows = len(self._pos)
+        new_rows = old_rows * 2
+        self._rate = np.concatenate([self._rate, np.zeros((old_rows, self.window), dtype=np.float32)])
+        self._ratio = np.concatenate([self._ratio, np.zeros((old_rows, self.window), dtype=np.float32)])
+        self._pos = np.concatenate([self._pos, np.zeros(old_rows, dtype=np.int32)])
+        self._count = np.concatenate([self._count, np.zeros(old_rows, dtype=np.int32)])
+        self._ewma = np.concatenate([self._ewma, np.zeros(old_rows, dtype=np.float64)])
+        self._last_time = np.concatenate([self._last_time, np.zeros(old_rows, dtype=np.float64)])
+        self._free_rows = list(range(new_rows - 1, old_rows - 1, -1)) + self._free_rows
+
+    def _row(self, info_hash):
+        row = self._rows.get(info_hash)
+        if row is None:
+            if len(self._free_rows) == 0:
+                self._grow()
+            row = self._free_rows.pop()
+            self._pos[row] = 0
+            self._count[row] = 0
+            self._ewma[row] = 0
+            self._last_time[row] = 0
+            self._rows[info_hash] = row
+        return row
+
+    def __len__(self):
+        with self._lock:
+            return len(self._rows)
+
+    def __contains__(self, info_hash):
+        with self._lock:
+            return info_hash in self._rows
+
+    def record(self, torrents, now=None):
+        # 记录一次采样，不在 torrents 中的种子被移除；距上次采样不足 min_interval 秒时跳过
+        now = time.time() if now is None else now
+        with self._lock:
+            alive = set(torrent.id for torrent in torrents)
+            for info_hash in [info_hash for info_hash in self._rows if info_hash not in alive]:
+                self._free_rows.append(self._rows.pop(info_hash))
+            if len(torrents) == 0:
+                return
+            rows = np.fromiter((self._row(torrent.id) for torrent in torrents), dtype=np.int64, count=len(torrents))
+            rates = np.fromiter((torrent.rateUpload for torrent in torrents), dtype=np.float64, count=len(torrents))
+            ratios = np.fromiter((torrent.ratio for torrent in torrents), dtype=np.float64, count=len(torrents))
+
+            elapsed = now - self._last_time[rows]
+            first = self._count[rows] == 0
+            due = first | (elapsed >= self.min_interval)
+            rows, rates, ratios, elapsed, first = rows[due], rates[due], ratios[due], elapsed[due], first[due]
+
+            pos = self._pos[rows]
+            self._rate[rows, pos] = rates
+            self._ratio[rows, pos] = ratios
+            self._pos[rows] = (pos + 1) % self.window
+            self._count[rows] = np.minimum(self._count[rows] + 1, self.window)
+            # 按时间间隔换算的 EWMA，采样间隔不固定时权重仍然正确
+            alpha = np.where(first, 1.0, 1.0 - np.power(0.5, elapsed / self.halflife))
+            self._ewma[rows] += alpha * (rates - self._ewma[rows])
+            self._last_time[rows] = now
+
+    def ewma(self, info_hash, default=None):
+        with self._lock:
+            row = self._rows.get(info_hash)
+            if row is None or self._count[row] == 0:
+                return default
+            return float(self._ewma[row])
+
+    def window_mean(self, info_hash, default=None):
+        with self._lock:
+            row = self._rows.get(info_hash)
+            if row is None or self._count[row] == 0:
+                return default
+            return float(self._rate[row, :self._count[row]].mean())
+
+    def ratios(self, info_hash):
+        # 按时间顺序返回保存的分享率（副本）
+        with self._lock:
+            row = self._rows.get(info_hash)
+            if row is None:
+                return np.zeros(0, dtype=np.float32)
+            count = self._count[row]
+            order = (np.arange(count) + self._pos[row] - count) % self.window
+            return self._ratio[row, order]
+
+    def rate_of(self, torrent):
+        # 用于删除决策的上传速度：有历史时取 EWMA，否则取当前速度
+        return self.ewma(torrent.id, torrent.rateUpload)
+
+    def save(self):
+        with self._lock:
+            hashes = list(self._rows.keys())
+            rows = np.array([self._rows[info_hash] for info_hash in hashes], dtype=np.int64)
+            tmp_path = self.path + '.tmp'
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, window=np.int64(self.window), hashes=np.array(hashes, dtype='U40'),
+                         rate=self._rate[rows], ratio=self._ratio[rows], pos=self._pos[rows],
+                         count=self._count[rows], ewma=self._ewma[rows], last_time=self._last_time[rows])
+            os.replace(tmp_path, self.path)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                if int(data['window']) != self.window:
+                    logger.info('rate history window changed, discard saved history')
+                    return
+                hashes = [str(info_hash) for info_hash in data['hashes']]
+                with self._lock:
+                    self._allocate(max(len(hashes) * 2, len(self._pos)))
+                    count = len(hashes)
+                    self._rate[:count] = data['rate']
+                    self._ratio[:count] = data['ratio']
+                    self._pos[:count] = data['pos']
+                    self._count[:count] = data['count']
+                    self._ewma[:count] = data['ewma']
+                    self._last_time[:count] = data['last_time']
+                    self._rows = {info_hash: row for row, info_hash in enumerate(hashes)}
+                    self._free_rows = list(range(len(self._pos) - 1, count - 1, -1))
+        except Exception as e:
+            logger.error('load rate history fail: %r', e)
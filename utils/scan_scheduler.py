@@ -0,0 +1,51 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : scan_scheduler.py
+@Time    : 2026/10/18 17:05
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import random
+
+
+class ScanScheduler:
+    """根据扫描结果调整扫描间隔
+
+    出现新的可用种子或进入 Free 活动时立即缩短到 min_interval；没有新种子时
+    每次乘以 decay 逐渐放慢，直到 max_interval；请求出错时按 backoff 指数退避。
+    所有间隔都加上 ±jitter 的随机抖动，避免固定周期访问网站。
+    base_interval 为初始间隔和出错时退避的起点，限制在 [min_interval, max_interval] 内。
+    """
+
+    def __init__(self, base_interval=60, min_interval=15, max_interval=600, decay=1.25, backoff=2.0, jitter=0.1):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.base_interval = min(max(base_interval, self.min_interval), self.max_interval)
+        self.decay = decay
+        self.backoff = backoff
+        self.jitter = jitter
+        self.interval = self.base_interval
+        self.error_count = 0
+
+    def on_scan(self, new_count, free_event=False):
+        # new_count 为上一次扫描之后新出现的可用种子数
+        self.error_count = 0
+        if new_count > 0 or free_event:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(max(self.interval, self.base_interval / self.decay) * self.decay, self.max_interval)
+
+    def on_unchanged(self):
+        self.on_scan(0)
+
+    def on_error(self):
+        self.error_count += 1
+
+    def next_delay(self):
+        if self.error_count > 0:
+            delay = min(self.base_interval * self.backoff ** (self.error_count - 1), self.max_interval)
+        else:
+            delay = self.interval
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
@@ -0,0 +1,255 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : scoring.py
+@Time    : 2026/10/18 23:40
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from utils.admission import PROMOTION_RANK
+from utils.history_store import FLAG_HOT, FLAG_NEW, FLAG_RECOMMENDED
+from utils.torrent_info import Promotion, TorrentInfo
+
+logger = logging.getLogger(__name__)
+
+FEATURES = ('category', 'size', 'seeding', 'downloading', 'finished', 'promotion', 'hot', 'new', 'recommended',
+            'age_hours')
+CATEGORY, SIZE, SEEDING, DOWNLOADING, FINISHED, PROMOTION, HOT, NEW, RECOMMENDED, AGE = range(len(FEATURES))
+# 模型文件格式的版本，文件中只有数组和 JSON，读取时不执行任何代码
+MODEL_FORMAT = 1
+_TREE_ARRAYS = ('feature', 'threshold', 'missing_left', 'left', 'right', 'value', 'roots')
+
+# 每个被删除的种子与添加前最后一次扫描到的该种子的信息
+_SAMPLES_SQL = '''
+SELECT r.seed_id, t.cat, r.tag, r.size_bytes, r.seeding, r.downloading, r.finished, r.flags, t.added_time, r.time,
+       e.uploaded, e.size_bytes, e.time - e.added_time
+FROM evictions e
+JOIN torrents t ON t.seed_id = e.seed_id
+JOIN scan_rows r ON r.seed_id = e.seed_id AND r.time = (
+    SELECT MAX(time) FROM scan_rows WHERE seed_id = e.seed_id AND time <= e.added_time)
+ORDER BY e.time
+'''
+
+
+def feature_matrix(torrent_infos, now=None, category_codes=None):
+    # 一次遍历把种子转换为 (种子数, len(FEATURES)) 的矩阵，未知的分类和发布时间为 NaN
+    now = time.time() if now is None else now
+    category_codes = category_codes or dict()
+    nan = float('nan')
+    unknown_rank = len(PROMOTION_RANK)
+    matrix = np.array([(category_codes.get(info.cat, nan), info.size_bytes, info.seeding, info.downloading,
+                        info.finished, PROMOTION_RANK.get(info.tag, unknown_rank), info.is_hot, info.is_new,
+                        info.is_recommended, info.added_time) for info in torrent_infos],
+                      dtype=np.float64).reshape(len(torrent_infos), len(FEATURES))
+    added_time = matrix[:, AGE]
+    matrix[:, AGE] = np.where(added_time >= 0, (now - added_time) / 3600, nan)
+    return matrix
+
+
+class TreeEnsemble:
+    """HistGradientBoostingRegressor 的所有树展开后的扁平数组
+
+    叶子节点的阈值为 +inf、左右子节点都指向自身，预测时所有种子、所有树同时逐层向下走，
+    循环次数只等于树的最大深度，不需要 scikit-learn。
+    """
+
+    def __init__(self, feature, threshold, missing_left, left, right, value, roots, depth, baseline):
+        self.feature = feature
+        self.threshold = threshold
+        self.missing_left = missing_left
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.baseline = baseline
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        # 只支持数值特征、单输出的模型
+        trees = [predictors[0].nodes for predictors in estimator._predictors]
+        if any(tree['is_categorical'].any() for tree in trees):
+            raise ValueError('categorical splits are not supported')
+        sizes = [len(tree) for tree in trees]
+        roots = np.cumsum([0] + sizes[:-1]).astype(np.int64)
+        nodes = np.concatenate(trees)
+        offsets = np.repeat(roots, sizes)
+        index = np.arange(len(nodes), dtype=np.int64)
+        is_leaf = nodes['is_leaf'].astype(bool)
+        return cls(np.where(is_leaf, 0, nodes['feature_idx']).astype(np.int64),
+                   np.where(is_leaf, np.inf, nodes['num_threshold']).astype(np.float64),
+                   is_leaf | nodes['missing_go_to_left'].astype(bool),
+                   np.where(is_leaf, index, nodes['left'] + offsets).astype(np.int64),
+                   np.where(is_leaf, index, nodes['right'] + offsets).astype(np.int64),
+                   nodes['value'].astype(np.float64), roots, int(nodes['depth'].max()),
+                   float(np.ravel(estimator._baseline_prediction)[0]))
+
+    def validate(self, feature_count):
+        # 从文件读取后检查下标，避免损坏的文件在预测时越界
+        node_count = len(self.value)
+        arrays = (self.feature, self.threshold, self.missing_left, self.left, self.right)
+        if any(len(array) != node_count for array in arrays) or len(self.roots) == 0:
+            raise ValueError('inconsistent tree arrays')
+        for array in (self.left, self.right, self.roots):
+            if array.min() < 0 or array.max() >= node_count:
+                raise ValueError('node index out of range')
+        if self.feature.min() < 0 or self.feature.max() >= feature_count:
+            raise ValueError('feature index out of range')
+        if not 0 <= self.depth <= 64:
+            raise ValueError('invalid depth: {}'.format(self.depth))
+
+    def predict(self, matrix):
+        count, width = matrix.shape
+        tree_count = len(self.roots)
+        node = np.tile(self.roots, count)
+        row_offsets = np.repeat(np.arange(count, dtype=np.int64) * width, tree_count)
+        values = np.ascontiguousarray(matrix).ravel()
+        for _ in range(self.depth):
+            x = values.take(row_offsets + self.feature.take(node))
+            go_left = (x <= self.threshold.take(node)) | (np.isnan(x) & self.missing_left.take(node))
+            node = np.where(go_left, self.left.take(node), self.right.take(node))
+        return self.baseline + self.value.take(node).reshape(count, tree_count).sum(axis=1)
+
+
+class UploadModel:
+    """离线训练的上传收益模型，预测种子添加后每 GiB 每天的上传量（GiB）
+
+    predictor 为 TreeEnsemble，predict(matrix) 返回 log1p(收益)；分类按 category_codes 编码。
+    保存为 npz（树的数组和 JSON 格式的元数据），读取时不使用 pickle。
+    """
+
+    def __init__(self, predictor, category_codes, sample_count=0, trained_time=None, sklearn_version=None):
+        self.predictor = predictor
+        self.category_codes = category_codes
+        self.sample_count = sample_count
+        self.trained_time = time.time() if trained_time is None else trained_time
+        # 训练时使用的 scikit-learn 版本，只用于记录
+        self.sklearn_version = sklearn_version
+
+    def score(self, matrix):
+        if len(matrix) == 0:
+            return np.zeros(0)
+        return np.expm1(self.predictor.predict(matrix))
+
+    def save(self, path):
+        predictor = self.predictor
+        meta = {
+            'format': MODEL_FORMAT,
+            'features': list(FEATURES),
+            'category_codes': self.category_codes,
+            'sample_count': self.sample_count,
+            'trained_time': self.trained_time,
+            'sklearn_version': self.sklearn_version,
+            'depth': predictor.depth,
+            'baseline': predictor.baseline,
+        }
+        tmp_path = path + '.tmp'
+        # 传入文件对象，np.savez 不会在文件名后追加 .npz
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(meta, ensure_ascii=False)),
+                     **{name: getattr(predictor, name) for name in _TREE_ARRAYS})
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        # 文件不存在或无法读取时返回 None，使用原有规则
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                if meta.get('format') != MODEL_FORMAT or meta.get('features') != list(FEATURES):
+                    raise ValueError('unsupported model format {}'.format(meta.get('format')))
+                arrays = {name: data[name] for name in _TREE_ARRAYS}
+            predictor = TreeEnsemble(arrays['feature'].astype(np.int64), arrays['threshold'].astype(np.float64),
+                                     arrays['missing_left'].astype(bool), arrays['left'].astype(np.int64),
+                                     arrays['right'].astype(np.int64), arrays['value'].astype(np.float64),
+                                     arrays['roots'].astype(np.int64), int(meta['depth']), float(meta['baseline']))
+            predictor.validate(len(FEATURES))
+            return UploadModel(predictor, {str(cat): int(code) for cat, code in meta['category_codes'].items()},
+                               int(meta['sample_count']), float(meta['trained_time']), meta.get('sklearn_version'))
+        except Exception as e:
+            logger.warning('load upload model %s fail, fall back to rules: %r', path, e)
+            return None
+
+
+def load_samples(connection):
+    # 返回 (特征矩阵, 收益, 分类编码)，收益为 上传量/大小/做种天数
+    rows = connection.execute(_SAMPLES_SQL).fetchall()
+    category_codes = {cat: code for code, cat in enumerate(sorted(set(row[1] for row in rows)))}
+    infos = [TorrentInfo(str(row[0]), '', row[1], Promotion(row[2]), row[3], row[4], row[5], row[6],
+                         is_hot=bool(row[7] & FLAG_HOT), is_new=bool(row[7] & FLAG_NEW),
+                         is_recommended=bool(row[7] & FLAG_RECOMMENDED),
+                         added_time=row[8] if row[8] is not None else -1) for row in rows]
+    scan_times = np.array([row[9] for row in rows], dtype=np.float64)
+    uploaded = np.array([row[10] for row in rows], dtype=np.float64)
+    size = np.maximum(np.array([row[11] for row in rows], dtype=np.float64), 1)
+    days = np.maximum(np.array([row[12] for row in rows], dtype=np.float64) / 86400, 1 / 24)
+    return feature_matrix(infos, scan_times, category_codes), uploaded / size / days, category_codes
+
+
+def train(connection, test_fraction=0.2):
+    # 按删除时间划分，最近的 test_fraction 用于检验，返回 (模型, 检验集 R²)
+    # 展开时读取 scikit-learn 的内部结构，训练时使用 requirements.txt 中固定的版本；展开结果与原模型逐一核对
+    import sklearn
+    from sklearn.ensemble import HistGradientBoostingRegressor
+
+    matrix, target, category_codes = load_samples(connection)
+    if len(matrix) < 20:
+        raise ValueError('not enough samples: {}'.format(len(matrix)))
+    target = np.log1p(target)
+    split = int(len(matrix) * (1 - test_fraction))
+
+    def fit(x, y):
+        # 分类编码作为数值特征，展开后的树只需处理数值比较；限制深度使预测时的循环次数固定为 4
+        estimator = HistGradientBoostingRegressor(max_iter=100, learning_rate=0.1, max_depth=4, max_leaf_nodes=15,
+                                                  random_state=0)
+        return estimator.fit(x, y)
+
+    r2 = None
+    if 0 < split < len(matrix):
+        r2 = fit(matrix[:split], target[:split]).score(matrix[split:], target[split:])
+    estimator = fit(matrix, target)
+    try:
+        ensemble = TreeEnsemble.from_estimator(estimator)
+    except (AttributeError, KeyError, ValueError) as e:
+        raise ValueError('cannot flatten the estimator of scikit-learn {}: {!r}'.format(sklearn.__version__, e))
+    if not np.allclose(ensemble.predict(matrix), estimator.predict(matrix)):
+        raise ValueError('flattened trees differ from the estimator of scikit-learn {}'.format(sklearn.__version__))
+    return UploadModel(ensemble, category_codes, len(matrix), sklearn_version=sklearn.__version__), r2
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='train the upload yield model from history.db')
+    parser.add_argument('command', choices=['train'])
+    parser.add_argument('--db', default='./data/history.db', help='history database path')
+    parser.add_argument('--out', default='./data/upload_model.npz', help='model output path')
+    parser.add_argument('--test-fraction', type=float, default=0.2, help='latest samples held out for R^2')
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.db):
+        print('{} not found'.format(args.db))
+        return 1
+    connection = sqlite3.connect(args.db)
+    try:
+        model, r2 = train(connection, args.test_fraction)
+    finally:
+        connection.close()
+    model.save(args.out)
+    print('{} samples, {} categories, held-out R^2: {}'.format(
+        model.sample_count, len(model.category_codes), '{:.3f}'.format(r2) if r2 is not None else '-'))
+    print('saved to {}'.format(args.out))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,112 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : seen_store.py
+@Time    : 2026/10/18 12:20
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import os
+import pickle
+import threading
+import time
+
+
+class SeenStore:
+    """已处理过的种子 id 集合
+
+    快照文件保存 {种子id: 记录时间}，两次快照之间的新增记录追加写入日志文件，
+    进程被强制结束时最多丢失最后一行。日志达到一定长度或距离上次压缩超过一天时
+    合并进快照，同时清理超过 max_age 秒的记录（max_age 为 0 时不清理）。
+    """
+
+    def __init__(self, snapshot_path, journal_path, max_age=0, compact_lines=1000, compact_interval=86400):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.max_age = max_age
+        self.compact_lines = compact_lines
+        self.compact_interval = compact_interval
+        self._seen = dict()
+        self._journal = None
+        self._journal_lines = 0
+        self._last_compact_time = time.time()
+        self._lock = threading.Lock()
+
+    def __contains__(self, seed_id):
+        try:
+            return int(seed_id) in self._seen
+        except (TypeError, ValueError):
+            return False
+
+    def __len__(self):
+        return len(self._seen)
+
+    def load(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.snapshot_path), mode=0o755, exist_ok=True)
+            now = int(time.time())
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, 'rb') as f:
+                    snapshot = pickle.load(f)
+                if isinstance(snapshot, dict):
+                    self._seen = snapshot
+                else:
+                    # 旧版本保存的是种子 id 字符串列表
+                    self._seen = {int(seed_id): now for seed_id in snapshot}
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, 'r') as f:
+                    for line in f:
+                        fields = line.split()
+                        if not line.endswith('\n') or len(fields) != 2 or not fields[0].isdigit() or not fields[1].isdigit():
+                            # 进程被强制结束时最后一行可能不完整
+                            continue
+                        self._seen[int(fields[0])] = int(fields[1])
+                        self._journal_lines += 1
+            self._compact()
+
+    def add(self, seed_id):
+        with self._lock:
+            seed_id = int(seed_id)
+            now = int(time.time())
+            self._seen[seed_id] = now
+            if self._journal is None:
+                self._journal = open(self.journal_path, 'a')
+            self._journal.write('{} {}\n'.format(seed_id, now))
+            self._journal.flush()
+            self._journal_lines += 1
+            if self._journal_lines >= self.compact_lines or now - self._last_compact_time >= self.compact_interval:
+                self._compact()
+
+    def compact(self):
+        with self._lock:
+            self._compact()
+
+    def close(self, compact=True):
+        # 读取失败时 compact 为 False，只关闭日志，不覆盖已有的快照
+        with self._lock:
+            if compact:
+                self._compact()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def _compact(self):
+        now = int(time.time())
+        if self.max_age > 0:
+            expire_time = now - self.max_age
+            self._seen = {seed_id: seen_time for seed_id, seen_time in self._seen.items() if seen_time >= expire_time}
+
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self._seen, f, protocol=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        # 快照写入成功后再清空日志，中途崩溃只会重复回放日志
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, 'w')
+        self._journal_lines = 0
+        self._last_compact_time = now
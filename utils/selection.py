@@ -0,0 +1,98 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : selection.py
+@Time    : 2026/10/18 23:00
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import numpy as np
+
+from utils.scoring import DOWNLOADING, SEEDING, SIZE, feature_matrix
+
+GiB = 1024 * 1024 * 1024
+
+
+class SelectionResult:
+    __slots__ = ('free_event', 'accepted', 'skipped', 'scores')
+
+    def __init__(self, free_event, accepted, skipped, scores=None):
+        self.free_event = free_event
+        self.accepted = accepted
+        # [(TorrentInfo, 原因)]，已处理过的种子不在其中
+        self.skipped = skipped
+        # 使用模型时为 accepted 对应的预测收益，按从高到低排列
+        self.scores = scores
+
+
+class SelectionPolicy:
+    """从扫描到的种子中选出值得下载的种子，只依赖 TorrentInfo，不需要网络
+
+    正常情况下要求 下载数/做种数 >= min_ratio；列表中的种子数达到 event_threshold 时
+    认为开启了 Free 活动，改为要求 下载数/做种数 >= event_min_ratio 且大小不小于 event_min_size。
+    设置了 model（UploadModel）时，平时的 下载数/做种数 条件改为预测收益 >= min_score，并按预测收益排序；
+    Free 活动期间仍然要求 下载数/做种数 >= event_min_ratio，同时要求预测收益 >= min_score。
+    候选种子先转换为矩阵，条件和模型都对整个矩阵一次计算。
+    """
+
+    def __init__(self, min_size, max_size, min_ratio=0.6, event_threshold=20, event_min_ratio=20.0,
+                 event_min_size=20 * GiB, model=None, min_score=0.1):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.min_ratio = min_ratio
+        self.event_threshold = event_threshold
+        self.event_min_ratio = event_min_ratio
+        self.event_min_size = event_min_size
+        self.model = model
+        self.min_score = min_score
+
+    def is_free_event(self, torrent_infos):
+        return len(torrent_infos) >= self.event_threshold
+
+    def select(self, torrent_infos, seen=(), now=None):
+        free_event = self.is_free_event(torrent_infos)
+        if free_event:
+            # 遇到free或者免费种子太过了，择优选取，标准是(下载数/上传数)>20，并且文件大小大于20GB
+            min_ratio = self.event_min_ratio
+            min_size = max(self.min_size, self.event_min_size)
+        else:
+            # 正常种子选择标准是免费种子并且(下载数/上传数)>0.6
+            min_ratio = self.min_ratio
+            min_size = self.min_size
+        candidates = [torrent_info for torrent_info in torrent_infos if torrent_info.seed_id not in seen]
+        if len(candidates) == 0:
+            return SelectionResult(free_event, list(), list())
+
+        if self.model is not None:
+            matrix = feature_matrix(candidates, now, self.model.category_codes)
+            size, seeding, downloading = matrix[:, SIZE], matrix[:, SEEDING], matrix[:, DOWNLOADING]
+        else:
+            # 规则只需要大小、做种数和下载数三列
+            size, seeding, downloading = np.array(
+                [(info.size_bytes, info.seeding, info.downloading) for info in candidates], dtype=np.float64).T
+        # 下载大小在 torrent-min-size 与 torrent-max-size 之间的种子
+        size_ok = (size >= min_size) & (size <= self.max_size)
+        peers_ok = (seeding > 0) & (downloading >= 0)
+        ratio = np.divide(downloading, seeding, out=np.zeros(len(candidates)), where=seeding > 0)
+        ratio_ok = ratio >= min_ratio
+        if self.model is not None:
+            scores = self.model.score(matrix)
+            if not free_event:
+                ratio_ok = np.ones(len(candidates), dtype=bool)
+            score_ok = scores >= self.min_score
+        else:
+            scores = None
+            score_ok = np.ones(len(candidates), dtype=bool)
+        reasons = ('size', 'no_seeders', 'ratio', 'score')
+        # 第一个不满足的条件，-1 表示全部满足
+        failed = np.where(size_ok, np.where(peers_ok, np.where(ratio_ok, np.where(score_ok, -1, 3), 2), 1), 0)
+
+        failed_list = failed.tolist()
+        skipped = [(candidates[i], reasons[failed_list[i]]) for i in np.flatnonzero(failed >= 0).tolist()]
+        accepted_index = np.flatnonzero(failed < 0)
+        if scores is not None:
+            accepted_index = accepted_index[np.argsort(-scores[accepted_index], kind='stable')]
+            scores = scores[accepted_index]
+        accepted = [candidates[i] for i in accepted_index.tolist()]
+        return SelectionResult(free_event, accepted, skipped, scores)
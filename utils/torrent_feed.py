@@ -0,0 +1,170 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : torrent_feed.py
+@Time    : 2026/10/18 15:50
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import logging
+import re
+import time
+from collections import OrderedDict
+from contextlib import closing
+from urllib.parse import urlencode
+from xml.etree.ElementTree import XMLPullParser
+
+from utils.metrics import track_phase
+from utils.torrent_scanner import RateLimiter, ScanResult
+
+logger = logging.getLogger(__name__)
+
+_SEED_ID_RE = re.compile(r'[?&]id=(\d+)')
+
+
+class FeedEntry:
+    __slots__ = ('seed_id', 'title', 'size_bytes')
+
+    def __init__(self, seed_id, title, size_bytes):
+        self.seed_id = seed_id
+        self.title = title
+        self.size_bytes = size_bytes
+
+
+class TorrentFeed:
+    """通过 NexusPHP 的种子 RSS 发现新种子
+
+    RSS 只提供 id、标题和大小，促销和做种人数仍需从 torrents.php 的搜索结果中
+    读取，只对未处理过且大小合适的条目查询。符合促销条件的查询结果缓存 recheck_interval 秒：
+    期间每次扫描都会返回（与扫描 torrents.php 一样，没有空间时下次扫描再试），过期后重新查询
+    促销是否仍有效。不符合条件的结果一直缓存到条目离开 RSS，不再重复搜索。
+    已有最终结果（在 seen 中）的种子不再查询。
+    接口与 TorrentScanner 相同。
+    """
+
+    def __init__(self, tracker, page_parser, filter_tags, feed_url, seen, min_size=0, max_size=0, rate=2.0,
+                 history_size=5000, recheck_interval=1800):
+        self.tracker = tracker
+        self.page_parser = page_parser
+        self.filter_tags = filter_tags
+        self.feed_url = feed_url
+        self.seen = seen
+        self.min_size = min_size
+        self.max_size = max_size
+        self.history_size = history_size
+        self.recheck_interval = recheck_interval
+        self._limiter = RateLimiter(rate)
+        # 种子 id -> (查询时间, 符合促销条件的 TorrentInfo 或 None)，只保留最近的 history_size 个
+        self._checked = OrderedDict()
+        # 上一次读取到的 RSS 条目，RSS 未变化（304）时继续使用
+        self._entries = list()
+
+    @staticmethod
+    def _parse_entry(item):
+        link = item.findtext('link') or ''
+        match = _SEED_ID_RE.search(link)
+        if match is None:
+            enclosure = item.find('enclosure')
+            match = _SEED_ID_RE.search(enclosure.get('url', '') if enclosure is not None else '')
+        if match is None:
+            return None
+        size_bytes = -1
+        enclosure = item.find('enclosure')
+        if enclosure is not None and enclosure.get('length', '').isdigit():
+            size_bytes = int(enclosure.get('length'))
+        return FeedEntry(match.group(1), (item.findtext('title') or '').strip(), size_bytes)
+
+    def read_entries(self, response):
+        # 边下载边解析，解析完的 item 立即释放
+        parser = XMLPullParser(events=('end',))
+        entries = list()
+        for chunk in response.iter_content(chunk_size=16384):
+            parser.feed(chunk)
+            for _, element in parser.read_events():
+                if element.tag == 'item':
+                    entry = self._parse_entry(element)
+                    if entry is not None:
+                        entries.append(entry)
+                    element.clear()
+        parser.close()
+        return entries
+
+    def _is_candidate(self, entry):
+        if entry.seed_id in self.seen:
+            return False
+        if entry.size_bytes >= 0:
+            if entry.size_bytes < self.min_size or (self.max_size > 0 and entry.size_bytes > self.max_size):
+                return False
+        return True
+
+    def _cached(self, seed_id, now):
+        # 返回 (缓存是否有效, TorrentInfo 或 None)
+        checked = self._checked.get(seed_id)
+        if checked is None:
+            return False, None
+        if checked[1] is not None and now - checked[0] >= self.recheck_interval:
+            return False, None
+        return True, checked[1]
+
+    def _mark_checked(self, seed_id, torrent_info, now):
+        self._checked.pop(seed_id, None)
+        self._checked[seed_id] = (now, torrent_info)
+        while len(self._checked) > self.history_size:
+            self._checked.popitem(last=False)
+
+    def _forget_missing(self):
+        # 离开 RSS 的条目不会再查询，不符合条件的结果不再需要
+        seed_ids = {entry.seed_id for entry in self._entries}
+        for seed_id in [seed_id for seed_id, checked in self._checked.items()
+                        if checked[1] is None and seed_id not in seed_ids]:
+            del self._checked[seed_id]
+
+    def _lookup(self, entry):
+        # 返回 (是否查询成功, 符合促销条件的 TorrentInfo 或 None)
+        self._limiter.wait()
+        url = self.tracker.get_url('torrents.php') + '?' + urlencode({'search': entry.title, 'search_area': 0})
+        response = self.tracker.fetch(url)
+        if response is None:
+            return False, None
+        with track_phase('parse'):
+            _, torrent_infos = self.page_parser.parse(response.content, self.filter_tags)
+        for torrent_info in torrent_infos:
+            if torrent_info.seed_id == entry.seed_id:
+                return True, torrent_info
+        return True, None
+
+    def scan(self, serial=False):
+        # RSS 条目总是在当前线程中依次查询，serial 只为与 TorrentScanner 保持接口一致
+        response = self.tracker.fetch(self.feed_url, conditional=True, stream=True)
+        if response is None:
+            return None
+        with closing(response):
+            if response.status_code != 304:
+                self._entries = self.read_entries(response)
+                self._forget_missing()
+
+        now = time.monotonic()
+        torrent_infos = list()
+        looked_up = False
+        for entry in self._entries:
+            if not self._is_candidate(entry):
+                continue
+            valid, torrent_info = self._cached(entry.seed_id, now)
+            if not valid:
+                try:
+                    success, torrent_info = self._lookup(entry)
+                except Exception as e:
+                    logger.error('lookup of %s fail: %r', entry.seed_id, e)
+                    continue
+                if not success:
+                    continue
+                looked_up = True
+                self._mark_checked(entry.seed_id, torrent_info, now)
+            if torrent_info is not None:
+                torrent_infos.append(torrent_info)
+        # 查询了新条目，或者仍有未处理的候选种子时视为有变化，交给后续流程再判断一次
+        return ScanResult(None, torrent_infos, looked_up or len(torrent_infos) > 0, 1, 0)
+
+    def close(self):
+        pass
@@ -0,0 +1,108 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : torrent_info.py
+@Time    : 2026/10/18 11:40
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import calendar
+import re
+import time
+from enum import Enum
+
+_SIZE_RE = re.compile(r'([\d.,]+)\s*([KMGTP]?i?B)', re.IGNORECASE)
+_SIZE_UNITS = {
+    'B': 1,
+    'KB': 1024, 'KIB': 1024,
+    'MB': 1024 ** 2, 'MIB': 1024 ** 2,
+    'GB': 1024 ** 3, 'GIB': 1024 ** 3,
+    'TB': 1024 ** 4, 'TIB': 1024 ** 4,
+    'PB': 1024 ** 5, 'PIB': 1024 ** 5,
+}
+_SITE_UTC_OFFSET = 8 * 3600
+
+
+class Promotion(str, Enum):
+    NONE = ''
+    FREE = '免费'
+    TWO_UP = '2x上传'
+    TWO_UP_FREE = '免费&2x上传'
+    HALF_DOWN = '50%下载'
+    TWO_UP_HALF_DOWN = '50%下载&2x上传'
+    THIRTY_PERCENT_DOWN = '30%下载'
+
+    def __str__(self):
+        return self.value
+
+
+def parse_size(text):
+    # 网页上的大小（如 12.34GiB、512.00 MiB）转换为字节数，无法识别时返回 -1
+    match = _SIZE_RE.search(text)
+    if match is None:
+        return -1
+    try:
+        return int(float(match.group(1).replace(',', '')) * _SIZE_UNITS[match.group(2).upper()])
+    except (KeyError, ValueError):
+        return -1
+
+
+def parse_time(text):
+    # 网页上的发布时间（北京时间，如 2026-10-18 12:00:00）转换为时间戳，无法识别时返回 -1
+    try:
+        return calendar.timegm(time.strptime(text.strip(), '%Y-%m-%d %H:%M:%S')) - _SITE_UTC_OFFSET
+    except (AttributeError, ValueError):
+        return -1
+
+
+def format_size(size_bytes):
+    if size_bytes < 0:
+        return '?'
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size_bytes < 1024:
+            return '{:.2f}{}'.format(size_bytes, unit)
+        size_bytes /= 1024
+    return '{:.2f}TiB'.format(size_bytes)
+
+
+class TorrentInfo:
+    """torrents.php 中的一行种子信息"""
+
+    __slots__ = ('seed_id', 'title', 'cat', 'tag', 'size_bytes', 'seeding', 'downloading', 'finished',
+                 'is_hot', 'is_new', 'is_recommended', 'is_seeding', 'is_finished', 'added_time')
+
+    def __init__(self, seed_id, title, cat, tag, size_bytes, seeding, downloading, finished,
+                 is_hot=False, is_new=False, is_recommended=False, is_seeding=False, is_finished=False,
+                 added_time=-1):
+        self.seed_id = seed_id
+        self.title = title
+        self.cat = cat
+        self.tag = tag
+        self.size_bytes = size_bytes
+        self.seeding = seeding
+        self.downloading = downloading
+        self.finished = finished
+        self.is_hot = is_hot
+        self.is_new = is_new
+        self.is_recommended = is_recommended
+        self.is_seeding = is_seeding
+        self.is_finished = is_finished
+        # 发布时间戳，未知时为 -1
+        self.added_time = added_time
+
+    @property
+    def file_size(self):
+        return format_size(self.size_bytes)
+
+    def __eq__(self, other):
+        if not isinstance(other, TorrentInfo):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return 'TorrentInfo({})'.format(', '.join(
+            '{}={!r}'.format(name, getattr(self, name)) for name in self.__slots__))
+
+    def __str__(self):
+        return '{} {} {}'.format(self.seed_id, self.file_size, self.title)
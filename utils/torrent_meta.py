@@ -0,0 +1,43 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : torrent_meta.py
+@Time    : 2026/10/18 13:50
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import hashlib
+import logging
+
+from bencoding import bencode, bdecode
+
+logger = logging.getLogger(__name__)
+
+
+class TorrentMeta:
+    """直接从 .torrent 文件的 bencode 数据中读取的信息，无需交给客户端"""
+
+    __slots__ = ('info_hash', 'name', 'total_size', 'file_count')
+
+    def __init__(self, content):
+        info = bdecode(content)[b"info"]
+        self.info_hash = hashlib.sha1(bencode(info)).hexdigest()
+        self.name = info.get(b"name", b"").decode("utf-8", "replace")
+        if b"files" in info:
+            lengths = [item[b"length"] for item in info[b"files"]]
+        else:
+            lengths = [info[b"length"]]
+        self.total_size = sum(lengths)
+        self.file_count = len(lengths)
+
+    def __str__(self):
+        return f'TorrentMeta "{self.name}"'
+
+
+def inspect_torrent(content):
+    try:
+        return TorrentMeta(content)
+    except Exception as e:
+        logger.error('invalid torrent file: %r', e)
+        return None
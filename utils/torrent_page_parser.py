@@ -0,0 +1,212 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : torrent_page_parser.py
+@Time    : 2026/10/18 10:12
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import hashlib
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from utils.torrent_info import Promotion, TorrentInfo, parse_size, parse_time
+
+try:
+    import lxml  # noqa: F401
+    _FEATURES = 'lxml'
+except ImportError:
+    _FEATURES = 'html.parser'
+
+_SEED_ID_RE = re.compile(r'id=(\d+)')
+_TR_RE = re.compile(rb'<(/?)tr\b[^>]*>', re.IGNORECASE)
+_TABLE_RE = re.compile(rb'<(/?)table\b[^>]*>', re.IGNORECASE)
+_PROMOTION_ROW_RE = re.compile(rb'<tr\b[^>]*\bfree_bg\b[^>]*>', re.IGNORECASE)
+_TORRENTS_TABLE_RE = re.compile(rb'<table\b[^>]*\bclass=["\'](?:[^"\']*\s)?torrents[\s"\']', re.IGNORECASE)
+
+# 控制面板中促销种子的标记方式：高亮（行的 class 为 *_bg）、文字、图标
+MARKUP_HIGHLIGHT = 'highlight'
+MARKUP_TEXT = 'text'
+MARKUP_ICON = 'icon'
+
+
+def _class_matcher(classes):
+    # SoupStrainer 拿到的是原始 class 字符串，多个 class 时需要自行拆分
+    def match(value):
+        return value is not None and not classes.isdisjoint(value.split())
+    return match
+
+
+def _balanced_end(content, start, tag_re):
+    depth = 0
+    for match in tag_re.finditer(content, start):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            return match.end()
+    return len(content)
+
+
+def listing_fingerprint(content, markup=MARKUP_HIGHLIGHT):
+    # 只对种子列表所在的区间做摘要，页面上用户信息、生成时间等变化不影响结果
+    if markup == MARKUP_HIGHLIGHT:
+        rows = _PROMOTION_ROW_RE.finditer(content)
+        first = next(rows, None)
+        if first is None:
+            return hashlib.blake2b(b'', digest_size=16).hexdigest()
+        last = first
+        for last in rows:
+            pass
+        start, end = first.start(), _balanced_end(content, last.start(), _TR_RE)
+    else:
+        table = _TORRENTS_TABLE_RE.search(content)
+        if table is None:
+            return hashlib.blake2b(b'', digest_size=16).hexdigest()
+        start, end = table.start(), _balanced_end(content, table.start(), _TABLE_RE)
+    return hashlib.blake2b(content[start:end], digest_size=16).hexdigest()
+
+
+class TorrentPageParser:
+    """torrents.php 页面解析，不生成整页的文档树
+
+    高亮标记方式下只构建促销种子行（tr.free_bg），文字和图标标记方式下促销种子行
+    没有 class，只构建种子列表（table.torrents）。两种情况都会保留用户信息块。
+    """
+
+    start_idx = 1  # static offset
+
+    def __init__(self, tag_map, features=_FEATURES, markup=MARKUP_HIGHLIGHT):
+        self._tag_map = tag_map
+        self._features = features
+        self.markup = markup
+        row_class = 'free_bg' if markup == MARKUP_HIGHLIGHT else 'torrents'
+        self._strainer = SoupStrainer(attrs={'class': _class_matcher({row_class, 'navbar-user-data'})})
+
+    def get_tag(self, tag):
+        try:
+            if tag == '':
+                return Promotion.NONE
+            else:
+                tag = tag.split('_')[0]
+
+            return Promotion(self._tag_map[tag])
+        except (KeyError, ValueError):
+            return Promotion.NONE
+
+    def parse(self, content, filter_tags):
+        soup = BeautifulSoup(content, features=self._features, parse_only=self._strainer)
+        user_info_block = soup.find(class_='navbar-user-data')
+        if self.markup == MARKUP_HIGHLIGHT:
+            table = soup.find_all('tr', class_='free_bg')
+        else:
+            torrents_table = soup.find('table', class_='torrents')
+            table = list() if torrents_table is None else [
+                row for row in torrents_table.find_all('tr', recursive=False)
+                if row.find('td', class_='colhead', recursive=False) is None]
+        return user_info_block, self.parse_rows(table, filter_tags)
+
+    def fingerprint(self, content):
+        return listing_fingerprint(content, self.markup)
+
+    def parse_rows(self, table, filter_tags):
+        torrent_infos = list()
+        for item in table:
+            torrent_info = self.parse_row(item, filter_tags)
+            if torrent_info is not None:
+                torrent_infos.append(torrent_info)
+        return torrent_infos
+
+    @staticmethod
+    def _main_td(td):
+        # 等价于 td.select('table > tr > td')[0]，若第一个单元格中有 div 则取 [1]
+        first = None
+        for cell in td.find_all('td'):
+            row = cell.parent
+            if row is None or row.name != 'tr' or row.parent is None or row.parent.name != 'table':
+                continue
+            if first is None:
+                if not cell.find('div'):
+                    return cell
+                first = cell
+            else:
+                return cell
+        raise IndexError('main td not found')
+
+    def parse_row(self, item, filter_tags):
+        start_idx = self.start_idx
+        # 根据控制面板中促销种子的标记方式不同来匹配，先判断促销标记，不符合要求的行不再解析其他字段
+        tag = None
+        if self.markup == MARKUP_HIGHLIGHT and 'class' in item.attrs:
+            # 默认高亮方式，只看行的 class
+            tag = self.get_tag(item.attrs['class'][0])
+            if tag not in filter_tags:
+                return None
+
+        tds = item.find_all('td', recursive=False)
+        # tds[0] 是 引用
+        # 主要信息的td
+        main_td = self._main_td(tds[start_idx + 1])
+
+        tags = set()
+        for span in main_td.find_all('span'):
+            if span.parent is None or span.parent.name != 'span':
+                continue
+            if 'class' in span.attrs:
+                tags.add(span.attrs['class'][0])
+        tags.discard('')
+        is_hot = 'hot' in tags
+        is_new = 'new' in tags
+        is_recommended = 'recommended' in tags
+        tags.difference_update(('hot', 'new', 'recommended'))
+
+        if tag is None:
+            if len(tags) == 1:
+                # 文字标记方式
+                # 不属于 hot、new、recommended 的标记即为促销标记
+                tag = self.get_tag(next(iter(tags)))
+            else:
+                # 添加图标方式
+                icons = [img for img in main_td.find_all('img', src='/pic/trans.gif')
+                         if ' '.join(img.get('class', [])).startswith('pro_')]
+                if len(icons) > 0:
+                    tag = self.get_tag(icons[-1].attrs['class'][0].split('_')[-1])
+                else:
+                    tag = Promotion.NONE
+            if tag not in filter_tags:
+                return None
+
+        # tds[1] 是分类
+        cat = tds[start_idx].find('a').text.strip()
+
+        # 链接
+        link = main_td.find('a')
+        href = link.attrs['href']
+
+        # 种子id
+        seed_id = _SEED_ID_RE.findall(href)[0]
+
+        # 标题
+        title = link.attrs['title']
+
+        is_seeding = main_td.find('img', src='/pic/seeding.png') is not None
+        is_finished = main_td.find('img', src='/pic/finished.png') is not None
+
+        # 发布时间在 span 的 title 中，显示的是"22天"之类的相对时间
+        time_span = tds[start_idx + 3].find('span')
+        added_time = parse_time(time_span.attrs.get('title', '')) if time_span is not None else -1
+
+        size_bytes = parse_size(tds[start_idx + 4].text)
+
+        seeding_text = tds[start_idx + 5].text
+        seeding = int(seeding_text) if seeding_text.isdigit() else -1
+
+        downloading_text = tds[start_idx + 6].text
+        downloading = int(downloading_text) if downloading_text.isdigit() else -1
+
+        finished_text = tds[start_idx + 7].text
+        finished = int(finished_text) if finished_text.isdigit() else -1
+
+        return TorrentInfo(seed_id, title, cat, tag, size_bytes, seeding, downloading, finished,
+                           is_hot=is_hot, is_new=is_new, is_recommended=is_recommended,
+                           is_seeding=is_seeding, is_finished=is_finished, added_time=added_time)
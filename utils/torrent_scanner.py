@@ -0,0 +1,137 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : torrent_scanner.py
+@Time    : 2026/10/18 15:10
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from utils.metrics import track_phase
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """限制每秒请求数，rate 为 0 时不限制"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class ScanResult:
+    __slots__ = ('user_info_block', 'torrent_infos', 'changed', 'page_count', 'failed_count')
+
+    def __init__(self, user_info_block, torrent_infos, changed, page_count, failed_count):
+        self.user_info_block = user_info_block
+        self.torrent_infos = torrent_infos
+        self.changed = changed
+        self.page_count = page_count
+        self.failed_count = failed_count
+
+
+class TorrentScanner:
+    """并发扫描 torrents.php 的多个分页和分类，按种子 id 合并去重
+
+    每个页面分别记录条件请求和列表摘要，未变化的页面直接使用上次的解析结果；
+    所有页面都未变化时 ScanResult.changed 为 False。
+    """
+
+    def __init__(self, tracker, page_parser, filter_tags, pages=1, categories=(), workers=4, rate=2.0,
+                 refresh_interval=600):
+        self.tracker = tracker
+        self.page_parser = page_parser
+        self.filter_tags = filter_tags
+        self.refresh_interval = refresh_interval
+        self.urls = self._build_urls(max(pages, 1), categories)
+        self._limiter = RateLimiter(rate)
+        self._executor = ThreadPoolExecutor(max_workers=max(min(workers, len(self.urls)), 1))
+        # url -> (摘要, 解析时间, 用户信息, 种子列表)
+        self._pages = dict()
+
+    def _build_urls(self, pages, categories):
+        base_url = self.tracker.get_url('torrents.php')
+        urls = list()
+        for cat in (categories or [None]):
+            for page in range(pages):
+                params = dict()
+                if cat is not None:
+                    params['cat'] = cat
+                if page > 0:
+                    # NexusPHP 的分页从 0 开始
+                    params['page'] = page
+                urls.append(base_url + ('?' + urlencode(params) if params else ''))
+        return urls
+
+    def _scan_page(self, url, now):
+        cached = self._pages.get(url)
+        refresh = cached is None or now - cached[1] >= self.refresh_interval
+        self._limiter.wait()
+        response = self.tracker.fetch(url, conditional=not refresh)
+        if response is None:
+            return None
+        if response.status_code == 304 and cached is not None:
+            return False, cached[2], cached[3]
+        content = response.content
+        fingerprint = self.page_parser.fingerprint(content)
+        if not refresh and fingerprint == cached[0]:
+            return False, cached[2], cached[3]
+        with track_phase('parse'):
+            user_info_block, torrent_infos = self.page_parser.parse(content, self.filter_tags)
+        self._pages[url] = (fingerprint, now, user_info_block, torrent_infos)
+        return True, user_info_block, torrent_infos
+
+    def _scan_page_safe(self, url, now):
+        try:
+            return self._scan_page(url, now)
+        except Exception as e:
+            logger.error('scan %s fail: %r', url, e)
+            return None
+
+    def scan(self, serial=False):
+        # 全部页面失败时返回 None；serial 为 True 或只有一个页面时在当前线程中依次扫描
+        now = time.time()
+        pool_map = map if serial or len(self.urls) == 1 else self._executor.map
+        results = list(pool_map(lambda url: self._scan_page_safe(url, now), self.urls))
+        changed = False
+        user_info_block = None
+        torrent_infos = list()
+        seen_ids = set()
+        failed_count = 0
+        for result in results:
+            if result is None:
+                failed_count += 1
+                continue
+            page_changed, page_user_info_block, page_torrent_infos = result
+            changed = changed or page_changed
+            if user_info_block is None:
+                user_info_block = page_user_info_block
+            for torrent_info in page_torrent_infos:
+                if torrent_info.seed_id in seen_ids:
+                    continue
+                seen_ids.add(torrent_info.seed_id)
+                torrent_infos.append(torrent_info)
+        if failed_count == len(self.urls):
+            return None
+        return ScanResult(user_info_block, torrent_infos, changed, len(self.urls), failed_count)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
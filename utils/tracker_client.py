@@ -0,0 +1,121 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    : tracker_client.py
+@Time    : 2026/10/18 12:55
+@Author  : Xzonn
+@Email   : Xzonn@outlook.com
+@Software: Visual Studio Code
+"""
+
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.metrics import TRACKER_REQUESTS, TRACKER_RETRIES, TRACKER_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class TrackerClient:
+    """访问 byrbt 的共享客户端，持有 cookies 与 keep-alive 连接池"""
+
+    def __init__(self, config, pool_size=8, timeout=(10, 60), try_count=5):
+        self.base_url = str(config.get_bot_config("byrbt-url"))
+        self.timeout = timeout
+        self.try_count = try_count
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.113 Safari/537.36',
+            'Accept-Encoding': 'gzip, deflate',
+        })
+        # 会话过期时调用，由 LoginTool 设置，返回新的 cookies 或 None
+        self.login_handler = None
+        self._login_lock = threading.Lock()
+        self._login_generation = 0
+        # 条件请求使用的 ETag / Last-Modified，按 url 保存
+        self._validators = dict()
+
+    def get_url(self, url):
+        return self.base_url + url
+
+    def set_cookies(self, cookies):
+        self.session.cookies.clear()
+        if cookies is not None:
+            for k, v in cookies.items():
+                self.session.cookies.set(k, v)
+
+    def get_cookies(self):
+        return {k: v for k, v in self.session.cookies.items()}
+
+    @staticmethod
+    def is_login_page(response):
+        # 未登录时 NexusPHP 会跳转到 login.php
+        return 'login.php' in response.url
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.post(url, **kwargs)
+
+    def _conditional_headers(self, url, headers):
+        headers = dict(headers or dict())
+        etag, last_modified = self._validators.get(url, (None, None))
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        if last_modified is not None:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def _relogin(self, generation):
+        with self._login_lock:
+            # 并发请求时其他线程可能已经重新登录过了
+            if generation != self._login_generation:
+                return
+            logger.info('byrbt session expired, try login...')
+            if self.login_handler is None or self.login_handler() is None:
+                time.sleep(1)
+            self._login_generation += 1
+
+    def fetch(self, url, conditional=False, **kwargs):
+        # 带重试的 GET，会话过期时重新登录，全部失败返回 None
+        # conditional 为 True 时带上次的 ETag / Last-Modified，未变化时返回状态码为 304 的 response
+        page = urlparse(url).path.rsplit('/', 1)[-1] or 'index'
+        for i in range(self.try_count):
+            if i > 0:
+                TRACKER_RETRIES.inc(page=page)
+            start = time.perf_counter()
+            status = 'error'
+            try:
+                if conditional:
+                    kwargs['headers'] = self._conditional_headers(url, kwargs.get('headers'))
+                generation = self._login_generation
+                response = self.get(url, **kwargs)
+                status = str(response.status_code)
+                if self.is_login_page(response):
+                    status = 'login'
+                    self._relogin(generation)
+                    continue
+                response.raise_for_status()
+                if response.status_code == 200:
+                    etag = response.headers.get('ETag')
+                    last_modified = response.headers.get('Last-Modified')
+                    if etag is not None or last_modified is not None:
+                        self._validators[url] = (etag, last_modified)
+                return response
+            except Exception as e:
+                logger.warning('request %s fail (%d/%d): %r', page, i + 1, self.try_count, e)
+                time.sleep(1)
+            finally:
+                TRACKER_SECONDS.observe(time.perf_counter() - start, page=page)
+                TRACKER_REQUESTS.inc(page=page, status=status)
+        return None